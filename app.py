@@ -1,56 +1,134 @@
-from flask import Flask, render_template, request, redirect, url_for,jsonify
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for,jsonify, Response, session, stream_with_context, g
+from werkzeug.local import LocalProxy
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from datetime import timedelta
 from serviceHandler import serviceHandler
+from cacheClient import createCache
 from flask_migrate import Migrate
 from config import Config
-from models import db,User
+from models import db,User, configureSqliteEngine
 from flask_wtf.csrf import validate_csrf, generate_csrf 
 from wtforms.validators import ValidationError 
+from itsdangerous import URLSafeTimedSerializer, BadData
 from flask_wtf import CSRFProtect
 import re
+import click
+import hashlib
+import zlib
+import io
+import csv
+import json
+import queue
+import functools
+import threading
+import time
 from forms import LoginForm,SignupForm
+from eventBus import reportEvents
+from passwordHasher import passwords, passwordHasherBusy, createPasswordHasher
+from rowTypes import expenseRow, encodeTransactionCursor
+from queryCounter import installQueryCounter, startCounting, stopCounting
 
 
-app = Flask(__name__)
+# Every route and CLI command is registered on this blueprint, createApp attaches it to an app
+main = Blueprint('main', __name__, cli_group=None)
 
-app.config.from_object(Config)
-if not Config.SECRET_KEY:
-    raise RuntimeError("Server misconfiguration: ANALYSER_SECRET_KEY is not set in environment.")
-
-# Initialize the database with the app
-db.init_app(app) 
-
-migrate = Migrate(app,db)
+migrate = Migrate()
 
 # Flask-Login
 login_manager = LoginManager()
 # Redirect to this route when not logged in
-login_manager.login_view = 'loginPage'  
-login_manager.init_app(app)
-
-# Set session lifetime to 7 days
-app.permanent_session_lifetime = timedelta(days=7)
+login_manager.login_view = 'main.loginPage'
 
 # CSRF protection
-csrf = CSRFProtect(app)
+csrf = CSRFProtect()
+
+# serviceHandler of the app handling the current request or command, built once by createApp
+handler = LocalProxy(lambda: current_app.extensions['serviceHandler'])
+
+csrfCookieName = 'csrf_token'
 
-@app.after_request
+# Signature check of a CSRF cookie, memoised since the same cookie comes back on every request
+@functools.lru_cache(maxsize=4096)
+def readCsrfCookie(secretKey, cookieToken):
+    serializer = URLSafeTimedSerializer(secretKey, salt='wtf-csrf-token')
+    try:
+        return serializer.loads(cookieToken, return_timestamp=True)
+    except BadData:
+        return None
+
+# True when the CSRF cookie carries a valid token for the session's current secret
+def csrfCookieIsCurrent():
+    cookieToken = request.cookies.get(csrfCookieName)
+    sessionToken = session.get('csrf_token')
+    if not cookieToken or not sessionToken:
+        return False
+
+    cookie = readCsrfCookie(current_app.config.get('WTF_CSRF_SECRET_KEY') or current_app.secret_key, cookieToken)
+    if cookie is None or cookie[0] != sessionToken:
+        return False
+
+    # Reissue once three quarters of the token lifetime has passed, so the cookie never expires mid-use
+    timeLimit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    return not timeLimit or time.time() - cookie[1].timestamp() < timeLimit * 3 / 4
+
+# Set the CSRF cookie only when it is missing, expiring or from a rotated session token
+@main.after_app_request
 def inject_csrf_token(response):
-    response.set_cookie('csrf_token', generate_csrf())
+    # Static files and cacheable responses must not carry a per-user Set-Cookie
+    if request.endpoint == 'static' or response.status_code == 304:
+        return response
+    if response.cache_control.public or response.get_etag()[0] is not None:
+        return response
+
+    if not csrfCookieIsCurrent():
+        response.set_cookie(csrfCookieName, generate_csrf())
     return response
 
-# Creates tables if they don't exist
-with app.app_context():
-    db.create_all()  
-
-# Initialize serviceHandler to interact with the database and do other operations
-handler = serviceHandler()
+# SQL statement count and time per request as response headers, always on in debug mode
+def queryCountHeadersEnabled():
+    return current_app.debug or current_app.config.get("QUERY_COUNT_HEADERS", False)
+
+@main.before_app_request
+def startRequestQueryCount():
+    if queryCountHeadersEnabled():
+        g.queryStats, g.queryStatsToken = startCounting(keepStatements=False)
+
+# Statements a streamed body runs after this point are not in the headers
+@main.after_app_request
+def addQueryCountHeaders(response):
+    stats = g.get("queryStats")
+    if stats is not None:
+        response.headers["X-Query-Count"] = str(stats.count)
+        response.headers["X-Query-Time-Ms"] = f"{stats.totalMs:.2f}"
+    return response
 
-# Flask-Login: Load user from DB
+@main.teardown_app_request
+def stopRequestQueryCount(error=None):
+    token = g.pop("queryStatsToken", None)
+    if token is not None:
+        stopCounting(token)
+
+# Setup command: flask init-db
+@main.cli.command("init-db")
+def initDb():
+    """Create the tables that do not exist yet (use "flask db upgrade" for migrated databases)."""
+    db.create_all()
+    click.echo("Database setup complete!")
+
+# Backfill command: flask rebuild-rollups [--user-id ID]
+@main.cli.command("rebuild-rollups")
+@click.option("--user-id", type=int, default=None, help="Only rebuild the rollups of this user.")
+def rebuildRollups(user_id):
+    """Rebuild expense_rollups and salary_rollups from the raw expenses and salaries tables."""
+    status = handler.DBClient.rebuildRollups(user_id)
+    if status["status"] != "Success":
+        raise click.ClickException(status["message"])
+    click.echo(f"Rebuilt {status['data']['expenseBuckets']} expense and {status['data']['salaryBuckets']} salary buckets.")
+
+# Flask-Login: Load user from DB, or from the short-lived user cache
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return handler.loadUser(int(user_id))
 
 # Helper function to validate email
 def is_valid_email(email):
@@ -60,17 +138,17 @@ def is_valid_email(email):
 # Home route
 # This ensures both `/` and `/login` go to the login page
 # Login page route (GET)
-@app.route('/')
-@app.route('/login')
+@main.route('/')
+@main.route('/login')
 def loginPage():
     form = LoginForm()
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     return render_template('login.html', form=form)
 
 # Login route (POST) - Authenticates user credentials
-@app.route('/login', methods=['POST'])
+@main.route('/login', methods=['POST'])
 def login():
     try:
         csrf_token = request.headers.get('X-CSRFToken')
@@ -95,14 +173,25 @@ def login():
 
     user = User.query.filter_by(username=username).first()
     if user:
-        if user.checkPassword(password):
+        try:
+            passwordMatches = user.checkPassword(password)
+        except passwordHasherBusy:
+            return jsonify({
+                "status": "Failed",
+                "statusCode": 503,
+                "message": "Too many sign-in attempts right now. Please try again in a moment."
+            }), 503
+
+        if passwordMatches:
             login_user(user, remember=True, duration=timedelta(days=3))
+            # Move hashes made with older cost settings to the configured ones
+            handler.upgradePasswordHash(user.id, password)
 
             return jsonify({
                 "status": "Success",
                 "statusCode": 200,
                 "message": "Login successfully",
-                "redirect": url_for('dashboard')
+                "redirect": url_for('main.dashboard')
             })
         
         return jsonify({
@@ -118,14 +207,14 @@ def login():
                 }), 401
        
 # Logout route
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('loginPage'))
+    return redirect(url_for('main.loginPage'))
 
 # Signup page route
-@app.route('/signup')
+@main.route('/signup')
 def signUp():
     if current_user.is_authenticated:
         logout_user()
@@ -133,17 +222,17 @@ def signUp():
     return render_template('signup.html', form=form)
 
 # Dashboard view route
-@app.route('/dashboard')
+@main.route('/dashboard')
 @login_required
 def dashboard():
     status = handler.getUserFirstName(current_user.id)
     if status["status"] == "Success":
         data = handler.getDashboardData(current_user.id)
         return render_template('dashboard.html', username=current_user.firstName, data=data)
-    return redirect(url_for('loginPage'))
+    return redirect(url_for('main.loginPage'))
 
 # Route to create a new user account
-@app.route('/addUser', methods=['POST'])
+@main.route('/addUser', methods=['POST'])
 def addUser():
 
     try:
@@ -195,14 +284,17 @@ def addUser():
             "status": "Success",
             "statusCode": 200,
             "message": "User created successfully",
-            "redirect": url_for('login')  # Tell client where to redirect
+            "redirect": url_for('main.login')  # Tell client where to redirect
         })
-    
+
+    # Password hashing queue full, same answer as /login gives
+    if requestStatus["statusCode"] == 503:
+        return jsonify(requestStatus), 503
     return jsonify(requestStatus)
     
 # Route to add a new savings goal
 @csrf.exempt
-@app.route('/dashboard/addGoal', methods=['POST'])
+@main.route('/dashboard/addGoal', methods=['POST'])
 @login_required
 def addGoal():
     formData = request.get_json()
@@ -221,8 +313,8 @@ def addGoal():
 
 # Route to add a new salary entry (accessible from both dashboard and expense pages)
 @csrf.exempt
-@app.route('/dashboard/addSalary', methods=['POST'])
-@app.route('/expense/addSalary', methods=['POST'])
+@main.route('/dashboard/addSalary', methods=['POST'])
+@main.route('/expense/addSalary', methods=['POST'])
 @login_required
 def addSalary():
     formData = request.get_json()
@@ -249,7 +341,7 @@ def addSalary():
 
 # Route to add a new expense entry
 @csrf.exempt
-@app.route('/expense/addExpense', methods=['POST'])
+@main.route('/expense/addExpense', methods=['POST'])
 @login_required
 def addExpense():
     
@@ -274,12 +366,13 @@ def addExpense():
         "date": formData.get('date')
     }
 
-    result = handler.addNewExpense(current_user.username, current_user.id, data)
+    # Usually only the chart delta is returned, expense.js merges it into the page data
+    result = handler.addNewExpense(current_user.username, current_user.id, data, incremental=True)
     return jsonify(result)
 
 # Route to add a new expense entry
 @csrf.exempt
-@app.route('/dashboard/addExpense', methods=['POST'])
+@main.route('/dashboard/addExpense', methods=['POST'])
 @login_required
 def addExpenseAndUpadteGoalAllocation():
     formData = request.get_json()
@@ -304,33 +397,160 @@ def addExpenseAndUpadteGoalAllocation():
         "goalName":formData.get('goalName')
     }
 
-    result = handler.addNewExpense(current_user.username, current_user.id, data)
+    # The dashboard reloads after a redeem, so only the outcome of the write is used here
+    result = handler.addNewExpense(current_user.username, current_user.id, data, incremental=True)
+    if result.get("status") != "Success":
+        return jsonify(result)
     requestStatus = handler.updateAllocation(current_user.id, data)
     return jsonify(requestStatus)
 
 # Expense page view route
-@app.route('/expense')
+@main.route('/expense')
 @login_required
 def expensePage():
     status = handler.getUserFirstName(current_user.id)
     if status["status"] == "Success":
         data = handler.getExpensePageData(current_user.id)
         return render_template('expense.html', username=current_user.firstName, data=data)
-    return redirect(url_for('loginPage'))
+    return redirect(url_for('main.loginPage'))
     
+# Route importing a bank statement CSV (date, category, amount columns) sent as the "file" form field
+@main.route('/expense/import', methods=['POST'])
+@login_required
+def importExpenses():
+    upload = request.files.get('file')
+    if upload is None or upload.filename == "":
+        return jsonify({"status": "Failed", "statusCode": 400, "message": "No CSV file received"})
+
+    # Decode the upload as it is read, the CSV is never loaded whole
+    lines = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    batchSize = current_app.config.get("IMPORT_BATCH_SIZE", 1000)
+    requestStatus = handler.importExpenses(current_user.id, lines, batchSize)
+    return jsonify(requestStatus)
+
+# Route streaming one page of the expense history as JSON:
+# /expense/transactions?limit=50&cursor=<nextCursor>&category=Food&startDate=2025-01-01&endDate=2025-03-31
+@main.route('/expense/transactions')
+@login_required
+def expenseTransactions():
+    defaultLimit = current_app.config.get("TRANSACTIONS_PAGE_SIZE", 50)
+    maxLimit = current_app.config.get("TRANSACTIONS_MAX_PAGE_SIZE", 1000)
+    limit = min(max(request.args.get('limit', defaultLimit, type=int), 1), maxLimit)
+
+    requestStatus = handler.getExpenseTransactions(
+        current_user.id,
+        limit,
+        cursor=request.args.get('cursor'),
+        category=request.args.get('category'),
+        startDate=request.args.get('startDate'),
+        endDate=request.args.get('endDate')
+    )
+    if requestStatus["status"] != "Success":
+        return jsonify(requestStatus)
+    rows = requestStatus["data"]
+
+    def generate():
+        yield '{"status": "Success", "statusCode": 200, "data": ['
+        chunk = []
+        lastRow = None
+        nextCursor = None
+        for index, row in enumerate(rows):
+            # The row past the limit only signals that there is another page
+            if index == limit:
+                nextCursor = encodeTransactionCursor(lastRow)
+                break
+            chunk.append(("," if index else "") + json.dumps(row.toJson()))
+            lastRow = row
+            if len(chunk) == 100:
+                yield "".join(chunk)
+                chunk = []
+        chunk.append('], "nextCursor": ' + json.dumps(nextCursor) + '}')
+        yield "".join(chunk)
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+# Wrap a generator of text chunks into a file download, gzip compressed when the client accepts it
+def streamDownload(chunks, mimetype, filename):
+    useGzip = request.accept_encodings["gzip"] > 0
+
+    def encode():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if useGzip else None
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+
+    response = Response(stream_with_context(encode()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["Cache-Control"] = "private, no-store"
+    response.vary.add("Accept-Encoding")
+    if useGzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+exportBatchSize = 1000
+
+# CSV text for a header and rows, handed out every exportBatchSize rows
+def csvChunks(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % exportBatchSize == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# One JSON object per line for typed rows, handed out every exportBatchSize rows
+def ndjsonChunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({"type": row.ledgerType, **row.toJson()}))
+        if len(lines) == exportBatchSize:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+# Route downloading all of the user's expenses as CSV: /export/expenses.csv?startDate=2025-01-01&endDate=2025-12-31
+@main.route('/export/expenses.csv')
+@login_required
+def exportExpenses():
+    requestStatus = handler.getExpenseExport(current_user.id, request.args.get('startDate'), request.args.get('endDate'))
+    if requestStatus["status"] != "Success":
+        return jsonify(requestStatus)
+    return streamDownload(csvChunks(expenseRow._fields, requestStatus["data"]), "text/csv", "expenses.csv")
+
+# Route downloading expenses and salaries merged in date order as NDJSON, same date filters as above
+@main.route('/export/ledger.ndjson')
+@login_required
+def exportLedger():
+    requestStatus = handler.getLedgerExport(current_user.id, request.args.get('startDate'), request.args.get('endDate'))
+    if requestStatus["status"] != "Success":
+        return jsonify(requestStatus)
+    return streamDownload(ndjsonChunks(requestStatus["data"]), "application/x-ndjson", "ledger.ndjson")
+
 # Route to fetch usernames and their IDs for sharing reports
-@app.route('/dashboard/getUsernamesAndIDs')
+@main.route('/dashboard/getUsernamesAndIDs')
 @login_required
 def getUsernamesAndIDs():
 
     # Get the 'query' parameter from URL
     query = request.args.get('query', '')  
-    requestStatus = handler.getUsernamesAndIDs(current_user.id,query)
+    limit = request.args.get('limit', 10, type=int)
+    page = request.args.get('page', 1, type=int)
+    requestStatus = handler.getUsernamesAndIDs(current_user.id,query,limit,page)
     return jsonify(requestStatus)
 
 # Route to send report to another user, report is saved in db.
 @csrf.exempt
-@app.route('/dashboard/sentReport', methods=['POST'])
+@main.route('/dashboard/sentReport', methods=['POST'])
 @login_required
 def sentReport():
     data = request.get_json()
@@ -342,60 +562,192 @@ def sentReport():
     return jsonify(requestStatus)
 
 # Route to get sender details for received reports
-@app.route('/dashboard/getSenderDetails')
+@main.route('/dashboard/getSenderDetails')
 @login_required
 def getSenderDetails():
     requestStatus = handler.getSenderDetails(current_user.id)
     return jsonify(requestStatus)
 
+reportTemplateVersion = None
+
+# Version of report.html, part of the rendered report cache key and the ETag
+def getReportTemplateVersion():
+    global reportTemplateVersion
+
+    # Re-read the template on every call while templates auto reload (debug)
+    jinjaEnv = current_app.jinja_env
+    if reportTemplateVersion is None or jinjaEnv.auto_reload:
+        source, _, _ = jinjaEnv.loader.get_source(jinjaEnv, "report.html")
+        reportTemplateVersion = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    return reportTemplateVersion
+
 # Route to view a specific shared report
+# Shared reports never change, so the rendered HTML is cached compressed and served with an ETag
 @csrf.exempt
-@app.route('/dashboard/getSharedReport', methods=['POST'])
+@main.route('/dashboard/getSharedReport', methods=['GET', 'POST'])
 @login_required
 def getReport():
-    data = request.get_json()
-    if data is None:
-        return jsonify({"status": "Failed", "statusCode": 400, "message": "No data received"})
+    if request.method == 'GET':
+        senderID = request.args.get('senderID', type=int)
+        reportID = request.args.get('reportId', type=int)
+    else:
+        data = request.get_json()
+        if data is None:
+            return jsonify({"status": "Failed", "statusCode": 400, "message": "No data received"})
 
-    senderID = data.get('senderID')
-    reportID = data.get('reportId')
+        senderID = data.get('senderID')
+        reportID = data.get('reportId')
 
-    # Fetch the report data
-    requestStatus = handler.getReportData(current_user.id, senderID, reportID)
+    templateVersion = getReportTemplateVersion()
+    etag = f"report-{reportID}-{templateVersion}"
+    notModified = request.if_none_match.contains(etag)
 
-    if requestStatus["status"] != "Success":
+    # A matching ETag only needs the access check, the HTML blob is read on a miss only
+    cacheStatus = handler.getCachedReportHtml(current_user.id, senderID, reportID, templateVersion, includeHtml=not notModified)
+    if cacheStatus["status"] != "Success":
         return jsonify({
             "status": "Failed",
             "statusCode": 404,
             "message": "Report not found"
         }), 404
 
-    # Render the report HTML using Jinja2 template and send it in the response
-    report_html = render_template("report.html", data=requestStatus["data"])
+    if notModified:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
 
-    return jsonify({
+    compressedHtml = cacheStatus["data"]["reportHtml"]
+    if compressedHtml is not None:
+        report_html = zlib.decompress(compressedHtml).decode("utf-8")
+    else:
+        # Fetch the report data
+        requestStatus = handler.getReportData(current_user.id, senderID, reportID)
+
+        if requestStatus["status"] != "Success":
+            return jsonify({
+                "status": "Failed",
+                "statusCode": 404,
+                "message": "Report not found"
+            }), 404
+
+        # Render the report HTML using Jinja2 template and keep it for the next open
+        report_html = render_template("report.html", data=requestStatus["data"])
+        handler.saveReportHtml(reportID, zlib.compress(report_html.encode("utf-8")), templateVersion)
+
+    response = jsonify({
         "status": "Success",
         "statusCode": 200,
         "reportHtml": report_html
     })
+    response.set_etag(etag)
+    # Private to the receiver, and always revalidated so a template change is picked up
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+# Route returning several sidebar payloads in one round trip: /dashboard/bootstrap?sections=accountData,latestTransactions
+@main.route('/dashboard/bootstrap')
+@login_required
+def dashboardBootstrap():
+    sections = [name.strip() for name in request.args.get('sections', '').split(',') if name.strip()]
+    requestStatus = handler.getDashboardBootstrap(current_user.id, sections)
+    return jsonify(requestStatus)
+
+# Health check with this worker's password hashing queue numbers
+@main.route('/health')
+def health():
+    return jsonify({
+        "status": "Success",
+        "statusCode": 200,
+        "passwordHasher": passwords.stats()
+    })
 
 # Route to get IDs of unread reports
-@app.route('/dashboard/getUnreadReportIds')
+@main.route('/dashboard/getUnreadReportIds')
 @login_required
 def getUnreadReportIds():
     requestStatus = handler.getUnreadReportIds(current_user.id)
     return jsonify(requestStatus)
 
 # Route to get the count of unread reports
-@app.route('/dashboard/getUnreadReportCount')
+@main.route('/dashboard/getUnreadReportCount')
 @login_required
 def getUnreadReportCount():
     requestStatus = handler.getUnreadReportCount(current_user.id)
     return jsonify(requestStatus)
 
+# Format one Server-Sent Events message
+def formatServerSentEvent(eventName, data):
+    return f"event: {eventName}\ndata: {json.dumps(data)}\n\n"
+
+# Unread report IDs of a user as read from the database, None when the lookup failed
+def readUnreadReportIds(userID):
+    requestStatus = handler.getUnreadReportIds(userID)
+    # Hand the connection back to the pool, a stream sits idle between checks
+    db.session.remove()
+    return requestStatus.get("unreadReportIds", []) if requestStatus["status"] == "Success" else None
+
+# Route streaming unread report updates to the browser, the page still polls the count every few minutes as a fallback
+@main.route('/dashboard/events')
+@login_required
+def reportEventStream():
+    # Every open stream holds a server thread, past the per-process cap the browser keeps polling
+    slots = current_app.extensions['eventStreamSlots']
+    retrySeconds = current_app.config["EVENT_STREAM_RETRY_SECONDS"]
+    if not slots.acquire(blocking=False):
+        response = Response(f"retry: {retrySeconds * 1000}\n\n", status=503, mimetype="text/event-stream")
+        response.headers["Retry-After"] = str(retrySeconds)
+        return response
+
+    userID = current_user.id
+    subscription = reportEvents.subscribe(userID)
+
+    # Runs once the server closes the response, also when the client went away before the first event
+    def closeStream():
+        reportEvents.unsubscribe(userID, subscription)
+        slots.release()
+
+    # Current state goes out first so the badge is right without a separate fetch
+    unreadReportIds = readUnreadReportIds(userID) or []
+    pollSeconds = current_app.config["EVENT_STREAM_POLL_SECONDS"]
+    maxSeconds = current_app.config["EVENT_STREAM_MAX_SECONDS"]
+
+    def generate():
+        lastSentIds = unreadReportIds
+        yield formatServerSentEvent("unreadReports", {
+            "reportCount": len(lastSentIds),
+            "unreadReportIds": lastSentIds
+        })
+
+        # Streams end after maxSeconds so slots and workers are handed over, the browser reconnects by itself
+        closesAt = time.monotonic() + maxSeconds
+        while time.monotonic() < closesAt:
+            try:
+                eventName, data = subscription.get(timeout=pollSeconds)
+                if eventName == "unreadReports":
+                    lastSentIds = data["unreadReportIds"]
+                yield formatServerSentEvent(eventName, data)
+            except queue.Empty:
+                # Only writes made in this process reach the bus, the database also sees other workers' reports
+                currentIds = readUnreadReportIds(userID)
+                if currentIds is not None and currentIds != lastSentIds:
+                    lastSentIds = currentIds
+                    yield formatServerSentEvent("unreadReports", {
+                        "reportCount": len(currentIds),
+                        "unreadReportIds": currentIds
+                    })
+                else:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.call_on_close(closeStream)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 # Route to mark a report as read
 @csrf.exempt
-@app.route('/dashboard/markReportAsRead', methods=['POST'])
+@main.route('/dashboard/markReportAsRead', methods=['POST'])
 @login_required
 def markReportAsRead():
     data = request.get_json()
@@ -407,7 +759,7 @@ def markReportAsRead():
     return jsonify(requestStatus)
 
 @csrf.exempt
-@app.route('/settings', methods=['GET', 'POST'])
+@main.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
     if request.method == 'POST':
@@ -433,35 +785,77 @@ def settings():
 
         # Password change flow
         result = handler.updateUserPassword(current_user.id, current_password, new_password, confirm_password)
+        if result["statusCode"] == 503:
+            return jsonify(result), 503
         return jsonify(result)
 
     return render_template('settings.html', username =current_user.firstName, user=current_user)
 
 # Route to get AccountData 
-@app.route('/dashboard/getAccountData')
+@main.route('/dashboard/getAccountData')
 @login_required
 def getAccountData():
     requestStatus = handler.getAccountData(current_user.id)
     return jsonify(requestStatus)
 
 # Route to get Latest Transactions  
-@app.route('/dashboard/getLatestTransactions')
+@main.route('/dashboard/getLatestTransactions')
 @login_required
 def getLatestTransactions():
     requestStatus = handler.getLatestTransactions(current_user.id)
     return jsonify(requestStatus)
 
 # Route to get Goal List
-@app.route('/dashboard/getGoals')
+@main.route('/dashboard/getGoals')
 @login_required
 def getGoals():
     requestStatus = handler.getGoals(current_user.id)
     return jsonify(requestStatus)
 
 
+# Application factory, importing this module no longer touches the database or builds an app
+def createApp(configObject=Config):
+    if not configObject.SECRET_KEY:
+        raise RuntimeError("Server misconfiguration: ANALYSER_SECRET_KEY is not set in environment.")
 
+    app = Flask(__name__)
+    app.config.from_object(configObject)
 
-if __name__ == '__main__':
-    app.run(debug=True)
-    
+    # Initialize the database with the app, tables are created by "flask init-db" or "flask db upgrade"
+    db.init_app(app)
+    with app.app_context():
+        configureSqliteEngine(db.engine, app.config)
+        installQueryCounter(db.engine)
+    migrate.init_app(app, db)
+    login_manager.init_app(app)
+    csrf.init_app(app)
 
+    # Set session lifetime to 7 days
+    app.permanent_session_lifetime = timedelta(days=7)
+
+    # Initialize serviceHandler to interact with the database and do other operations
+    app.extensions['serviceHandler'] = serviceHandler(
+        cache=createCache(configObject),
+        readFromRollups=configObject.READ_FROM_ROLLUPS,
+        userCacheTtlSeconds=configObject.USER_CACHE_TTL_SECONDS
+    )
+
+    # Password hashing pool sized by the PASSWORD_* settings of this app
+    app.extensions['passwordHasher'] = createPasswordHasher(app.config)
+
+    # Open /dashboard/events streams allowed in this process
+    app.extensions['eventStreamSlots'] = threading.BoundedSemaphore(configObject.EVENT_STREAM_MAX_CONNECTIONS)
+
+    app.register_blueprint(main)
+    return app
+
+# "from app import app" and "flask run" get a default app, built on first access
+def __getattr__(name):
+    if name == 'app':
+        globals()['app'] = createApp()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == '__main__':
+    createApp().run(debug=True)
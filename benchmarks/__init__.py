@@ -0,0 +1,4 @@
+"""
+Standalone performance benchmarks, run with python -m benchmarks.<name>.
+They use a throwaway SQLite database and never touch analyzer.db.
+"""
@@ -0,0 +1,124 @@
+"""
+Measures what the CSRF cookie hook costs per response.
+
+Compares the current hook (cookie only when missing, expiring or rotated) with the old one
+that generated and set a fresh cookie on every response, for a static file and a JSON endpoint.
+
+    python -m benchmarks.csrfCookie --requests 2000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# The app reads its config at import time, so point it at a scratch database first
+os.environ.setdefault("ANALYSER_SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+
+from flask_wtf.csrf import generate_csrf
+from werkzeug.security import generate_password_hash
+from app import app, inject_csrf_token
+from models import db, User
+
+scenarios = {
+    "static": "/static/js/base.js",
+    "json": "/dashboard/getUnreadReportCount",
+}
+
+
+# Previous behaviour: new signed token and Set-Cookie on every response
+def legacyCsrfCookie(response):
+    response.set_cookie('csrf_token', generate_csrf())
+    return response
+
+
+# Swap the registered after_request hook for the one being measured
+def useHook(hook):
+    hooks = app.after_request_funcs.setdefault(None, [])
+    for index, registered in enumerate(hooks):
+        if registered in (inject_csrf_token, legacyCsrfCookie):
+            hooks[index] = hook
+
+
+def createUser():
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(username="benchmark@example.com").first()
+        if user is None:
+            user = User(
+                username="benchmark@example.com",
+                password=generate_password_hash("benchmark"),
+                firstName="Bench",
+                lastName="Mark"
+            )
+            db.session.add(user)
+            db.session.commit()
+        return user.id
+
+
+# Time only the hook on a JSON response, in a fresh request context that already has a current cookie
+def timeHook(hook, cookieHeader, requestCount):
+    latencies = []
+    for _ in range(requestCount):
+        with app.test_request_context(scenarios["json"], headers={"Cookie": cookieHeader}):
+            response = app.response_class("{}", mimetype="application/json")
+            start = time.perf_counter()
+            hook(response)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+# Time one scenario, returns per-request latencies in microseconds and the Set-Cookie count
+def runScenario(client, path, requestCount):
+    latencies = []
+    cookiesSet = 0
+    for _ in range(requestCount):
+        start = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        latencies.append((time.perf_counter() - start) * 1e6)
+        cookiesSet += sum(1 for header in response.headers.getlist("Set-Cookie") if header.startswith("csrf_token="))
+        response.close()
+    return latencies, cookiesSet
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario and hook.")
+    args = parser.parse_args()
+
+    userID = createUser()
+    print(f"{'hook':<8} {'scenario':<8} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'cookies set':>12}")
+
+    for hookName, hook in (("legacy", legacyCsrfCookie), ("current", inject_csrf_token)):
+        useHook(hook)
+        for scenarioName, path in scenarios.items():
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess["_user_id"] = str(userID)
+                sess["_fresh"] = True
+
+            # Warm up the client so the first cookie is already in its jar
+            runScenario(client, path, 10)
+            latencies, cookiesSet = runScenario(client, path, args.requests)
+            p95 = statistics.quantiles(latencies, n=20)[18]
+            print(f"{hookName:<8} {scenarioName:<8} {statistics.mean(latencies):>10.1f} "
+                  f"{statistics.median(latencies):>10.1f} {p95:>10.1f} {cookiesSet:>12}")
+
+    # Hook cost on its own, without the test client overhead that dominates the numbers above
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(userID)
+    client.get(scenarios["json"])
+    cookieHeader = "; ".join(f"{cookie.key}={cookie.value}" for cookie in client._cookies.values())
+    for hookName, hook in (("legacy", legacyCsrfCookie), ("current", inject_csrf_token)):
+        latencies = timeHook(hook, cookieHeader, args.requests)
+        print(f"{hookName:<8} {'hook':<8} {statistics.mean(latencies):>10.1f} {statistics.median(latencies):>10.1f}")
+
+    useHook(inject_csrf_token)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Requests per second of the development server (python app.py) against serve.py.
+
+Each server is started in a subprocess on a scratch SQLite database, then a fixed number of
+client threads send keep-alive GET requests for a fixed duration.
+
+    python -m benchmarks.serverThroughput --path /login --clients 16 --seconds 10
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+projectRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+servers = {
+    # What "python app.py" runs, without the reloader so only one process serves
+    "dev": [sys.executable, "-c",
+            "import sys; from app import app; app.run(port=int(sys.argv[1]), debug=True, use_reloader=False)"],
+    "serve": [sys.executable, "serve.py", "--bind"],
+}
+
+
+def startServer(name, port, environment):
+    command = list(servers[name])
+    command.append(str(port) if name == "dev" else f"127.0.0.1:{port}")
+    process = subprocess.Popen(command, cwd=projectRoot, env=environment,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # Wait until the port accepts requests
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/login")
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start")
+
+
+# Send requests from one client until the deadline, appending latencies in milliseconds
+def runClient(port, path, deadline, latencies, errors):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException):
+            errors.append("connection")
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    connection.close()
+
+
+def measure(port, path, clients, seconds):
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + seconds
+    threads = [threading.Thread(target=runClient, args=(port, path, deadline, latencies, errors))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requestsPerSecond": len(latencies) / seconds,
+        "p50Ms": statistics.median(latencies) if latencies else None,
+        "p99Ms": latencies[int(len(latencies) * 0.99)] if latencies else None,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/login", help="Path every client requests.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent keep-alive clients.")
+    parser.add_argument("--seconds", type=float, default=10, help="Measurement time per server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--servers", default="dev,serve", help="Comma separated: dev, serve.")
+    args = parser.parse_args()
+
+    environment = dict(os.environ)
+    environment.setdefault("ANALYSER_SECRET_KEY", "benchmark-secret")
+    environment.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+
+    print(f"{'server':<8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name in args.servers.split(","):
+        process = startServer(name, args.port, environment)
+        try:
+            # Short warm-up so both servers are measured with compiled templates and open connections
+            measure(args.port, args.path, args.clients, 1)
+            result = measure(args.port, args.path, args.clients, args.seconds)
+        finally:
+            process.terminate()
+            process.wait(30)
+        print(f"{name:<8} {result['requests']:>9} {result['requestsPerSecond']:>9.1f} "
+              f"{result['p50Ms']:>8.1f} {result['p99Ms']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Times the serviceHandler entry points and the live calculations functions on synthetic data.
+
+Each scale ("<users>x<expenses per user>") gets a fresh SQLite database filled by
+benchmarks.syntheticData. Every operation is timed on a sample of users with the payload cache
+invalidated first, so the numbers are for the full uncached path. The calculations functions get
+the inputs the app hands them (SQL totals, goals, an import batch of dates), fetched once per user
+up front. Results are written as JSON and
+can be compared against a stored baseline, the command exits with status 1 when an operation got
+slower than the baseline by more than the tolerance.
+
+    python -m benchmarks.serviceHandlerSuite --scales 20x200,50x2000 --output results.json
+    python -m benchmarks.serviceHandlerSuite --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from benchmarks.syntheticData import createBenchmarkApp, generateDataset
+
+
+def timeRuns(function, arguments, repeats):
+    # One untimed call so lazy imports, compiled statements and templates are not counted
+    function(arguments[0])
+    timings = []
+    for argument in arguments:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function(argument)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "medianMs": round(statistics.median(timings), 3),
+        "p95Ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "minMs": round(timings[0], 3),
+    }
+
+
+# Raise when a serviceHandler call did not succeed, a failing call would otherwise look fast
+def checked(status):
+    if isinstance(status, dict) and status.get("status") == "Failed":
+        raise RuntimeError(status.get("message"))
+    return status
+
+
+def buildOperations(handler, userIDs, generator):
+    import calculations
+    from models import db
+
+    def uncached(function):
+        def run(userID):
+            handler.invalidateUserCache(userID)
+            try:
+                return checked(function(userID))
+            finally:
+                db.session.remove()
+        return run
+
+    def addNewExpense(incremental):
+        def run(userID):
+            data = {"amount": round(generator.uniform(1, 100), 2), "category": "Food", "date": date.today().isoformat()}
+            return checked(handler.addNewExpense(None, userID, data, incremental=incremental))
+        return uncached(run)
+
+    def sendReport(userID):
+        return checked(handler.sendReport(userID, generator.choice([other for other in userIDs if other != userID])))
+
+    def getUsernamesAndIDs(userID):
+        return checked(handler.getUsernamesAndIDs(userID, generator.choice(["ol", "li", "ava", "smith", "son"])))
+
+    # Inputs of the calculations functions, as dbClient returns them to serviceHandler
+    client = handler.DBClient
+    weeklyTotals = {userID: client.getWeeklyExpenseTotals(userID, calculations.getWeeklyCutoffDate())["data"] for userID in userIDs}
+    categoryTotals = {userID: client.getCategoryExpenseTotals(userID, calculations.getCategoryCutoffDate())["data"] for userID in userIDs}
+    goals = {userID: client.getGoalsByUserId(userID)["data"] for userID in userIDs}
+    # One /expense/import batch worth of dates per user
+    importDates = {userID: [row.date for row, _ in zip(client.getExpenseExportRows(userID)["data"], range(1000))] for userID in userIDs}
+    db.session.remove()
+
+    def applyExpenseDelta(userID):
+        today = date.today()
+        pageData = {
+            "expenseAndSalary": {"expenseData": [0] * 12},
+            "weeklyExpense": calculations.getWeeklyExpenseDict(weeklyTotals[userID]),
+            "monthlyCategoryExpenses": calculations.getCategoryExpenseDict(categoryTotals[userID])
+        }
+        delta = calculations.getExpenseDelta(12.5, "Food", today, calculations.getStartOfWeek(today))
+        return calculations.applyExpenseDelta(pageData, delta)
+
+    return {
+        "getDashboardData": uncached(handler.getDashboardData),
+        "getExpensePageData": uncached(handler.getExpensePageData),
+        "addNewExpense": addNewExpense(False),
+        "addNewExpenseIncremental": addNewExpense(True),
+        "sendReport": uncached(sendReport),
+        "getUsernamesAndIDs": uncached(getUsernamesAndIDs),
+        "calculations.getWeeklyExpenseDict": lambda userID: calculations.getWeeklyExpenseDict(weeklyTotals[userID]),
+        "calculations.getCategoryExpenseDict": lambda userID: calculations.getCategoryExpenseDict(categoryTotals[userID]),
+        "calculations.getGoalProgress": lambda userID: calculations.getGoalProgress(goals[userID], 5000.0),
+        "calculations.applyExpenseDelta": applyExpenseDelta,
+        "calculations.getStartOfWeeks": lambda userID: calculations.getStartOfWeeks(importDates[userID]),
+    }
+
+
+def runScale(scale, seed, sampleUsers, repeats, only):
+    users, expensesPerUser = (int(part) for part in scale.split("x"))
+    databasePath = os.path.join(tempfile.mkdtemp(), f"benchmark-{scale}.db")
+    app = createBenchmarkApp(databasePath)
+
+    with app.app_context():
+        handler = app.extensions["serviceHandler"]
+        start = time.perf_counter()
+        dataset = generateDataset(handler, users, expensesPerUser, seed=seed)
+        generateSeconds = time.perf_counter() - start
+
+        generator = random.Random(seed)
+        sample = generator.sample(dataset["userIDs"], min(sampleUsers, users))
+        operations = buildOperations(handler, dataset["userIDs"], generator)
+
+        results = {}
+        for name, function in operations.items():
+            if only and name not in only:
+                continue
+            results[name] = timeRuns(function, sample, repeats)
+            print(f"  {name:<36} median {results[name]['medianMs']:>9.3f} ms   p95 {results[name]['p95Ms']:>9.3f} ms")
+
+    dataset.pop("userIDs")
+    dataset["generateSeconds"] = round(generateSeconds, 2)
+    return {"dataset": dataset, "operations": results}
+
+
+# Operations slower than baseline median * (1 + tolerance) and by more than minimumMs, as (scale, name, baseline, current)
+def findRegressions(results, baseline, tolerance, minimumMs):
+    regressions = []
+    for scale, scaleResults in results["scales"].items():
+        baselineScale = baseline.get("scales", {}).get(scale)
+        if baselineScale is None:
+            continue
+        for name, timing in scaleResults["operations"].items():
+            baselineTiming = baselineScale["operations"].get(name)
+            if baselineTiming is None:
+                continue
+            slowdown = timing["medianMs"] - baselineTiming["medianMs"]
+            if timing["medianMs"] > baselineTiming["medianMs"] * (1 + tolerance) and slowdown > minimumMs:
+                regressions.append((scale, name, baselineTiming["medianMs"], timing["medianMs"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="20x200,50x2000", help="Comma separated <users>x<expenses per user>.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--sample-users", type=int, default=5, help="Users every operation is timed on.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per sampled user.")
+    parser.add_argument("--only", default="", help="Comma separated operation names, all when empty.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="JSON results to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown against the baseline.")
+    parser.add_argument("--minimum-ms", type=float, default=0.5,
+                        help="Slowdowns smaller than this are timer noise and never count as regressions.")
+    args = parser.parse_args()
+
+    only = {name for name in args.only.split(",") if name}
+    results = {
+        "meta": {
+            "createdAt": datetime.now().isoformat(timespec="seconds"),
+            "seed": args.seed,
+            "sampleUsers": args.sample_users,
+            "repeats": args.repeats,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "scales": {},
+    }
+    for scale in args.scales.split(","):
+        print(f"scale {scale}")
+        results["scales"][scale] = runScale(scale, args.seed, args.sample_users, args.repeats, only)
+
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = findRegressions(results, baseline, args.tolerance, args.minimum_ms)
+        for scale, name, baselineMs, currentMs in regressions:
+            print(f"REGRESSION {scale} {name}: {baselineMs:.3f} ms -> {currentMs:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"No operation is more than {args.tolerance:.0%} slower than {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Write throughput of several worker processes sharing one SQLite file, with and without the
+SQLITE_* PRAGMAs from config.py.
+
+Every writer process builds its own app, like a gunicorn worker, and records expenses for its own
+user through dbClient.recordExpense for a fixed duration. Each scenario gets a fresh database file
+because journal_mode=WAL is stored in the file and would carry over to the next run.
+
+The p95 of a single run is mostly how long writers queued for SQLite's one write lock, and swings by
+2-3x between runs of the same scenario. The scenarios are therefore run in alternating rounds and
+compared on the median of the rounds, with the p95 range shown next to it.
+
+    python -m benchmarks.sqliteWrites --writers 4 --seconds 10 --rounds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+os.environ.setdefault("ANALYSER_SECRET_KEY", "benchmark-secret")
+
+# None leaves SQLite's own default for that PRAGMA
+scenarios = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": None,
+        "SQLITE_SYNCHRONOUS": None,
+        "SQLITE_BUSY_TIMEOUT_MS": None,
+        "SQLITE_MMAP_SIZE": None,
+        "SQLITE_CACHE_SIZE": None,
+    },
+    "tuned": {},
+}
+
+
+def buildApp(databasePath, settings):
+    from app import createApp
+    from config import Config, buildEngineOptions
+
+    databaseUri = "sqlite:///" + databasePath
+    benchmarkConfig = type("benchmarkConfig", (Config,), dict(
+        settings,
+        SQLALCHEMY_DATABASE_URI=databaseUri,
+        SQLALCHEMY_ENGINE_OPTIONS=buildEngineOptions(
+            databaseUri, Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW,
+            Config.DB_POOL_PRE_PING, Config.DB_POOL_RECYCLE_SECONDS
+        ),
+        USER_CACHE_TTL_SECONDS=0
+    ))
+    return createApp(benchmarkConfig)
+
+
+def createUsers(app, count):
+    from models import db, User
+
+    with app.app_context():
+        db.create_all()
+        users = [
+            User(username=f"writer{index}@example.com", password="unused", firstName="Bench", lastName="Mark")
+            for index in range(count)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users]
+
+
+# One writer process: record expenses until the deadline and report latencies and lock errors
+def runWriter(databasePath, settings, userID, startAt, seconds, results):
+    app = buildApp(databasePath, settings)
+    latencies = []
+    errors = 0
+    today = date.today()
+
+    with app.app_context():
+        handler = app.extensions["serviceHandler"]
+        while time.time() < startAt:
+            time.sleep(0.001)
+        deadline = startAt + seconds
+        while time.time() < deadline:
+            start = time.perf_counter()
+            response = handler.DBClient.recordExpense(userID, 1.5, "Food", today, today)
+            if response["statusCode"] == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+    results.put((latencies, errors))
+
+
+def measure(name, writers, seconds):
+    databasePath = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    settings = scenarios[name]
+    userIds = createUsers(buildApp(databasePath, settings), writers)
+
+    results = multiprocessing.Queue()
+    startAt = time.time() + 2
+    processes = [
+        multiprocessing.Process(target=runWriter, args=(databasePath, settings, userID, startAt, seconds, results))
+        for userID in userIds
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(latency for writerLatencies, _ in collected for latency in writerLatencies)
+    return {
+        "writes": len(latencies),
+        "writesPerSecond": len(latencies) / seconds,
+        "p50Ms": statistics.median(latencies) if latencies else None,
+        "p95Ms": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        "errors": sum(errors for _, errors in collected),
+    }
+
+
+def formatMs(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent writer processes.")
+    parser.add_argument("--seconds", type=float, default=10, help="Measurement time per scenario.")
+    parser.add_argument("--rounds", type=int, default=5, help="Alternating runs of every scenario.")
+    parser.add_argument("--scenarios", default="default,tuned", help="Comma separated: default, tuned.")
+    args = parser.parse_args()
+
+    names = args.scenarios.split(",")
+    rounds = {name: [] for name in names}
+    print(f"{'scenario':<9} {'writes':>7} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for _ in range(args.rounds):
+        for name in names:
+            result = measure(name, args.writers, args.seconds)
+            rounds[name].append(result)
+            print(f"{name:<9} {result['writes']:>7} {result['writesPerSecond']:>9.1f} "
+                  f"{formatMs(result['p50Ms'])} {formatMs(result['p95Ms'])} {result['errors']:>7}")
+
+    print(f"\nmedian of {args.rounds} rounds")
+    print(f"{'scenario':<9} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p95 range ms':>15} {'errors':>7}")
+    for name, results in rounds.items():
+        p95s = [result["p95Ms"] for result in results if result["p95Ms"] is not None]
+        p50s = [result["p50Ms"] for result in results if result["p50Ms"] is not None]
+        p95Range = f"{min(p95s):.1f}-{max(p95s):.1f}" if p95s else "-"
+        print(f"{name:<9} {statistics.median(result['writesPerSecond'] for result in results):>9.1f} "
+              f"{formatMs(statistics.median(p50s) if p50s else None)} "
+              f"{formatMs(statistics.median(p95s) if p95s else None)} {p95Range:>15} "
+              f"{sum(result['errors'] for result in results):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Seeded synthetic data for benchmarks.
+
+generateDataset fills an empty database with users, a year of expenses and monthly salaries per
+user, a few goals each and some shared reports. The same seed and sizes always give the same rows.
+Spending follows a per-category log-normal amount and a weekly rhythm, salaries land near the
+end of every month, so the charts and rollups see realistic bucket counts.
+
+    from benchmarks.syntheticData import createBenchmarkApp, generateDataset
+    app = createBenchmarkApp("/tmp/bench.db")
+    with app.app_context():
+        generateDataset(app.extensions["serviceHandler"], users=50, expensesPerUser=1000, seed=7)
+"""
+
+import math
+import os
+import random
+from datetime import date, timedelta
+
+os.environ.setdefault("ANALYSER_SECRET_KEY", "benchmark-secret")
+
+# category: (share of expenses, median amount, log-normal sigma)
+categoryProfiles = {
+    "Food": (0.32, 18.0, 0.6),
+    "Shopping": (0.16, 45.0, 0.9),
+    "Bills": (0.12, 80.0, 0.5),
+    "Travel": (0.10, 25.0, 1.1),
+    "Entertainment": (0.10, 30.0, 0.8),
+    "Health": (0.06, 40.0, 0.9),
+    "Rent": (0.04, 1200.0, 0.2),
+    "Other": (0.10, 20.0, 1.0),
+}
+
+firstNames = ["Olivia", "Liam", "Amelia", "Noah", "Isla", "Oliver", "Ava", "Jack", "Mia", "William",
+              "Grace", "Henry", "Chloe", "Lucas", "Zoe", "Thomas", "Ruby", "James", "Emily", "Leo"]
+lastNames = ["Smith", "Jones", "Williams", "Brown", "Wilson", "Taylor", "Nguyen", "Johnson", "Martin",
+             "White", "Anderson", "Walker", "Thompson", "Harris", "Lee", "Ryan", "Robinson", "Kelly"]
+
+# Spending is heavier on weekends (Monday = 0)
+weekdayWeights = [0.8, 0.85, 0.9, 0.95, 1.2, 1.5, 1.3]
+
+goalNames = ["Emergency fund", "Holiday", "New car", "House deposit", "Wedding", "New laptop"]
+
+
+# App on its own SQLite file with the payload and user caches off, so every call does the real work
+def createBenchmarkApp(databasePath, **settings):
+    from app import createApp
+    from config import Config, buildEngineOptions
+
+    databaseUri = "sqlite:///" + databasePath
+    benchmarkConfig = type("benchmarkConfig", (Config,), dict(
+        SQLALCHEMY_DATABASE_URI=databaseUri,
+        SQLALCHEMY_ENGINE_OPTIONS=buildEngineOptions(
+            databaseUri, Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW,
+            Config.DB_POOL_PRE_PING, Config.DB_POOL_RECYCLE_SECONDS
+        ),
+        USER_CACHE_TTL_SECONDS=0,
+        **settings
+    ))
+    return createApp(benchmarkConfig)
+
+
+# Spread of dates over the last year, weighted by weekday
+def buildDayWeights(today):
+    days = [today - timedelta(days=offset) for offset in range(365)]
+    return days, [weekdayWeights[day.weekday()] for day in days]
+
+
+def generateExpenses(generator, userID, count, days, dayWeights):
+    categories = list(categoryProfiles)
+    shares = [categoryProfiles[category][0] for category in categories]
+    expenseDates = generator.choices(days, weights=dayWeights, k=count)
+    expenseCategories = generator.choices(categories, weights=shares, k=count)
+
+    expenses = []
+    for expenseDate, category in zip(expenseDates, expenseCategories):
+        _, median, sigma = categoryProfiles[category]
+        amount = round(generator.lognormvariate(math.log(median), sigma), 2)
+        expenses.append({
+            "userId": userID,
+            "category": category,
+            "amount": max(amount, 0.5),
+            "date": expenseDate,
+            "weekStartDate": expenseDate - timedelta(days=expenseDate.weekday())
+        })
+    return expenses
+
+
+# One salary a month for the last 12 months, around the user's base pay
+def generateSalaries(generator, userID, today):
+    basePay = generator.lognormvariate(math.log(4500), 0.35)
+    salaries = []
+    for monthsAgo in range(12):
+        year, month = divmod(today.year * 12 + today.month - 1 - monthsAgo, 12)
+        salaryDate = date(year, month + 1, min(25, today.day) if monthsAgo == 0 else 25)
+        salaries.append({
+            "userId": userID,
+            "amount": round(basePay * generator.uniform(0.95, 1.1), 2),
+            "salaryDate": salaryDate
+        })
+    return salaries
+
+
+# Zero to three goals whose allocations add up to at most 100 percent
+def generateGoals(generator, userID):
+    goals = []
+    remaining = 100.0
+    for goalName in generator.sample(goalNames, generator.randint(0, 3)):
+        allocation = round(generator.uniform(5, min(40, remaining)), 1)
+        remaining -= allocation
+        goals.append({
+            "userId": userID,
+            "goalName": goalName,
+            "targetAmount": round(generator.lognormvariate(math.log(5000), 0.8), 2),
+            "timeDuration": float(generator.choice([3, 6, 12, 18, 24, 36])),
+            "percentageAllocation": allocation
+        })
+    return goals
+
+
+def generateDataset(handler, users, expensesPerUser, seed=7, reportsPerUser=0.5, batchSize=5000):
+    """
+    Fill the current app's database and return a summary with the user IDs and row counts.
+    Expense counts per user vary between half and one and a half times expensesPerUser.
+    """
+    from sqlalchemy import insert
+    from models import db, User, Expense, Salary, Goal
+
+    generator = random.Random(seed)
+    today = date.today()
+    days, dayWeights = buildDayWeights(today)
+
+    db.create_all()
+    accounts = [
+        User(
+            username=f"user{index}@example.com",
+            # Fixed placeholder, benchmarks never log in and hashing thousands of passwords would dominate
+            password="benchmark",
+            firstName=generator.choice(firstNames),
+            lastName=generator.choice(lastNames),
+        )
+        for index in range(users)
+    ]
+    db.session.add_all(accounts)
+    db.session.commit()
+    userIDs = [account.id for account in accounts]
+
+    counts = {"users": users, "expenses": 0, "salaries": 0, "goals": 0, "reports": 0}
+    balances = {}
+    allocations = {}
+    for userID in userIDs:
+        expenses = generateExpenses(generator, userID, int(expensesPerUser * generator.uniform(0.5, 1.5)), days, dayWeights)
+        salaries = generateSalaries(generator, userID, today)
+        goals = generateGoals(generator, userID)
+
+        for start in range(0, len(expenses), batchSize):
+            db.session.execute(insert(Expense), expenses[start:start + batchSize])
+        db.session.execute(insert(Salary), salaries)
+        if goals:
+            db.session.execute(insert(Goal), goals)
+
+        balances[userID] = sum(salary["amount"] for salary in salaries) - sum(expense["amount"] for expense in expenses)
+        allocations[userID] = sum(goal["percentageAllocation"] for goal in goals)
+        counts["expenses"] += len(expenses)
+        counts["salaries"] += len(salaries)
+        counts["goals"] += len(goals)
+
+    for account in accounts:
+        account.accountBalance = round(balances[account.id], 2)
+        account.previousBalance = account.accountBalance
+        account.goalAllocationPercent = allocations[account.id]
+    db.session.commit()
+
+    status = handler.DBClient.rebuildRollups()
+    if status["status"] != "Success":
+        raise RuntimeError(status.get("message"))
+
+    # Reports go through sendReport so their snapshots are real ones
+    for _ in range(int(users * reportsPerUser)):
+        senderID, receiverID = generator.sample(userIDs, 2)
+        if handler.sendReport(senderID, receiverID)["status"] == "Success":
+            counts["reports"] += 1
+    for userID in userIDs:
+        handler.invalidateUserCache(userID)
+    db.session.remove()
+
+    counts["userIDs"] = userIDs
+    return counts
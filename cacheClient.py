@@ -0,0 +1,124 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+"""
+Per-user payload caches used by the service layer.
+Every backend exposes get, set, update and delete so serviceHandler does not care which one is configured.
+"""
+class memoryCache:
+
+    def __init__(self, maxEntries=1024, ttlSeconds=300, clock=time.monotonic):
+        """In-process LRU cache where every entry expires ttlSeconds after it was stored"""
+        self.maxEntries = maxEntries
+        self.ttlSeconds = ttlSeconds
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    # Return a copy of the cached value, or None if it is missing or expired
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expiresAt, value = entry
+            if expiresAt <= self.clock():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+
+        # Callers are free to mutate what they get back
+        return copy.deepcopy(value)
+
+    # Store a copy of the value and evict the least recently used entry when full
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self.lock:
+            self.entries[key] = (self.clock() + self.ttlSeconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+    # Apply updateFn to a cached value in place, keeping its expiry. Missing entries are left missing.
+    def update(self, key, updateFn):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+
+            expiresAt, value = entry
+            if expiresAt <= self.clock():
+                del self.entries[key]
+                return
+
+            updateFn(value)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class redisCache:
+
+    def __init__(self, client, ttlSeconds=300, prefix="analyser:"):
+        """
+        Cache backed by a Redis compatible client.
+        Only get, set(ex=) and delete are used, so any stand-in with that interface works.
+        """
+        self.client = client
+        self.ttlSeconds = ttlSeconds
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttlSeconds)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    # A get and set here could lose a concurrent update, so the entry is dropped and rebuilt on the next read
+    def update(self, key, updateFn):
+        self.delete(key)
+
+
+class nullCache:
+    """Cache that never keeps anything, every read goes to the database"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def update(self, key, updateFn):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+# Build the cache backend selected in the config
+def createCache(config):
+    backend = getattr(config, "CACHE_BACKEND", "memory")
+    ttlSeconds = getattr(config, "CACHE_TTL_SECONDS", 300)
+
+    if backend == "redis":
+        # Optional dependency, only needed when the redis backend is configured
+        import redis
+        client = redis.Redis.from_url(config.CACHE_REDIS_URL)
+        return redisCache(client, ttlSeconds=ttlSeconds)
+
+    if backend == "none":
+        return nullCache()
+
+    return memoryCache(maxEntries=getattr(config, "CACHE_MAX_ENTRIES", 1024), ttlSeconds=ttlSeconds)
@@ -1,4 +1,15 @@
-from datetime import datetime,timedelta
+from datetime import date,datetime,timedelta
+
+try:
+    # Optional dependency, getStartOfWeeks falls back to a Python loop without it
+    import numpy as np
+except ImportError:
+    np = None
+
+# date.toordinal() of 1970-01-01, the day numpy's datetime64[D] counts from
+epochOrdinal = date(1970, 1, 1).toordinal()
+# Shorter lists are cheaper to loop over than to convert into an array
+vectorMinimumDates = 64
 
 def getAccountData(accBalance,previousBalance):
 
@@ -54,18 +65,6 @@ def getGoalProgress(goalData, accBalance):
 
     return goalProgressDataList
 
-# Returns a list with total expenses for each month (index 0 = Jan, 11 = Dec)
-def getMonthlyExpenseList(data):
-
-    monthlyExpenseList= [0,0,0,0,0,0,0,0,0,0,0,0]
-
-    for expense in data:
-        dateObj = datetime.strptime(expense["date"], "%Y-%m-%d")
-        index = dateObj.month - 1
-        monthlyExpenseList[index]+= float(expense["amount"])
-
-    return monthlyExpenseList
-
 # Calculates 50/30/20 budget rule breakdown from given salary
 def calculate_50_30_20_Percentages(salary):
 
@@ -88,18 +87,15 @@ def getStartOfWeek(inputDate):
     startOfWeek = inputDate - timedelta(days=inputDate.weekday())
     return startOfWeek
 
-#Returns a list of total salary per month from salary data
-def getMonthlySalaryList(salaryData):
-
-    # Initialize list with 12 zeros
-    monthlySalaryList = [0] * 12 
+# Returns the Monday of the week for every date in a list, the batch version of getStartOfWeek used by CSV imports
+def getStartOfWeeks(dates):
 
-    for salary in salaryData:
-        dateObj = datetime.strptime(salary["salaryDate"], "%Y-%m-%d")
-        index = dateObj.month - 1
-        monthlySalaryList[index] += float(salary["amount"])
+    if np is None or len(dates) < vectorMinimumDates:
+        return [inputDate - timedelta(days=inputDate.weekday()) for inputDate in dates]
 
-    return monthlySalaryList
+    # 1970-01-01 was a Thursday, so (days + 3) % 7 is the weekday with Monday as 0
+    days = np.fromiter(map(date.toordinal, dates), dtype=np.int64, count=len(dates)) - epochOrdinal
+    return (days - (days + 3) % 7).astype("datetime64[D]").astype(object).tolist()
 
 # def getcategoryPercentages(categoryExpenseDict):
 
@@ -110,47 +106,109 @@ def getMonthlySalaryList(salaryData):
 
 #     return categoryExpenseDict
 
-#Returns a list of total expenses per month from expense data
-def getExpensePageData(expenseData):
-    
-    # Initialize list with 12 zeros
-    monthlyExpenseList = [0] * 12 
+# Returns the earliest week start shown in the weekly expense chart (past 8 weeks)
+def getWeeklyCutoffDate():
+    return datetime.today().date() - timedelta(weeks=8)
+
+# Returns the first day of the oldest month shown in the category chart (past 5 months approx)
+# Whole months are used so the chart can be served from monthly rollups
+def getCategoryCutoffDate():
+    return (datetime.today().replace(day=1) - timedelta(days=150)).date().replace(day=1)
+
+# Builds the weekly expense chart data from totals already grouped by weekStartDate
+def getWeeklyExpenseDict(weeklyTotals):
+
     weeklyExpenseDict = {}
+
+    for week in weeklyTotals:
+        weekStart = week["weekStartDate"]
+        weekEnd = weekStart + timedelta(days=6)
+        weekLabel = f"{weekStart.day} {weekStart.strftime('%b')} - {weekEnd.day} {weekEnd.strftime('%b')}"
+
+        if weekLabel in weeklyExpenseDict:
+            weeklyExpenseDict[weekLabel] += float(week["amount"])
+        else:
+            weeklyExpenseDict[weekLabel] = float(week["amount"])
+
+    return weeklyExpenseDict
+
+# Builds the month-wise category expense data from totals already grouped by month and category
+def getCategoryExpenseDict(categoryTotals):
+
     categoryExpenseDict = {}
-    
-    for expense in expenseData:
-        dateObj = datetime.strptime(expense["date"], "%Y-%m-%d")
-        index = dateObj.month - 1
-        monthlyExpenseList[index] += float(expense["amount"])
-        
-        # Weekly Expense Data (for past 8 weeks)
-        weekStart = datetime.strptime(expense["weekStartDate"], "%Y-%m-%d").date()
-        if weekStart >= (datetime.today().date() - timedelta(weeks=8)):
-            weekEnd = weekStart + timedelta(days=6)
-            weekLabel = f"{weekStart.day} {weekStart.strftime('%b')} - {weekEnd.day} {weekEnd.strftime('%b')}"
-            
-            if weekLabel in weeklyExpenseDict:
-                weeklyExpenseDict[weekLabel] += float(expense["amount"])
-            else:
-                weeklyExpenseDict[weekLabel] = float(expense["amount"])
-
-
-        # Monthly Category-wise Data (for past 5 months approx)
-        if dateObj.date() >= (datetime.today().replace(day=1) - timedelta(days=150)).date():
-            month = dateObj.strftime("%B")
-            category = expense["category"]
-            amount = float(expense["amount"])
-            
-            if month not in categoryExpenseDict:
-                categoryExpenseDict[month] = {category: amount, "total": amount}
-            elif category not in categoryExpenseDict[month]:
-                categoryExpenseDict[month][category] = amount
-                categoryExpenseDict[month]["total"] += amount
-            else:
-                categoryExpenseDict[month][category] += amount
-                categoryExpenseDict[month]["total"] += amount
-
-    return monthlyExpenseList, weeklyExpenseDict, categoryExpenseDict
-
-
-        
+
+    for row in categoryTotals:
+        month = row["month"].strftime("%B")
+        category = row["category"]
+        amount = float(row["amount"])
+
+        if month not in categoryExpenseDict:
+            categoryExpenseDict[month] = {category: amount, "total": amount}
+        elif category not in categoryExpenseDict[month]:
+            categoryExpenseDict[month][category] = amount
+            categoryExpenseDict[month]["total"] += amount
+        else:
+            categoryExpenseDict[month][category] += amount
+            categoryExpenseDict[month]["total"] += amount
+
+    return categoryExpenseDict
+
+# Returns the change a single new expense makes to the expense page charts
+def getExpenseDelta(amount, category, expenseDate, weekStartDate):
+
+    amount = float(amount)
+    delta = {
+        "amount": amount,
+        "category": category,
+        "monthIndex": None,
+        "weekLabel": None,
+        "categoryMonth": None
+    }
+
+    # Expense page charts only cover the current year
+    if expenseDate.year != datetime.today().year:
+        return delta
+
+    delta["monthIndex"] = expenseDate.month - 1
+
+    if weekStartDate >= getWeeklyCutoffDate():
+        weekEnd = weekStartDate + timedelta(days=6)
+        delta["weekLabel"] = f"{weekStartDate.day} {weekStartDate.strftime('%b')} - {weekEnd.day} {weekEnd.strftime('%b')}"
+
+    if expenseDate >= getCategoryCutoffDate():
+        delta["categoryMonth"] = expenseDate.strftime("%B")
+
+    return delta
+
+# True when a delta only adds to the newest week and month of the charts. Chart labels are kept in
+# date order, a new label for an earlier week or month cannot simply be appended.
+def isLatestChartBucket(delta, expenseDate, weekStartDate):
+
+    today = datetime.today().date()
+    if delta["weekLabel"] is not None and weekStartDate != getStartOfWeek(today):
+        return False
+    if delta["categoryMonth"] is not None and (expenseDate.year, expenseDate.month) != (today.year, today.month):
+        return False
+    return True
+
+# Applies an expense delta to expense page data in place, mirroring the merge done in expense.js
+def applyExpenseDelta(expensePageData, delta):
+
+    if delta["monthIndex"] is None:
+        return expensePageData
+
+    amount = delta["amount"]
+    expensePageData["hasExpense"] = True
+    expensePageData["expenseAndSalary"]["expenseData"][delta["monthIndex"]] += amount
+
+    if delta["weekLabel"] is not None:
+        weeklyExpenseDict = expensePageData.setdefault("weeklyExpense", {})
+        weeklyExpenseDict[delta["weekLabel"]] = weeklyExpenseDict.get(delta["weekLabel"], 0) + amount
+
+    if delta["categoryMonth"] is not None:
+        categoryExpenseDict = expensePageData.setdefault("monthlyCategoryExpenses", {})
+        monthData = categoryExpenseDict.setdefault(delta["categoryMonth"], {"total": 0})
+        monthData[delta["category"]] = monthData.get(delta["category"], 0) + amount
+        monthData["total"] += amount
+
+    return expensePageData
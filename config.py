@@ -3,7 +3,96 @@ import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 defaultDatabaseLocation = "sqlite:///"+ os.path.join(basedir,"analyzer.db")
 
+# In-memory SQLite lives in a single connection, so pool sizing does not apply to it
+def isMemorySqlite(databaseUri):
+    return databaseUri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in databaseUri
+
+# Engine options for Flask-SQLAlchemy, the pool settings only make sense for a real connection pool
+def buildEngineOptions(databaseUri, poolSize, maxOverflow, prePing, recycleSeconds):
+    if isMemorySqlite(databaseUri):
+        return {}
+    return {
+        "pool_size": poolSize,
+        "max_overflow": maxOverflow,
+        "pool_pre_ping": prePing,
+        "pool_recycle": recycleSeconds,
+    }
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or defaultDatabaseLocation
     SECRET_KEY = os.environ.get("ANALYSER_SECRET_KEY")
 
+    # Connection pool per process: pool size plus overflow is the most connections one worker opens
+    DB_POOL_SIZE = int(os.getenv("ANALYSER_DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("ANALYSER_DB_MAX_OVERFLOW", "10"))
+    DB_POOL_PRE_PING = os.getenv("ANALYSER_DB_POOL_PRE_PING", "1") == "1"
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("ANALYSER_DB_POOL_RECYCLE_SECONDS", "1800"))
+    SQLALCHEMY_ENGINE_OPTIONS = buildEngineOptions(
+        SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE_SECONDS
+    )
+
+    # PRAGMAs run on every new SQLite connection, None leaves SQLite's default.
+    # WAL lets readers continue while one writer commits, NORMAL only syncs at checkpoints in WAL mode.
+    SQLITE_JOURNAL_MODE = os.getenv("ANALYSER_SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("ANALYSER_SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("ANALYSER_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("ANALYSER_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Negative values are KiB, so this is a 64 MiB page cache per connection
+    SQLITE_CACHE_SIZE = int(os.getenv("ANALYSER_SQLITE_CACHE_SIZE", str(-64 * 1024)))
+
+    # Per-user payload cache, "memory" (in-process LRU), "redis" or "none".
+    # A memory cache is only invalidated in the process that made the write, serve.py switches it
+    # off when it runs more than one worker, use "redis" there to keep caching.
+    CACHE_BACKEND = os.getenv("ANALYSER_CACHE_BACKEND", "memory")
+    CACHE_TTL_SECONDS = int(os.getenv("ANALYSER_CACHE_TTL_SECONDS", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("ANALYSER_CACHE_MAX_ENTRIES", "1024"))
+    CACHE_REDIS_URL = os.getenv("ANALYSER_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Serve expense and salary totals from the rollup tables, enable after running "flask rebuild-rollups"
+    READ_FROM_ROLLUPS = os.getenv("ANALYSER_READ_FROM_ROLLUPS", "0") == "1"
+
+    # Rows per page of /expense/transactions when no limit is given, and the largest limit accepted
+    TRANSACTIONS_PAGE_SIZE = int(os.getenv("ANALYSER_TRANSACTIONS_PAGE_SIZE", "50"))
+    TRANSACTIONS_MAX_PAGE_SIZE = int(os.getenv("ANALYSER_TRANSACTIONS_MAX_PAGE_SIZE", "1000"))
+
+    # Add X-Query-Count and X-Query-Time-Ms headers to every response, always on in debug mode
+    QUERY_COUNT_HEADERS = os.getenv("ANALYSER_QUERY_COUNT_HEADERS", "0") == "1"
+
+    # Rows validated and written per transaction by the CSV expense import
+    IMPORT_BATCH_SIZE = int(os.getenv("ANALYSER_IMPORT_BATCH_SIZE", "1000"))
+
+    # Keep user rows in memory between requests for this many seconds, 0 disables it.
+    # The cache is per process and a write only clears it in the worker that made it, so it is off by
+    # default and serve.py switches it off when it runs more than one worker.
+    USER_CACHE_TTL_SECONDS = int(os.getenv("ANALYSER_USER_CACHE_TTL_SECONDS", "0"))
+
+    # Password hashing, stored hashes with other parameters are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv("ANALYSER_PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_SALT_LENGTH = int(os.getenv("ANALYSER_PASSWORD_SALT_LENGTH", "16"))
+    # Hashing runs on this many "thread" or "process" workers, with at most PASSWORD_HASH_MAX_QUEUED waiting.
+    # The request thread still waits for its hash, these bound CPU use, callers past them get a 503. See /health
+    PASSWORD_HASH_EXECUTOR = os.getenv("ANALYSER_PASSWORD_HASH_EXECUTOR", "thread")
+    PASSWORD_HASH_WORKERS = int(os.getenv("ANALYSER_PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUED = int(os.getenv("ANALYSER_PASSWORD_HASH_MAX_QUEUED", "32"))
+
+    # Production server (python serve.py): pre-fork gunicorn workers, each with a pool of threads
+    SERVER_BIND = os.getenv("ANALYSER_SERVER_BIND", "127.0.0.1:8000")
+    SERVER_WORKERS = int(os.getenv("ANALYSER_SERVER_WORKERS", str((os.cpu_count() or 1) * 2 + 1)))
+    SERVER_THREADS = int(os.getenv("ANALYSER_SERVER_THREADS", "4"))
+    # Seconds a silent worker may take before it is restarted, and to finish requests on shutdown or reload
+    SERVER_TIMEOUT = int(os.getenv("ANALYSER_SERVER_TIMEOUT", "30"))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv("ANALYSER_SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_KEEPALIVE = int(os.getenv("ANALYSER_SERVER_KEEPALIVE", "5"))
+    # Recycle a worker after this many requests (plus up to the jitter), 0 disables recycling
+    SERVER_MAX_REQUESTS = int(os.getenv("ANALYSER_SERVER_MAX_REQUESTS", "10000"))
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv("ANALYSER_SERVER_MAX_REQUESTS_JITTER", "1000"))
+
+    # Unread report streams (/dashboard/events). Each open stream holds a server thread, so a process
+    # serves at most this many and answers 503 past it, by default half of a serve.py worker's threads.
+    EVENT_STREAM_MAX_CONNECTIONS = int(os.getenv("ANALYSER_EVENT_STREAM_MAX_CONNECTIONS", str(max(1, SERVER_THREADS // 2))))
+    # Seconds between database checks of an idle stream, reports sent through other workers arrive this late at most
+    EVENT_STREAM_POLL_SECONDS = float(os.getenv("ANALYSER_EVENT_STREAM_POLL_SECONDS", "15"))
+    # A stream is closed after this long and the browser reconnects, so slots go round the open tabs
+    EVENT_STREAM_MAX_SECONDS = float(os.getenv("ANALYSER_EVENT_STREAM_MAX_SECONDS", "300"))
+    # Retry hint sent with a 503 when every stream slot is taken
+    EVENT_STREAM_RETRY_SECONDS = int(os.getenv("ANALYSER_EVENT_STREAM_RETRY_SECONDS", "60"))
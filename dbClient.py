@@ -1,7 +1,18 @@
-from models import db,User, Goal, Expense, Salary, ShareReport
-from werkzeug.security import generate_password_hash
-from datetime import datetime
-from sqlalchemy import extract
+from models import db,User, Goal, Expense, Salary, ShareReport, ExpenseRollup, SalaryRollup
+from passwordHasher import passwords, passwordHasherBusy
+from datetime import datetime, date
+from sqlalchemy import extract, func, cast, insert, text, case, or_, and_
+from sqlalchemy.orm import undefer, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.dialects.sqlite import insert as sqliteInsert
+from sqlalchemy.dialects.postgresql import insert as postgresqlInsert
+from reportSnapshot import encodeSnapshot, decodeSnapshot
+from eventBus import reportEvents
+from cacheClient import memoryCache
+from rowTypes import expenseRow, salaryRow
+from searchIndex import (
+    ngramIndex, buildSearchName, normaliseQuery, escapeLike, ftsPhrase, minTrigramQueryLength
+)
 
 """
 Database client class that handles all database operations.
@@ -9,6 +20,19 @@ Provides meaningful error messages to users while logging technical details.
 """
 class dbClient:
 
+    def __init__(self, readFromRollups=False, userCacheTtlSeconds=0, userCacheMaxEntries=1024):
+        """
+        Args:
+            readFromRollups: Serve expense and salary totals from the rollup tables.
+                Only enable once the rollups have been backfilled (flask rebuild-rollups).
+            userCacheTtlSeconds: Keep user rows in memory for this long between requests, 0 disables it.
+                Other processes' changes to a user can be missed for up to this long.
+        """
+        self.readFromRollups = readFromRollups
+        self.searchBackend = None
+        self.userSearchIndex = None
+        self.userCache = memoryCache(maxEntries=userCacheMaxEntries, ttlSeconds=userCacheTtlSeconds) if userCacheTtlSeconds > 0 else None
+
     def handleError(self, error, context="database operation"):
         """
         Centralized error handling method
@@ -26,19 +50,29 @@ class dbClient:
             "message": "A system error occurred. Please try again later."
         }
 
-    # Get the last ID used in a given table
-    def getLastId(self, table):
-        """Returns the highest ID in a table or 0 if empty"""
-        try:
-            lastEntry = table.query.order_by(table.id.desc()).first()
-            return lastEntry.id if lastEntry else 0
-        except Exception as e:
-            print(f"Error getting last ID: {str(e)}")
-            return 0
+    # Response for a password hash or check turned away because the hashing queue is full
+    def passwordHasherBusyStatus(self):
+        return {
+            "status": "Failed",
+            "statusCode": 503,
+            "message": "The server is busy right now. Please try again in a moment."
+        }
+
+    # Get the [start, end) date range of a year so filters stay index friendly
+    def getYearRange(self, year):
+        """Returns the first day of the year and the first day of the next year"""
+        return date(year, 1, 1), date(year + 1, 1, 1)
+
+    # Get the [start, end) date range of a month so filters stay index friendly
+    def getMonthRange(self, year, month):
+        """Returns the first day of the month and the first day of the next month"""
+        if month == 12:
+            return date(year, 12, 1), date(year + 1, 1, 1)
+        return date(year, month, 1), date(year, month + 1, 1)
 
     # Add a new user if the username is not already taken
     def addUser(self, username, password, firstName, lastName):  
-        """Adds new user with auto-incremented ID"""
+        """Adds new user, the ID is assigned by the database"""
         
         try:
             if User.query.filter_by(username=username).first():
@@ -49,17 +83,20 @@ class dbClient:
                     "message": "Email already exists"
                 }
 
-            newId = self.getLastId(User) + 1 
             newUser = User(
-                id=newId,
                 username=username,
-                password=generate_password_hash(password),  
+                password=passwords.hash(password),
                 firstName=firstName,
                 lastName=lastName
             )
             
             db.session.add(newUser)
+            # Flush to run the INSERT and read back the generated ID before commit expires it
+            db.session.flush()
+            newId = newUser.id
             db.session.commit()
+            if self.userSearchIndex is not None:
+                self.userSearchIndex.put(newId, buildSearchName(firstName, lastName))
             return {
                 "status": "Success",
                 "statusCode": 200,
@@ -69,10 +106,31 @@ class dbClient:
                     "userID": newId
                 }
             }
+        except passwordHasherBusy:
+            db.session.rollback()
+            return self.passwordHasherBusyStatus()
         except Exception as e:
             db.session.rollback()
             return self.handleError(e, "user registration")
 
+    # Re-hash a password with the configured cost parameters after it was verified
+    def upgradePasswordHash(self, userID, password):
+        """Returns True if the stored hash was replaced"""
+        try:
+            user = self.getUser(userID, fresh=True)
+            if not user or not passwords.needsRehash(user.password):
+                return False
+
+            user.password = passwords.hash(password)
+            db.session.commit()
+            self.invalidateUser(userID)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            self.handleError(e, "upgrading password hash")
+            return False
+
     # Validate user login credentials
     def checkCredentials(self, username, password): 
         """Validates user credentials with secure error messages"""
@@ -104,11 +162,51 @@ class dbClient:
         except Exception as e:
             return self.handleError(e, "login validation")
         
+    # Cache key of a user row
+    def userCacheKey(self, userID):
+        return f"user:{userID}"
+
+    # Load a user at most once per request, from the cross-request cache when it is fresh
+    def getUser(self, userID, fresh=False):
+        """
+        Returns the User for userID or None.
+        A user already in this request's session is reused. Otherwise cached column values are
+        attached to the session without a query, and only a cache miss reads the users table.
+        Pass fresh=True before a read-modify-write so the row is re-read from the database.
+        """
+        userID = int(userID)
+        if fresh:
+            return db.session.get(User, userID, populate_existing=True)
+
+        user = db.session.identity_map.get(identity_key(User, userID))
+        if user is not None:
+            return user
+
+        if self.userCache is not None:
+            values = self.userCache.get(self.userCacheKey(userID))
+            if values is not None:
+                user = User(**values)
+                make_transient_to_detached(user)
+                db.session.add(user)
+                return user
+
+        user = db.session.get(User, userID)
+        if user is not None and self.userCache is not None:
+            self.userCache.set(self.userCacheKey(userID), {
+                column.key: getattr(user, column.key) for column in User.__table__.columns
+            })
+        return user
+
+    # Drop a user from the cross-request cache after a committed change to their row
+    def invalidateUser(self, userID):
+        if self.userCache is not None:
+            self.userCache.delete(self.userCacheKey(userID))
+
     # Fetch first name of user
     def getUserFirstName(self, userID):
         """Retrieves the first name of the user"""
         try:
-            user = User.query.get(userID)
+            user = self.getUser(userID)
             if user:
                 return {
                     "status": "Success",
@@ -133,7 +231,7 @@ class dbClient:
     def getAccountBalance(self, userID):
         """Retrieves account balance for user"""
         try:
-            user = User.query.get(userID)
+            user = self.getUser(userID)
             if user:
                 return {
                     "status": "Success",
@@ -157,7 +255,7 @@ class dbClient:
     def getPreviousAccountBalance(self, userID):
         """Retrieves previous account balance for user"""
         try:
-            user = User.query.get(userID)
+            user = self.getUser(userID)
             if user:
                 return {
                     "status": "Success",
@@ -181,7 +279,7 @@ class dbClient:
     def checkAndAddGoalAllocation(self, userID, percentageAllocation):
         
         try:
-            user = User.query.get(userID)
+            user = self.getUser(userID, fresh=True)
             if not user:
                 return {
                     "status": "Failed",
@@ -205,6 +303,7 @@ class dbClient:
             else:
                 user.goalAllocationPercent += percentageAllocation
                 db.session.commit()
+                self.invalidateUser(userID)
                 return {
                     "status": "Success",
                     "statusCode": 200,
@@ -219,7 +318,7 @@ class dbClient:
     # Get the last 5 expenses of a user.
     def getLastFiveExpenses(self, userID):
         try:
-            user = User.query.get(userID)
+            user = self.getUser(userID)
             if not user:
                 return {
                     "status": "Failed",
@@ -246,6 +345,78 @@ class dbClient:
         except Exception as e:
             return self.handleError(e, "fetching recent expenses")
 
+    # Page through a user's expenses newest first, keyed on (date, id) instead of OFFSET
+    def getExpenseTransactions(self, userID, limit, after=None, category=None, startDate=None, endDate=None):
+        """Returns a lazy iterator of up to limit expenseRow tuples after the (date, id) cursor, read in batches"""
+        try:
+            query = db.session.query(
+                Expense.id, Expense.category, Expense.amount, Expense.date, Expense.weekStartDate
+            ).filter(Expense.userId == userID)
+
+            if category:
+                query = query.filter(Expense.category == category)
+            if startDate:
+                query = query.filter(Expense.date >= startDate)
+            if endDate:
+                query = query.filter(Expense.date <= endDate)
+            if after:
+                afterDate, afterId = after
+                # Rows strictly older than the cursor, the index on (userId, date) also carries the id
+                query = query.filter(or_(
+                    Expense.date < afterDate,
+                    and_(Expense.date == afterDate, Expense.id < afterId)
+                ))
+
+            # iter() runs the statement here so errors surface now, rows are then fetched 500 at a time
+            rows = iter(query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit).yield_per(500))
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": (expenseRow._make(row) for row in rows)
+            }
+        except Exception as e:
+            return self.handleError(e, "fetching expense transactions")
+
+    # Stream every expense of a user in date order for exports
+    def getExpenseExportRows(self, userID, startDate=None, endDate=None):
+        """Returns a lazy iterator of expenseRow tuples fetched 1000 at a time, oldest first"""
+        try:
+            query = db.session.query(
+                Expense.id, Expense.category, Expense.amount, Expense.date, Expense.weekStartDate
+            ).filter(Expense.userId == userID)
+            if startDate:
+                query = query.filter(Expense.date >= startDate)
+            if endDate:
+                query = query.filter(Expense.date <= endDate)
+
+            rows = iter(query.order_by(Expense.date, Expense.id).yield_per(1000))
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": (expenseRow._make(row) for row in rows)
+            }
+        except Exception as e:
+            return self.handleError(e, "exporting expenses")
+
+    # Stream every salary of a user in date order for exports
+    def getSalaryExportRows(self, userID, startDate=None, endDate=None):
+        """Returns a lazy iterator of salaryRow tuples fetched 1000 at a time, oldest first"""
+        try:
+            query = db.session.query(Salary.id, Salary.amount, Salary.salaryDate).filter(Salary.userId == userID)
+            if startDate:
+                query = query.filter(Salary.salaryDate >= startDate)
+            if endDate:
+                query = query.filter(Salary.salaryDate <= endDate)
+
+            rows = iter(query.order_by(Salary.salaryDate, Salary.id).yield_per(1000))
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": (salaryRow._make(row) for row in rows)
+            }
+        except Exception as e:
+            return self.handleError(e, "exporting salaries")
+
     # Get all goals created by a user
     def getGoalsByUserId(self, userID):
         """Fetches all goals for a given user ID"""
@@ -268,34 +439,310 @@ class dbClient:
         except Exception as e:
             return self.handleError(e, "fetching user goals")
 
-    # Get all expense entries for a user
-    def getMonthlyExpenses(self, userID):
-        """Fetches all expenses for a given user ID"""
-        try:
-            # Get the current year
-            current_year = datetime.now().year
-
-            # Filter expenses by user ID and the current year
-            expenses = Expense.query.filter(
-            Expense.userId == userID,
-            extract('year', Expense.date) == current_year
-        ).all()
-            expensesData = [
+    # Get expense totals per month for the current year, summed in the database
+    def getMonthlyExpenseTotals(self, userID):
+        """Returns a 12 item list of monthly expense totals, or [] if the user has no expenses this year"""
+        try:
+            currentYear = date.today().year
+
+            if self.readFromRollups:
+                rows = (
+                    db.session.query(ExpenseRollup.month, func.sum(ExpenseRollup.total))
+                    .filter(
+                        ExpenseRollup.userId == userID,
+                        ExpenseRollup.year == currentYear,
+                        ExpenseRollup.count > 0
+                    )
+                    .group_by(ExpenseRollup.month)
+                    .all()
+                )
+            else:
+                yearStart, nextYearStart = self.getYearRange(currentYear)
+                month = extract('month', Expense.date)
+                rows = (
+                    db.session.query(month, func.sum(Expense.amount))
+                    .filter(
+                        Expense.userId == userID,
+                        Expense.date >= yearStart,
+                        Expense.date < nextYearStart
+                    )
+                    .group_by(month)
+                    .all()
+                )
+
+            monthlyTotals = []
+            if rows:
+                monthlyTotals = [0] * 12
+                for monthNumber, total in rows:
+                    monthlyTotals[int(monthNumber) - 1] = float(total)
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": monthlyTotals
+            }
+        except Exception as e:
+            return self.handleError(e, "fetching monthly expense totals")
+
+    # Get expense totals per week for the current year, starting from the given week
+    def getWeeklyExpenseTotals(self, userID, sinceDate):
+        """Returns expense totals grouped by weekStartDate, oldest week first"""
+        try:
+            currentYear = date.today().year
+
+            if self.readFromRollups:
+                rows = (
+                    db.session.query(ExpenseRollup.weekStartDate, func.sum(ExpenseRollup.total))
+                    .filter(
+                        ExpenseRollup.userId == userID,
+                        ExpenseRollup.year == currentYear,
+                        ExpenseRollup.weekStartDate >= sinceDate,
+                        ExpenseRollup.count > 0
+                    )
+                    .group_by(ExpenseRollup.weekStartDate)
+                    .order_by(ExpenseRollup.weekStartDate)
+                    .all()
+                )
+            else:
+                yearStart, nextYearStart = self.getYearRange(currentYear)
+                rows = (
+                    db.session.query(Expense.weekStartDate, func.sum(Expense.amount))
+                    .filter(
+                        Expense.userId == userID,
+                        Expense.date >= yearStart,
+                        Expense.date < nextYearStart,
+                        Expense.weekStartDate >= sinceDate
+                    )
+                    .group_by(Expense.weekStartDate)
+                    .order_by(Expense.weekStartDate)
+                    .all()
+                )
+
+            weeklyTotals = [
                 {
-                    "expenseID": expense.id,
-                    "category": expense.category,
-                    "amount": expense.amount,
-                    "date": expense.date.strftime("%Y-%m-%d"),
-                    "weekStartDate": expense.weekStartDate.strftime("%Y-%m-%d"),
-                } for expense in expenses
+                    "weekStartDate": weekStartDate,
+                    "amount": float(total)
+                } for weekStartDate, total in rows
             ]
             return {
                 "status": "Success",
                 "statusCode": 200,
-                "data": expensesData
+                "data": weeklyTotals
             }
         except Exception as e:
-            return self.handleError(e, "fetching monthly expenses")
+            return self.handleError(e, "fetching weekly expense totals")
+
+    # Get expense totals per month and category for the current year, starting from the given month
+    def getCategoryExpenseTotals(self, userID, sinceDate):
+        """Returns expense totals grouped by month and category, sinceDate is the first day of a month"""
+        try:
+            currentYear = date.today().year
+
+            if self.readFromRollups:
+                firstMonth = sinceDate.month if sinceDate.year == currentYear else 1
+                rows = (
+                    db.session.query(ExpenseRollup.month, ExpenseRollup.category, func.sum(ExpenseRollup.total))
+                    .filter(
+                        ExpenseRollup.userId == userID,
+                        ExpenseRollup.year == currentYear,
+                        ExpenseRollup.month >= firstMonth,
+                        ExpenseRollup.count > 0
+                    )
+                    .group_by(ExpenseRollup.month, ExpenseRollup.category)
+                    .order_by(ExpenseRollup.month)
+                    .all()
+                )
+            else:
+                yearStart, nextYearStart = self.getYearRange(currentYear)
+                month = extract('month', Expense.date)
+                rows = (
+                    db.session.query(month, Expense.category, func.sum(Expense.amount))
+                    .filter(
+                        Expense.userId == userID,
+                        Expense.date >= yearStart,
+                        Expense.date < nextYearStart,
+                        Expense.date >= sinceDate
+                    )
+                    .group_by(month, Expense.category)
+                    .order_by(month)
+                    .all()
+                )
+
+            categoryTotals = [
+                {
+                    "month": date(currentYear, int(monthNumber), 1),
+                    "category": category,
+                    "amount": float(total)
+                } for monthNumber, category, total in rows
+            ]
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": categoryTotals
+            }
+        except Exception as e:
+            return self.handleError(e, "fetching category expense totals")
+
+    # Get salary totals per calendar month, summed in the database
+    def getMonthlySalaryTotals(self, userID):
+        """Returns a 12 item list of salary totals per month (all years), or [] if the user has no salaries"""
+        try:
+            if self.readFromRollups:
+                rows = (
+                    db.session.query(SalaryRollup.month, func.sum(SalaryRollup.total))
+                    .filter(
+                        SalaryRollup.userId == userID,
+                        SalaryRollup.count > 0
+                    )
+                    .group_by(SalaryRollup.month)
+                    .all()
+                )
+            else:
+                month = extract('month', Salary.salaryDate)
+                rows = (
+                    db.session.query(month, func.sum(Salary.amount))
+                    .filter(Salary.userId == userID)
+                    .group_by(month)
+                    .all()
+                )
+
+            monthlyTotals = []
+            if rows:
+                monthlyTotals = [0] * 12
+                for monthNumber, total in rows:
+                    monthlyTotals[int(monthNumber) - 1] = float(total)
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": monthlyTotals
+            }
+        except Exception as e:
+            return self.handleError(e, "fetching monthly salary totals")
+
+    # Stage an insert-or-increment of a rollup bucket in the current transaction
+    def upsertRollup(self, model, keyValues, amount, count):
+        """Adds amount and count to the bucket identified by keyValues, creating it if needed. Does not commit."""
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ("sqlite", "postgresql"):
+            insertFunction = sqliteInsert if dialect == "sqlite" else postgresqlInsert
+            statement = insertFunction(model).values(total=float(amount), count=count, **keyValues)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(keyValues.keys()),
+                set_={
+                    "total": model.total + statement.excluded.total,
+                    "count": model.count + statement.excluded.count
+                }
+            )
+            db.session.execute(statement)
+            return
+
+        # Other databases: increment the bucket, or create it when it does not exist yet
+        updatedRows = (
+            model.query
+            .filter_by(**keyValues)
+            .update(
+                {model.total: model.total + float(amount), model.count: model.count + count},
+                synchronize_session=False
+            )
+        )
+        if updatedRows == 0:
+            db.session.add(model(total=float(amount), count=count, **keyValues))
+
+    # Stage the rollup change for an expense. Use a negative amount and count of -1 when removing one.
+    def applyExpenseRollup(self, userID, amount, expenseDate, weekStartDate, category, count=1):
+        self.upsertRollup(
+            ExpenseRollup,
+            {
+                "userId": userID,
+                "year": expenseDate.year,
+                "month": expenseDate.month,
+                "weekStartDate": weekStartDate,
+                "category": category
+            },
+            amount,
+            count
+        )
+
+    # Stage the rollup change for a salary. Use a negative amount and count of -1 when removing one.
+    def applySalaryRollup(self, userID, amount, salaryDate, count=1):
+        self.upsertRollup(
+            SalaryRollup,
+            {
+                "userId": userID,
+                "year": salaryDate.year,
+                "month": salaryDate.month
+            },
+            amount,
+            count
+        )
+
+    # Rebuild the rollup tables from the raw expenses and salaries tables
+    def rebuildRollups(self, userID=None):
+        """Replaces the rollups of one user, or of every user when userID is None, in one transaction"""
+        try:
+            expenseRollups = ExpenseRollup.query
+            salaryRollups = SalaryRollup.query
+            expenses = db.session.query(Expense)
+            salaries = db.session.query(Salary)
+            if userID is not None:
+                expenseRollups = expenseRollups.filter(ExpenseRollup.userId == userID)
+                salaryRollups = salaryRollups.filter(SalaryRollup.userId == userID)
+                expenses = expenses.filter(Expense.userId == userID)
+                salaries = salaries.filter(Salary.userId == userID)
+
+            expenseRollups.delete(synchronize_session=False)
+            salaryRollups.delete(synchronize_session=False)
+
+            expenseYear = cast(extract('year', Expense.date), db.Integer)
+            expenseMonth = cast(extract('month', Expense.date), db.Integer)
+            expenseBuckets = (
+                expenses
+                .with_entities(
+                    Expense.userId, expenseYear, expenseMonth, Expense.weekStartDate, Expense.category,
+                    func.sum(Expense.amount), func.count(Expense.id)
+                )
+                .group_by(Expense.userId, expenseYear, expenseMonth, Expense.weekStartDate, Expense.category)
+            )
+            expenseResult = db.session.execute(
+                insert(ExpenseRollup).from_select(
+                    ["userId", "year", "month", "weekStartDate", "category", "total", "count"],
+                    expenseBuckets
+                )
+            )
+
+            salaryYear = cast(extract('year', Salary.salaryDate), db.Integer)
+            salaryMonth = cast(extract('month', Salary.salaryDate), db.Integer)
+            salaryBuckets = (
+                salaries
+                .with_entities(
+                    Salary.userId, salaryYear, salaryMonth,
+                    func.sum(Salary.amount), func.count(Salary.id)
+                )
+                .group_by(Salary.userId, salaryYear, salaryMonth)
+            )
+            salaryResult = db.session.execute(
+                insert(SalaryRollup).from_select(
+                    ["userId", "year", "month", "total", "count"],
+                    salaryBuckets
+                )
+            )
+
+            db.session.commit()
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "message": "Rollups rebuilt successfully",
+                "data": {
+                    "expenseBuckets": expenseResult.rowcount,
+                    "salaryBuckets": salaryResult.rowcount
+                }
+            }
+        except Exception as e:
+            db.session.rollback()
+            return self.handleError(e, "rebuilding rollups")
 
     # Get the most recent salary received by user
     def getLastSalary(self, userID):
@@ -304,14 +751,13 @@ class dbClient:
             lastSalary = Salary.query.filter_by(userId=userID).order_by(Salary.salaryDate.desc()).first()
             
             if lastSalary:
-                year = lastSalary.salaryDate.year
-                month = lastSalary.salaryDate.month
+                monthStart, nextMonthStart = self.getMonthRange(lastSalary.salaryDate.year, lastSalary.salaryDate.month)
 
                 monthlyTotal = (
                     Salary.query
                     .filter_by(userId=userID)
-                    .filter(db.extract('year', Salary.salaryDate) == year)
-                    .filter(db.extract('month', Salary.salaryDate) == month)
+                    .filter(Salary.salaryDate >= monthStart)
+                    .filter(Salary.salaryDate < nextMonthStart)
                     .with_entities(db.func.sum(Salary.amount))
                     .scalar() or 0
                 )
@@ -356,9 +802,7 @@ class dbClient:
                     "message": f"Goal with name '{data['goalName']}' already exists for user {username}"
                 }
 
-            newGoalId = self.getLastId(Goal) + 1
             newGoal = Goal(
-                id=newGoalId,
                 userId=user.id,
                 goalName=data["goalName"],
                 targetAmount=float(data["targetAmount"]),
@@ -378,20 +822,75 @@ class dbClient:
             db.session.rollback()
             return self.handleError(e, "creating new goal")
         
-    #Fetching usernames, first names, last names, and IDs of all users except the given userID    
-    def getUsernamesAndIDs(self, userID, query):
+    # Pick the name search backend once per client: SQLite FTS5 trigram, Postgres LIKE (pg_trgm) or Python n-grams
+    def getSearchBackend(self):
+        if self.searchBackend is None:
+            dialect = db.session.get_bind().dialect.name
+            if dialect == "postgresql":
+                self.searchBackend = "postgresql"
+            elif dialect == "sqlite" and db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+            ).first():
+                self.searchBackend = "sqliteFts"
+            else:
+                self.searchBackend = "python"
+                self.userSearchIndex = ngramIndex(self.getSearchNames)
+        return self.searchBackend
+
+    # (userID, searchName) pairs for the Python name index, only users above afterUserID when it is given
+    def getSearchNames(self, afterUserID=None):
+        query = db.session.query(User.id, User.searchName)
+        if afterUserID is not None:
+            query = query.filter(User.id > afterUserID)
+        return query.all()
+
+    #Fetching usernames, first names, last names, and IDs of users (except the given userID) whose name matches the query
+    def getUsernamesAndIDs(self, userID, query, limit=10, page=1):
+        """
+        Ranked, paginated substring search on firstName + lastName.
+        Queries shorter than three characters match the start of the name.
+        """
         try:
             # Prepare lowercase query for case-insensitive search
-            query = (query or "").strip().lower()
-
-            # Filter users (excluding current user)
-            users = User.query.filter(User.id != userID).all()
-
-            # Filter based on firstName + lastName containing the query
-            filteredUsers = [
-                user for user in users
-                if query in (user.firstName + user.lastName).lower()
-            ]
+            query = normaliseQuery(query)
+            limit = max(1, min(int(limit), 50))
+            offset = (max(1, int(page)) - 1) * limit
+            backend = self.getSearchBackend()
+
+            if backend == "python":
+                userIDs, hasMore = self.userSearchIndex.search(query, userID, limit, offset)
+                usersByID = {user.id: user for user in User.query.filter(User.id.in_(userIDs)).all()} if userIDs else {}
+                users = [usersByID[foundID] for foundID in userIDs if foundID in usersByID]
+            else:
+                usersQuery = User.query.filter(User.id != userID)
+
+                if len(query) >= minTrigramQueryLength and backend == "sqliteFts":
+                    matchingIDs = text("SELECT rowid FROM users_fts WHERE users_fts MATCH :phrase").bindparams(phrase=ftsPhrase(query))
+                    usersQuery = usersQuery.filter(User.id.in_(matchingIDs))
+                elif len(query) >= minTrigramQueryLength:
+                    # Served by the pg_trgm GIN index on searchName
+                    usersQuery = usersQuery.filter(User.searchName.like(f"%{escapeLike(query)}%", escape="\\"))
+                elif query and backend == "sqliteFts":
+                    # SQLite only uses the index for a case-insensitive LIKE on NOCASE columns, a range works on any
+                    usersQuery = usersQuery.filter(User.searchName >= query, User.searchName < query + "\uffff")
+                elif query:
+                    usersQuery = usersQuery.filter(User.searchName.like(f"{escapeLike(query)}%", escape="\\"))
+
+                isPrefixMatch = User.searchName.like(f"{escapeLike(query)}%", escape="\\")
+                users = (
+                    usersQuery
+                    .order_by(
+                        case((isPrefixMatch, 0), else_=1),
+                        func.length(User.searchName),
+                        User.searchName,
+                        User.id
+                    )
+                    .offset(offset)
+                    .limit(limit + 1)
+                    .all()
+                )
+                hasMore = len(users) > limit
+                users = users[:limit]
 
             userData = [
                 {
@@ -400,142 +899,175 @@ class dbClient:
                     "firstName": user.firstName,
                     "lastName": user.lastName
                 }
-                for user in filteredUsers
+                for user in users
             ]
 
             return {
                 "status": "Success",
                 "statusCode": 200,
-                "data": userData
+                "data": userData,
+                "page": offset // limit + 1,
+                "hasMore": hasMore
             }
 
         except Exception as e:
             return self.handleError(e, "Fetching username and id")
 
-    # Update the previous account balance for a given user
-    def updatePreviousBalance(self, userID, newBalance):
-        """Updates the previous account balance for the specified user"""
+    # Stage an atomic balance change for a user in the current transaction
+    def applyBalanceChange(self, userID, amount):
+        """
+        Moves the current balance into previousBalance and adds amount to it with a
+        single UPDATE, so concurrent writers never overwrite each other's change.
+        Does not commit. Returns False if the user does not exist.
+        """
+        updatedRows = (
+            User.query
+            .filter(User.id == userID)
+            .update(
+                {
+                    User.previousBalance: User.accountBalance,
+                    User.accountBalance: User.accountBalance + float(amount)
+                },
+                synchronize_session=False
+            )
+        )
+        return updatedRows == 1
+
+    # Deduct an expense from the account balance and record it in one transaction
+    def recordExpense(self, userID, amount, category, date, startOfWeek):
+        """Updates the balance and inserts the expense with a single commit"""
         try:
-            user = User.query.get(userID)
-            if not user:
+            if not self.applyBalanceChange(userID, -float(amount)):
+                db.session.rollback()
                 return {
                     "status": "Failed",
                     "statusCode": 404,
-                    "message": f"User not found"
+                    "message": "User not found"
                 }
 
-            user.previousBalance = float(newBalance)
+            newExpense = Expense(
+                userId=userID,
+                amount=amount,
+                category=category,
+                date=date,
+                weekStartDate=startOfWeek
+            )
+
+            db.session.add(newExpense)
+            self.applyExpenseRollup(userID, amount, date, startOfWeek, category)
+            db.session.flush()
+            newId = newExpense.id
             db.session.commit()
+            self.invalidateUser(userID)
 
             return {
                 "status": "Success",
                 "statusCode": 200,
-                "message": f"Previous balance updated to {newBalance} for user."
+                "message": "Expense added successfully",
+                "data": {
+                    "expenseId": newId,
+                    "userId": userID,
+                    "amount": amount,
+                    "category": category,
+                    "date": date
+                }
             }
 
         except Exception as e:
             db.session.rollback()
-            return self.handleError(e, "Updaying previous balance")
-        
-    # Add a new salary entry for a user
-    def addSalary(self, userID, amount, salaryDate):
-        """Adds a new salary entry for the specified user"""
+            return self.handleError(e, "recording new expense")
+
+    # Record a batch of expenses with one balance update, one executemany insert and one commit
+    def recordExpenseBatch(self, userID, expenses):
+        """
+        expenses is a list of dicts with amount, category, date and weekStartDate.
+        The rollup buckets are summed in Python first so each bucket is written once per batch.
+        """
         try:
-            user = User.query.get(userID)
-            if not user:
+            totalAmount = sum(expense["amount"] for expense in expenses)
+            if not self.applyBalanceChange(userID, -totalAmount):
+                db.session.rollback()
                 return {
                     "status": "Failed",
                     "statusCode": 404,
-                    "message": f"User not found"
+                    "message": "User not found"
                 }
 
-            newSalaryId = self.getLastId(Salary) + 1
-
-            newSalary = Salary.addSalary(
-            id=newSalaryId,
-            userId=userID,
-            amount=amount,
-            salaryDate=salaryDate
-                    )
+            db.session.execute(insert(Expense), [dict(expense, userId=userID) for expense in expenses])
+
+            buckets = {}
+            for expense in expenses:
+                expenseDate = expense["date"]
+                key = (expenseDate.year, expenseDate.month, expense["weekStartDate"], expense["category"])
+                bucket = buckets.setdefault(key, [0.0, 0])
+                bucket[0] += expense["amount"]
+                bucket[1] += 1
+            for (year, month, weekStartDate, category), (amount, count) in buckets.items():
+                self.upsertRollup(
+                    ExpenseRollup,
+                    {"userId": userID, "year": year, "month": month, "weekStartDate": weekStartDate, "category": category},
+                    amount,
+                    count
+                )
 
-            db.session.add(newSalary)
             db.session.commit()
+            self.invalidateUser(userID)
 
             return {
                 "status": "Success",
                 "statusCode": 200,
-                "message": f"Salary of {amount} added.",
+                "message": "Expenses added successfully",
                 "data": {
-                    "salaryID": newSalaryId,
-                    "userID": userID,
-                    "amount": amount,
-                    "salaryDate": salaryDate.strftime("%Y-%m-%d")
+                    "count": len(expenses),
+                    "amount": totalAmount
                 }
             }
 
         except Exception as e:
             db.session.rollback()
-            return self.handleError(e, "add salary")
+            return self.handleError(e, "recording expense batch")
 
-    # Update the account balance for a given user
-    def updateAccountBalance(self, userID, newBalance):
-        """Updates the current account balance for the specified user"""
+    # Add a salary to the account balance and record it in one transaction
+    def recordSalary(self, userID, amount, salaryDate):
+        """Updates the balance and inserts the salary with a single commit"""
         try:
-            user = User.query.get(userID)
-            if not user:
+            if not self.applyBalanceChange(userID, float(amount)):
+                db.session.rollback()
                 return {
                     "status": "Failed",
                     "statusCode": 404,
-                    "message": f"User not nfound"
+                    "message": "User not found"
                 }
 
-            user.accountBalance = float(newBalance)
-            db.session.commit()
-
-            return {
-                "status": "Success",
-                "statusCode": 200,
-                "message": f"Account balance updated to {newBalance}"
-            }
-
-        except Exception as e:
-            db.session.rollback()
-            return self.handleError(e, "Updating account balance")
-        
-    # Add a new expense to the database
-    def addNewExpense(self,userId, amount, category, date,startOfWeek):
-        """Adds a new expense with an auto-incremented ID (no description)"""
-        try:
-            newId = (db.session.query(Expense).order_by(Expense.id.desc()).first().id + 1) if db.session.query(Expense).first() else 1
-
-            newExpense = Expense(
-                id=newId,
-                userId=userId,
+            newSalary = Salary.addSalary(
+                userId=userID,
                 amount=amount,
-                category=category,
-                date=date,
-                weekStartDate=startOfWeek
+                salaryDate=salaryDate
             )
 
-            db.session.add(newExpense)
+            db.session.add(newSalary)
+            self.applySalaryRollup(userID, amount, salaryDate)
+            db.session.flush()
+            newSalaryId = newSalary.id
             db.session.commit()
+            self.invalidateUser(userID)
 
             return {
                 "status": "Success",
                 "statusCode": 200,
-                "message": "Expense added successfully",
+                "message": f"Salary of {amount} added.",
                 "data": {
-                    "expenseId": newId,
-                    "userId": userId,
+                    "salaryID": newSalaryId,
+                    "userID": userID,
                     "amount": amount,
-                    "category": category,
-                    "date": date
+                    "salaryDate": salaryDate.strftime("%Y-%m-%d")
                 }
             }
 
         except Exception as e:
-            return self.handleError(e, "Adding new expense")
-        
+            db.session.rollback()
+            return self.handleError(e, "recording new salary")
+
     # Get all expense entries for a user
     # def getUserExpenses(self, userID):
     #     """Fetches all expenses for a given user ID"""
@@ -562,32 +1094,12 @@ class dbClient:
     #             "message": "Error : " + str(e)
     #         }
         
-    # Get all salary entries for a user
-    def getUserSalaries(self, userID):
-        """Fetches all salaries for a given user ID"""
-        try:
-            salaries = Salary.query.filter_by(userId=userID).all()
-            salaryData = [
-                {
-                    "salaryID": salary.id,
-                    "amount": salary.amount,
-                    "salaryDate": salary.salaryDate.strftime("%Y-%m-%d")
-                } for salary in salaries
-            ]
-            return {
-                "status": "Success",
-                "statusCode": 200,
-                "data": salaryData
-            }
-        except Exception as e:
-            return self.handleError(e, "Fetching user salaries")
-
     #Checks if the senderID and receiverID is present in DB.
     def validateUsersExist(self, senderID, receiverID):
         """Validates both sender and receiver users exist in the database"""
         try:
             # Validate sender exists
-            sender = User.query.filter_by(id=senderID).first()
+            sender = self.getUser(senderID)
             if not sender:
                 return {
                     "status": "Failed",
@@ -598,7 +1110,7 @@ class dbClient:
                 }
 
             # Validate receiver exists
-            receiver = User.query.filter_by(id=receiverID).first()
+            receiver = self.getUser(receiverID)
             if not receiver:
                 return {
                     "status": "Failed",
@@ -629,12 +1141,13 @@ class dbClient:
                 senderFirstName=senderFirstName,
                 senderLastName=senderLastName,
                 receiverID=receiverID,
-                data=data,
+                data=encodeSnapshot(data),
                 sharedDate=datetime.now(),
                 readFlag=0
             )
             db.session.add(newReport)
             db.session.commit()
+            self.publishUnreadReports(receiverID)
 
             return {
                 "status": "Success",
@@ -700,11 +1213,41 @@ class dbClient:
         except Exception as e:
             return self.handleError(e, "Fetching sender details")
         
+    # Sender details plus unread report ids of a user from a single query, used by the dashboard bootstrap
+    def getSharedReportSummary(self, userID):
+        try:
+            records = ShareReport.query.filter_by(receiverID=userID).all()
+
+            senders = []
+            unreadReportIds = []
+            for record in records:
+                senders.append({
+                    "reportId": record.id,
+                    "senderID": record.senderID,
+                    "senderFirstName": record.senderFirstName,
+                    "senderLastName": record.senderLastName,
+                    "sharedDate": record.sharedDate.strftime("%Y-%m-%d %H:%M:%S")
+                })
+                if record.readFlag == 0:
+                    unreadReportIds.append(record.id)
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": {
+                    "senders": senders,
+                    "unreadReportIds": unreadReportIds
+                }
+            }
+
+        except Exception as e:
+            return self.handleError(e, "Fetching shared report summary")
+
     #Fetches the shared report based on receiver ID, sender ID, and shared date
     def getReportData(self, userID, senderID, reportID):
        
         try:
-            report = ShareReport.query.filter_by(
+            report = ShareReport.query.options(undefer(ShareReport.data)).filter_by(
                 receiverID=userID,
                 senderID=senderID,
                 id=reportID
@@ -715,7 +1258,7 @@ class dbClient:
                     "status": "Success",
                     "statusCode": 200,
                     "message": "Report found",
-                    "data": report.data
+                    "data": decodeSnapshot(report.data)
                 }
             else:
                 return {
@@ -727,6 +1270,66 @@ class dbClient:
         except Exception as e:
             return self.handleError(e, "report retrieval")
         
+    # Fetches the cached rendered HTML of a shared report, if it was rendered with the given template version
+    def getCachedReportHtml(self, userID, senderID, reportID, templateVersion, includeHtml=True):
+        """
+        Returns the compressed HTML in data["reportHtml"], or None when it has to be rendered.
+        The blob is only read when includeHtml is set and the stored version matches, so a
+        revalidation that ends in a 304 only checks that the report exists.
+        """
+        try:
+            columns = [ShareReport.id]
+            if includeHtml:
+                columns.append(
+                    case((ShareReport.reportHtmlVersion == templateVersion, ShareReport.reportHtml), else_=None)
+                    .label("reportHtml")
+                )
+            report = (
+                db.session.query(*columns)
+                .filter_by(receiverID=userID, senderID=senderID, id=reportID)
+                .first()
+            )
+
+            if not report:
+                return {
+                    "status": "Failed",
+                    "statusCode": 404,
+                    "message": "No matching report found"
+                }
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": {
+                    "reportHtml": report.reportHtml if includeHtml else None
+                }
+            }
+
+        except Exception as e:
+            return self.handleError(e, "cached report retrieval")
+
+    # Stores the rendered HTML of a shared report together with the template version it was rendered with
+    def saveReportHtml(self, reportID, compressedHtml, templateVersion):
+        try:
+            ShareReport.query.filter_by(id=reportID).update(
+                {
+                    ShareReport.reportHtml: compressedHtml,
+                    ShareReport.reportHtmlVersion: templateVersion
+                },
+                synchronize_session=False
+            )
+            db.session.commit()
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "message": "Report HTML cached"
+            }
+
+        except Exception as e:
+            db.session.rollback()
+            return self.handleError(e, "caching report html")
+
     # Fetches all unread shared report IDs for a specific user.
     # A report is considered unread if readFlag == 0 and the receiverID matches the given userId.    
     def getUnreadReportIds(self, userId):
@@ -748,6 +1351,18 @@ class dbClient:
         except Exception as e:
             return self.handleError(e, "Fetching unread report ids")
         
+    # Pushes the current unread report ids and count to the user's open event streams, if any.
+    def publishUnreadReports(self, userId):
+        if not reportEvents.hasSubscribers(userId):
+            return
+
+        status = self.getUnreadReportIds(userId)
+        if status["status"] == "Success":
+            reportEvents.publish(userId, "unreadReports", {
+                "reportCount": len(status["unreadReportIds"]),
+                "unreadReportIds": status["unreadReportIds"]
+            })
+
     # Returns the count of unread shared reports for a specific user.
     # A report is considered unread if readFlag == 0 and receiverID matches the given userId.
     def getUnreadReportCount(self, userId):
@@ -780,6 +1395,7 @@ class dbClient:
             if report:
                 report.readFlag = 1
                 db.session.commit()
+                self.publishUnreadReports(userId)
                 return {
                     "status": "Success",
                     "statusCode": 200,
@@ -799,7 +1415,7 @@ class dbClient:
 
     def getUserSettings(self, userId):
         try:
-            user = User.query.get(userId)
+            user = self.getUser(userId)
 
             if user:
                 return {
@@ -825,7 +1441,7 @@ class dbClient:
 
     def updateUserName(self, userId, firstName, lastName):
         try:
-            user = User.query.get(userId)
+            user = self.getUser(userId, fresh=True)
             if not user:
                 return {
                     "status": "Failed",
@@ -836,6 +1452,9 @@ class dbClient:
             user.firstName = firstName
             user.lastName = lastName
             db.session.commit()
+            self.invalidateUser(userId)
+            if self.userSearchIndex is not None:
+                self.userSearchIndex.put(userId, buildSearchName(firstName, lastName))
 
             return {
                 "status": "Success",
@@ -849,7 +1468,7 @@ class dbClient:
 
     def updateUserPassword(self, userId, newPassword):
         try:
-            user = User.query.get(userId)
+            user = self.getUser(userId, fresh=True)
             if not user:
                 return {
                     "status": "Failed",
@@ -857,8 +1476,9 @@ class dbClient:
                     "message": "User not found"
                 }
 
-            user.password = generate_password_hash(newPassword)
+            user.password = passwords.hash(newPassword)
             db.session.commit()
+            self.invalidateUser(userId)
 
             return {
                 "status": "Success",
@@ -866,6 +1486,9 @@ class dbClient:
                 "message": "Password updated successfully"
             }
 
+        except passwordHasherBusy:
+            db.session.rollback()
+            return self.passwordHasherBusyStatus()
         except Exception as e:
             db.session.rollback()
             return self.handleError(e, "updating user password")
@@ -883,7 +1506,7 @@ class dbClient:
                 }
 
             # Fetch the user
-            user = User.query.get(userId)
+            user = self.getUser(userId, fresh=True)
             if not user:
                 return {
                     "status": "Failed",
@@ -901,6 +1524,7 @@ class dbClient:
 
             # Commit the changes
             db.session.commit()
+            self.invalidateUser(userId)
 
             return {
                 "status": "Success",
@@ -0,0 +1,56 @@
+import queue
+import threading
+
+"""
+In-process publish/subscribe bus used to push per-user notifications to Server-Sent Events streams.
+Only subscribers in the same process receive an event, every worker keeps its own bus. The streams
+also poll the database, which is how changes made in other workers reach them.
+"""
+class eventBus:
+
+    def __init__(self, maxQueuedEvents=16):
+        self.maxQueuedEvents = maxQueuedEvents
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    # Register a new listener for a user and return the queue its events arrive on
+    def subscribe(self, userID):
+        subscription = queue.Queue(maxsize=self.maxQueuedEvents)
+        with self.lock:
+            self.subscribers.setdefault(userID, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, userID, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(userID)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscribers[userID]
+
+    # Lets publishers skip building an event nobody is listening for
+    def hasSubscribers(self, userID):
+        with self.lock:
+            return userID in self.subscribers
+
+    # Deliver an event to every listener of a user without ever blocking the publisher
+    def publish(self, userID, eventName, data):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(userID, ()))
+
+        for subscription in subscriptions:
+            while True:
+                try:
+                    subscription.put_nowait((eventName, data))
+                    break
+                except queue.Full:
+                    # A slow client only needs the latest state, drop its oldest event
+                    try:
+                        subscription.get_nowait()
+                    except queue.Empty:
+                        pass
+
+
+# Bus for shared report notifications, published to by dbClient and streamed by /dashboard/events
+reportEvents = eventBus()
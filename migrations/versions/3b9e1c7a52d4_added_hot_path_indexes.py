@@ -0,0 +1,44 @@
+"""Added composite indexes for per-user lookups.
+
+Revision ID: 3b9e1c7a52d4
+Revises: 7566d8e773a7
+Create Date: 2026-10-17 09:12:41.517203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e1c7a52d4'
+down_revision = '7566d8e773a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.create_index('ix_expenses_userId_date', ['userId', 'date'], unique=False)
+
+    with op.batch_alter_table('goals', schema=None) as batch_op:
+        batch_op.create_index('ix_goals_userId_goalName', ['userId', 'goalName'], unique=False)
+
+    with op.batch_alter_table('salaries', schema=None) as batch_op:
+        batch_op.create_index('ix_salaries_userId_salaryDate', ['userId', 'salaryDate'], unique=False)
+
+    with op.batch_alter_table('shareReports', schema=None) as batch_op:
+        batch_op.create_index('ix_shareReports_receiverID_readFlag', ['receiverID', 'readFlag'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shareReports', schema=None) as batch_op:
+        batch_op.drop_index('ix_shareReports_receiverID_readFlag')
+
+    with op.batch_alter_table('salaries', schema=None) as batch_op:
+        batch_op.drop_index('ix_salaries_userId_salaryDate')
+
+    with op.batch_alter_table('goals', schema=None) as batch_op:
+        batch_op.drop_index('ix_goals_userId_goalName')
+
+    with op.batch_alter_table('expenses', schema=None) as batch_op:
+        batch_op.drop_index('ix_expenses_userId_date')
@@ -0,0 +1,63 @@
+"""Added expense_rollups and salary_rollups tables.
+
+Revision ID: 5d7a0e9b1c62
+Revises: 8c41d2e6f0b3
+Create Date: 2026-10-17 11:26:05.341972
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a0e9b1c62'
+down_revision = '8c41d2e6f0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('expense_rollups',
+    sa.Column('userId', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('weekStartDate', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['userId'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('userId', 'year', 'month', 'weekStartDate', 'category')
+    )
+    op.create_table('salary_rollups',
+    sa.Column('userId', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['userId'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('userId', 'year', 'month')
+    )
+
+    # Backfill from the existing rows, same buckets as dbClient.rebuildRollups
+    if op.get_bind().dialect.name == 'sqlite':
+        expenseYear, expenseMonth = "CAST(strftime('%Y', date) AS INTEGER)", "CAST(strftime('%m', date) AS INTEGER)"
+        salaryYear, salaryMonth = "CAST(strftime('%Y', \"salaryDate\") AS INTEGER)", "CAST(strftime('%m', \"salaryDate\") AS INTEGER)"
+    else:
+        expenseYear, expenseMonth = "CAST(EXTRACT(YEAR FROM date) AS INTEGER)", "CAST(EXTRACT(MONTH FROM date) AS INTEGER)"
+        salaryYear, salaryMonth = "CAST(EXTRACT(YEAR FROM \"salaryDate\") AS INTEGER)", "CAST(EXTRACT(MONTH FROM \"salaryDate\") AS INTEGER)"
+
+    op.execute(
+        'INSERT INTO expense_rollups ("userId", year, month, "weekStartDate", category, total, count) '
+        f'SELECT "userId", {expenseYear}, {expenseMonth}, "weekStartDate", category, SUM(amount), COUNT(id) '
+        f'FROM expenses GROUP BY "userId", {expenseYear}, {expenseMonth}, "weekStartDate", category'
+    )
+    op.execute(
+        'INSERT INTO salary_rollups ("userId", year, month, total, count) '
+        f'SELECT "userId", {salaryYear}, {salaryMonth}, SUM(amount), COUNT(id) '
+        f'FROM salaries GROUP BY "userId", {salaryYear}, {salaryMonth}'
+    )
+
+
+def downgrade():
+    op.drop_table('salary_rollups')
+    op.drop_table('expense_rollups')
@@ -0,0 +1,38 @@
+"""Resync primary key sequences after moving to database generated IDs.
+
+IDs used to be assigned in Python as max(id) + 1, so on Postgres the SERIAL
+sequences were never advanced. SQLite allocates rowids from the current
+maximum and needs no change.
+
+Revision ID: 8c41d2e6f0b3
+Revises: 3b9e1c7a52d4
+Create Date: 2026-10-17 10:03:27.884120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d2e6f0b3'
+down_revision = '3b9e1c7a52d4'
+branch_labels = None
+depends_on = None
+
+tables = ['users', 'goals', 'expenses', 'salaries', 'shareReports']
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in tables:
+        op.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM \"{table}\"), 0) + 1, false)"
+        )
+
+
+def downgrade():
+    # Sequences ahead of max(id) are harmless, nothing to undo
+    pass
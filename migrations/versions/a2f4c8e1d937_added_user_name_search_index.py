@@ -0,0 +1,54 @@
+"""Added searchName column and name search indexes on users.
+
+Revision ID: a2f4c8e1d937
+Revises: 5d7a0e9b1c62
+Create Date: 2026-10-17 12:48:13.092516
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from searchIndex import sqliteSearchIndexDDL, sqliteSupportsTrigram
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2f4c8e1d937'
+down_revision = '5d7a0e9b1c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('searchName', sa.String(length=200), nullable=True))
+
+    op.execute('UPDATE users SET "searchName" = LOWER("firstName" || "lastName")')
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.create_index('ix_users_searchName', 'users', ['searchName'], unique=False,
+                        postgresql_ops={'searchName': 'text_pattern_ops'})
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_users_searchName_trgm ON users USING gin ("searchName" gin_trgm_ops)')
+    else:
+        op.create_index('ix_users_searchName', 'users', ['searchName'], unique=False)
+
+    if dialect == 'sqlite' and sqliteSupportsTrigram(op.get_bind().connection.driver_connection):
+        for statement in sqliteSearchIndexDDL:
+            op.execute(statement)
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for name in ['users_fts_ai', 'users_fts_ad', 'users_fts_au']:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute('DROP TABLE IF EXISTS users_fts')
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_users_searchName_trgm')
+
+    op.drop_index('ix_users_searchName', table_name='users')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('searchName')
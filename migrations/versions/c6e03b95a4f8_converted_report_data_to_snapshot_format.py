@@ -0,0 +1,72 @@
+"""Converted shareReports.data from pickle to the report snapshot format.
+
+The column keeps its binary type, only the stored bytes change.
+
+Revision ID: c6e03b95a4f8
+Revises: a2f4c8e1d937
+Create Date: 2026-10-17 14:05:52.660318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import pickle
+
+from reportSnapshot import encodeSnapshot, decodeSnapshot, snapshotMagic
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e03b95a4f8'
+down_revision = 'a2f4c8e1d937'
+branch_labels = None
+depends_on = None
+
+batchSize = 500
+
+shareReports = sa.table(
+    'shareReports',
+    sa.column('id', sa.Integer),
+    sa.column('data', sa.LargeBinary)
+)
+
+
+def convertRows(convert):
+    connection = op.get_bind()
+    lastId = 0
+    while True:
+        rows = connection.execute(
+            sa.select(shareReports.c.id, shareReports.c.data)
+            .where(shareReports.c.id > lastId)
+            .order_by(shareReports.c.id)
+            .limit(batchSize)
+        ).fetchall()
+        if not rows:
+            break
+
+        for reportId, data in rows:
+            newData = convert(bytes(data))
+            if newData is not None:
+                connection.execute(
+                    shareReports.update()
+                    .where(shareReports.c.id == reportId)
+                    .values(data=newData)
+                )
+        lastId = rows[-1][0]
+
+
+def upgrade():
+    # Existing rows were written by this application's own PickleType column
+    def toSnapshot(data):
+        if data.startswith(snapshotMagic):
+            return None
+        return encodeSnapshot(pickle.loads(data))
+
+    convertRows(toSnapshot)
+
+
+def downgrade():
+    def toPickle(data):
+        if not data.startswith(snapshotMagic):
+            return None
+        return pickle.dumps(decodeSnapshot(data))
+
+    convertRows(toPickle)
@@ -1,12 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwordHasher import passwords
 from datetime import date,datetime
 from flask_login import UserMixin
+from sqlalchemy import event
+from searchIndex import buildSearchName, sqliteSearchIndexDDL, sqliteSupportsTrigram
 
 db = SQLAlchemy()
 
 class User(UserMixin,db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Prefix lookups for short autocomplete queries, text_pattern_ops lets Postgres use it for LIKE
+        db.Index('ix_users_searchName', 'searchName', postgresql_ops={'searchName': 'text_pattern_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # Unique ID for each user
     username = db.Column(db.String(80), unique=True, nullable=False)  
@@ -17,22 +23,68 @@ class User(UserMixin,db.Model):
     accountBalance = db.Column(db.Float, nullable=False, default=0.0)
     previousBalance = db.Column(db.Float, nullable=False, default=0.0)
     goalAllocationPercent = db.Column(db.Float, nullable=False, default=0.0)
+    # lower(firstName + lastName), kept up to date by the listeners below
+    searchName = db.Column(db.String(200), nullable=True)
 
     # Method to verify the password
     def checkPassword(self, password):
-        return check_password_hash(self.password, password)
+        return passwords.verify(self.password, password)
     
     def createUser(username, password, firstName, lastName):
         """Helper method to create new user with hashed password"""
         return User(
             username=username,
-            password=generate_password_hash(password),
+            password=passwords.hash(password),
             firstName=firstName,
             lastName=lastName
         )
 
+# Keep searchName in step with the name columns on every insert and update
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def setSearchName(mapper, connection, target):
+    target.searchName = buildSearchName(target.firstName, target.lastName)
+
+# Create the SQLite trigram index together with the users table, when the SQLite build supports it
+@event.listens_for(User.__table__, 'after_create')
+def createSqliteSearchIndex(target, connection, **kwargs):
+    if connection.dialect.name != 'sqlite':
+        return
+    if not sqliteSupportsTrigram(connection.connection.driver_connection):
+        return
+    for statement in sqliteSearchIndexDDL:
+        connection.exec_driver_sql(statement)
+
+# Apply the SQLITE_* PRAGMAs from the app config to every new connection of a SQLite engine
+def configureSqliteEngine(engine, config):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT_MS')),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE')),
+        ('cache_size', config.get('SQLITE_CACHE_SIZE')),
+    ]
+    statements = [f"PRAGMA {name} = {value}" for name, value in pragmas if value is not None]
+    if not statements:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def applySqlitePragmas(dbapiConnection, connectionRecord):
+        cursor = dbapiConnection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
 class Goal(db.Model):
     __tablename__ = 'goals'
+    __table_args__ = (
+        db.Index('ix_goals_userId_goalName', 'userId', 'goalName'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     userId = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -43,6 +95,10 @@ class Goal(db.Model):
 
 class Expense(db.Model):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        # Covers per-user date range scans and the latest transactions lookup
+        db.Index('ix_expenses_userId_date', 'userId', 'date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True) 
     userId = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False) 
@@ -53,6 +109,9 @@ class Expense(db.Model):
 
 class Salary(db.Model):
     __tablename__ = 'salaries'
+    __table_args__ = (
+        db.Index('ix_salaries_userId_salaryDate', 'userId', 'salaryDate'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     userId = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -60,23 +119,52 @@ class Salary(db.Model):
     salaryDate = db.Column(db.Date, default=date.today, nullable=False)
 
     @classmethod
-    def addSalary(cls,id, userId, amount, salaryDate):
+    def addSalary(cls, userId, amount, salaryDate):
         """Helper method to create a new salary record"""
         return cls(
-        id=id,
         userId=userId,
         amount=float(amount),
         salaryDate=salaryDate
             )
 
+class ExpenseRollup(db.Model):
+    """Pre-summed expenses per user, month, week and category, kept in step with the expenses table"""
+    __tablename__ = 'expense_rollups'
+
+    userId = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    weekStartDate = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class SalaryRollup(db.Model):
+    """Pre-summed salaries per user and month, kept in step with the salaries table"""
+    __tablename__ = 'salary_rollups'
+
+    userId = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
 class ShareReport(db.Model):
     __tablename__ = 'shareReports'
+    __table_args__ = (
+        # Covers the inbox listing and the unread report count/ids lookups
+        db.Index('ix_shareReports_receiverID_readFlag', 'receiverID', 'readFlag'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     senderID = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     senderFirstName = db.Column(db.String(100), nullable=False)
     senderLastName = db.Column(db.String(100), nullable=False)
     receiverID = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    data = db.Column(db.PickleType, nullable=False) 
+    # Compressed, versioned report snapshot (see reportSnapshot.py). Deferred so inbox listings never load it.
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))
     sharedDate = db.Column(db.DateTime, nullable=False, default=datetime.now)
-    readFlag = db.Column(db.Integer,nullable=False)
\ No newline at end of file
+    readFlag = db.Column(db.Integer,nullable=False)
+    # zlib-compressed report.html rendered from data, valid while reportHtmlVersion matches the template version
+    reportHtml = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    reportHtmlVersion = db.Column(db.String(32), nullable=True)
@@ -0,0 +1,133 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.local import LocalProxy
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+"""
+Runs password hashing and verification on a bounded worker pool.
+The request thread still waits for the result, so the pool frees no server threads. What it bounds is
+the CPU: at most workers hashes run at once, at most maxQueued more wait for a worker, and further
+callers get passwordHasherBusy straight away instead of queueing behind a burst of logins.
+createApp builds one hasher per app from its PASSWORD_* settings. stats() is per process,
+/health reports the numbers of the worker that answers it.
+"""
+
+
+class passwordHasherBusy(RuntimeError):
+    """Raised when the hashing queue is full"""
+
+
+class passwordHasher:
+
+    def __init__(self, method="scrypt", saltLength=16, workers=2, maxQueued=32, executor="thread"):
+        """
+        Args:
+            method: werkzeug hash method, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:1000000".
+                Hashes made with another method are upgraded by needsRehash callers.
+            workers: Number of threads or processes doing the hashing.
+            maxQueued: Operations allowed to wait for a free worker before callers are turned away.
+            executor: "thread" (hashlib releases the GIL while hashing) or "process".
+        """
+        self.method = method
+        self.saltLength = saltLength
+        self.workers = workers
+        self.maxQueued = maxQueued
+        self.executorType = executor
+        self.executor = None
+        self.executorPid = None
+        self.methodPrefix = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(workers + maxQueued)
+        self.pending = 0
+        self.peakQueueDepth = 0
+        self.completed = 0
+        self.rejected = 0
+
+    # Create the pool on first use, and again in a forked child since pools do not survive fork
+    def getExecutor(self):
+        with self.lock:
+            if self.executor is None or self.executorPid != os.getpid():
+                if self.executorType == "process":
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="passwordHasher")
+                self.executorPid = os.getpid()
+            return self.executor
+
+    # Run fn(*args) on the pool and wait for the result, or raise passwordHasherBusy if the queue is full
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise passwordHasherBusy("Password hashing queue is full")
+
+        with self.lock:
+            self.pending += 1
+            self.peakQueueDepth = max(self.peakQueueDepth, self.pending - self.workers)
+
+        completed = False
+        try:
+            result = self.getExecutor().submit(fn, *args).result()
+            completed = True
+            return result
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.completed += completed
+            self.slots.release()
+
+    # Queue depth counters, queueDepth is how many operations are waiting for a worker right now
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "maxQueued": self.maxQueued,
+                "inFlight": self.pending,
+                "queueDepth": max(0, self.pending - self.workers),
+                "peakQueueDepth": self.peakQueueDepth,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+    def hash(self, password):
+        return self.submit(generate_password_hash, password, self.method, self.saltLength)
+
+    def verify(self, passwordHash, password):
+        return self.submit(check_password_hash, passwordHash, password)
+
+    # True when a stored hash was made with other cost parameters than the configured ones
+    def needsRehash(self, passwordHash):
+        if self.methodPrefix is None:
+            # werkzeug fills in default parameters, so read the canonical prefix off a real hash
+            self.methodPrefix = self.hash("").split("$", 1)[0]
+        return passwordHash.split("$", 1)[0] != self.methodPrefix
+
+
+# Build the hasher from the PASSWORD_* settings of an app config
+def createPasswordHasher(config):
+    return passwordHasher(
+        method=config.get("PASSWORD_HASH_METHOD", "scrypt"),
+        saltLength=config.get("PASSWORD_SALT_LENGTH", 16),
+        workers=config.get("PASSWORD_HASH_WORKERS", 2),
+        maxQueued=config.get("PASSWORD_HASH_MAX_QUEUED", 32),
+        executor=config.get("PASSWORD_HASH_EXECUTOR", "thread")
+    )
+
+
+defaultHasher = None
+
+# Hasher of the current app, outside an app context one built from the Config defaults on first use
+def getPasswordHasher():
+    global defaultHasher
+    if has_app_context():
+        return current_app.extensions['passwordHasher']
+    if defaultHasher is None:
+        defaultHasher = createPasswordHasher(vars(Config))
+    return defaultHasher
+
+
+# Hasher used by the User model and dbClient
+passwords = LocalProxy(getPasswordHasher)
@@ -0,0 +1,89 @@
+import contextlib
+import contextvars
+import time
+from sqlalchemy import event
+
+"""
+Counts and times the SQL statements an engine runs while counting is switched on.
+
+Counting is per context (a request, a test or a thread), so concurrent requests never see each
+other's statements. The engine hooks cost one context variable lookup per statement while no
+counter is active.
+
+    with countQueries() as stats:
+        handler.getDashboardData(userID)
+    print(stats.count, stats.totalMs)
+
+    with maxQueries(5):
+        handler.getDashboardData(userID)    # AssertionError listing the statements if it runs more
+"""
+
+
+class queryStats:
+
+    def __init__(self, keepStatements=True):
+        self.count = 0
+        self.totalMs = 0.0
+        self.keepStatements = keepStatements
+        self.statements = []
+
+    def record(self, statement, elapsedMs):
+        self.count += 1
+        self.totalMs += elapsedMs
+        if self.keepStatements:
+            self.statements.append(statement)
+
+
+# Counter of the current context, None while counting is off
+currentStats = contextvars.ContextVar("currentQueryStats", default=None)
+
+
+def beforeCursorExecute(connection, cursor, statement, parameters, context, executemany):
+    if currentStats.get() is not None:
+        connection.info.setdefault("queryStartTimes", []).append(time.perf_counter())
+
+
+def afterCursorExecute(connection, cursor, statement, parameters, context, executemany):
+    stats = currentStats.get()
+    if stats is None:
+        return
+    startTimes = connection.info.get("queryStartTimes")
+    # Counting may have been switched on between the two hooks of a statement
+    elapsedMs = (time.perf_counter() - startTimes.pop()) * 1000 if startTimes else 0.0
+    stats.record(statement, elapsedMs)
+
+
+# Register the hooks on an engine once, further calls are no-ops
+def installQueryCounter(engine):
+    if not event.contains(engine, "before_cursor_execute", beforeCursorExecute):
+        event.listen(engine, "before_cursor_execute", beforeCursorExecute)
+        event.listen(engine, "after_cursor_execute", afterCursorExecute)
+
+
+# Switch counting on for the current context, returns the stats and a token for stopCounting
+def startCounting(keepStatements=True):
+    stats = queryStats(keepStatements)
+    return stats, currentStats.set(stats)
+
+
+def stopCounting(token):
+    currentStats.reset(token)
+
+
+@contextlib.contextmanager
+def countQueries(keepStatements=True):
+    stats, token = startCounting(keepStatements)
+    try:
+        yield stats
+    finally:
+        stopCounting(token)
+
+
+# Fail when the block runs more than limit statements, the message lists them
+@contextlib.contextmanager
+def maxQueries(limit):
+    with countQueries() as stats:
+        yield stats
+    if stats.count > limit:
+        statements = "\n".join(f"  {index}. {statement}" for index, statement in enumerate(stats.statements, 1))
+        raise AssertionError(f"Expected at most {limit} queries, {stats.count} ran:\n{statements}")
@@ -0,0 +1,95 @@
+import json
+import struct
+import zlib
+
+"""
+Binary snapshot format for shared reports (ShareReport.data).
+
+Layout, all integers big-endian:
+    magic      4 bytes  b"WWRS"
+    version    1 byte   currently 1
+    sections   2 bytes  number of sections
+    per section:
+        nameLength  1 byte
+        name        nameLength bytes, utf-8
+        bodyLength  4 bytes
+    section bodies, in the same order, each zlib-compressed compact JSON
+
+Every top-level key of the report is its own section, so one field can be read
+by decompressing only that section.
+"""
+
+snapshotMagic = b"WWRS"
+snapshotVersion = 1
+
+headerFormat = ">4sBH"
+sectionLengthFormat = ">I"
+
+
+class SnapshotError(ValueError):
+    """Raised when a blob is not a snapshot this module can read"""
+
+
+# Encode a report dict (top-level keys become sections) into snapshot bytes
+def encodeSnapshot(report, compressionLevel=6):
+    names = []
+    bodies = []
+    for name, value in report.items():
+        names.append(name.encode("utf-8"))
+        body = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        bodies.append(zlib.compress(body, compressionLevel))
+
+    parts = [struct.pack(headerFormat, snapshotMagic, snapshotVersion, len(names))]
+    for name, body in zip(names, bodies):
+        parts.append(struct.pack(">B", len(name)) + name + struct.pack(sectionLengthFormat, len(body)))
+    parts.extend(bodies)
+    return b"".join(parts)
+
+
+# Read the section table: returns {name: (offset, length)} without touching the bodies
+def readSectionTable(blob):
+    blob = bytes(blob)
+    headerSize = struct.calcsize(headerFormat)
+    if len(blob) < headerSize:
+        raise SnapshotError("Snapshot is truncated")
+
+    magic, version, sectionCount = struct.unpack_from(headerFormat, blob, 0)
+    if magic != snapshotMagic:
+        raise SnapshotError("Not a report snapshot")
+    if version != snapshotVersion:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+
+    position = headerSize
+    entries = []
+    for _ in range(sectionCount):
+        nameLength = blob[position]
+        position += 1
+        name = blob[position:position + nameLength].decode("utf-8")
+        position += nameLength
+        (bodyLength,) = struct.unpack_from(sectionLengthFormat, blob, position)
+        position += struct.calcsize(sectionLengthFormat)
+        entries.append((name, bodyLength))
+
+    table = {}
+    for name, bodyLength in entries:
+        table[name] = (position, bodyLength)
+        position += bodyLength
+    return table
+
+
+# Decode a single top-level field of a snapshot
+def decodeSection(blob, name):
+    table = readSectionTable(blob)
+    if name not in table:
+        raise KeyError(name)
+    offset, length = table[name]
+    return json.loads(zlib.decompress(bytes(blob)[offset:offset + length]))
+
+
+# Decode a whole snapshot back into the report dict
+def decodeSnapshot(blob):
+    blob = bytes(blob)
+    return {
+        name: json.loads(zlib.decompress(blob[offset:offset + length]))
+        for name, (offset, length) in readSectionTable(blob).items()
+    }
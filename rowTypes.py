@@ -0,0 +1,61 @@
+"""
+Typed rows for the paths that stream raw expenses and salaries: the paginated transactions list
+and the CSV and NDJSON exports. Dashboard and chart totals are summed in SQL and never build rows.
+
+Dates stay datetime.date objects all the way through, they are only turned into "YYYY-MM-DD"
+strings by toJson() or the CSV writer when a row leaves the app in a response.
+"""
+
+from typing import NamedTuple
+from datetime import date
+
+
+class expenseRow(NamedTuple):
+    # Entry type in the NDJSON ledger export
+    ledgerType = "expense"
+
+    expenseID: int
+    category: str
+    amount: float
+    date: date
+    weekStartDate: date
+
+    # JSON friendly dict with ISO dates
+    def toJson(self):
+        return {
+            "expenseID": self.expenseID,
+            "category": self.category,
+            "amount": self.amount,
+            "date": self.date.isoformat(),
+            "weekStartDate": self.weekStartDate.isoformat()
+        }
+
+
+class salaryRow(NamedTuple):
+    # Entry type in the NDJSON ledger export
+    ledgerType = "salary"
+
+    salaryID: int
+    amount: float
+    salaryDate: date
+
+    # JSON friendly dict with ISO dates
+    def toJson(self):
+        return {
+            "salaryID": self.salaryID,
+            "amount": self.amount,
+            "salaryDate": self.salaryDate.isoformat()
+        }
+
+
+# Opaque keyset cursor for the transaction history, "<date>.<id>" of the last row on a page
+def encodeTransactionCursor(row):
+    return f"{row.date.isoformat()}.{row.expenseID}"
+
+
+# (date, id) from a cursor made by encodeTransactionCursor, raises ValueError when it is malformed
+def decodeTransactionCursor(cursor):
+    cursorDate, separator, cursorId = cursor.partition(".")
+    if not separator:
+        raise ValueError("Malformed cursor")
+    return date.fromisoformat(cursorDate), int(cursorId)
@@ -0,0 +1,149 @@
+import threading
+import time
+
+"""
+Helpers for the user name search used by the share-report autocomplete.
+Names are matched as a substring of lower(firstName + lastName), stored in users.searchName.
+"""
+
+# SQLite FTS5 trigram index over users.searchName, kept in sync by triggers
+sqliteSearchIndexDDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "searchName, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, searchName) VALUES (new.id, new.searchName); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, searchName) VALUES ('delete', old.id, old.searchName); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF searchName ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, searchName) VALUES ('delete', old.id, old.searchName); "
+    "INSERT INTO users_fts(rowid, searchName) VALUES (new.id, new.searchName); END",
+]
+
+# Trigram queries need at least this many characters, shorter ones are matched as a prefix
+minTrigramQueryLength = 3
+
+
+# Build the normalised name that searches match against
+def buildSearchName(firstName, lastName):
+    return ((firstName or "") + (lastName or "")).lower()
+
+
+# Normalise a raw autocomplete query the same way as the stored names
+def normaliseQuery(query):
+    return (query or "").strip().lower()
+
+
+# Escape LIKE wildcards so user input is matched literally (use with escape="\\")
+def escapeLike(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Quote a query as a single FTS5 phrase
+def ftsPhrase(value):
+    return '"' + value.replace('"', '""') + '"'
+
+
+# Check whether the SQLite library behind a DBAPI connection has FTS5 with the trigram tokenizer
+def sqliteSupportsTrigram(dbapiConnection):
+    try:
+        dbapiConnection.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(a, tokenize='trigram')")
+        dbapiConnection.execute("DROP TABLE temp.trigram_probe")
+        return True
+    except Exception:
+        return False
+
+
+# Sort key shared by every backend: prefix matches first, then shorter names, then alphabetical
+def rankKey(searchName, userID, query):
+    return (not searchName.startswith(query), len(searchName), searchName, userID)
+
+
+class ngramIndex:
+
+    def __init__(self, loadEntries, refreshSeconds=60, fullRefreshSeconds=3600, clock=time.monotonic):
+        """
+        Pure Python trigram index, used when the database has no native substring index.
+        loadEntries(afterUserID) returns (userID, searchName) pairs of the users with a higher ID,
+        or of every user when afterUserID is None.
+        Every refreshSeconds only users added since the last load are read, so sign-ups handled by
+        other workers show up without reloading the table. Names changed in other workers are picked
+        up by the full reload every fullRefreshSeconds, local writes go through put straight away.
+        """
+        self.loadEntries = loadEntries
+        self.refreshSeconds = refreshSeconds
+        self.fullRefreshSeconds = fullRefreshSeconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.names = {}
+        self.grams = {}
+        self.loadedAt = None
+        self.refreshedAt = None
+        # Highest user ID read from the database, put() does not move it so no loaded range has gaps
+        self.lastLoadedID = None
+
+    def gramsOf(self, value):
+        return {value[i:i + minTrigramQueryLength] for i in range(len(value) - minTrigramQueryLength + 1)}
+
+    def rebuild(self):
+        names = {}
+        grams = {}
+        for userID, searchName in self.loadEntries(None):
+            searchName = searchName or ""
+            names[userID] = searchName
+            for gram in self.gramsOf(searchName):
+                grams.setdefault(gram, set()).add(userID)
+
+        with self.lock:
+            self.names = names
+            self.grams = grams
+            self.loadedAt = self.refreshedAt = self.clock()
+            self.lastLoadedID = max(names, default=None)
+
+    # Read only the users added after the last load
+    def loadNewEntries(self):
+        entries = self.loadEntries(self.lastLoadedID)
+        for userID, searchName in entries:
+            self.put(userID, searchName or "")
+
+        with self.lock:
+            self.refreshedAt = self.clock()
+            self.lastLoadedID = max([self.lastLoadedID or 0] + [userID for userID, _ in entries])
+
+    # Add or replace a single name after a local write
+    def put(self, userID, searchName):
+        with self.lock:
+            oldName = self.names.get(userID)
+            if oldName is not None:
+                for gram in self.gramsOf(oldName):
+                    self.grams.get(gram, set()).discard(userID)
+
+            self.names[userID] = searchName
+            for gram in self.gramsOf(searchName):
+                self.grams.setdefault(gram, set()).add(userID)
+
+    # Return (userIDs for the requested page, hasMore)
+    def search(self, query, excludeUserID, limit, offset):
+        now = self.clock()
+        if self.loadedAt is None or now - self.loadedAt >= self.fullRefreshSeconds:
+            self.rebuild()
+        elif now - self.refreshedAt >= self.refreshSeconds:
+            self.loadNewEntries()
+
+        with self.lock:
+            if len(query) >= minTrigramQueryLength:
+                # Candidates must contain every trigram of the query, then confirm the substring
+                candidates = None
+                for gram in self.gramsOf(query):
+                    ids = self.grams.get(gram, set())
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        break
+                matches = [userID for userID in (candidates or ()) if query in self.names[userID]]
+            else:
+                matches = [userID for userID, name in self.names.items() if name.startswith(query)]
+
+            matches = [userID for userID in matches if userID != excludeUserID]
+            matches.sort(key=lambda userID: rankKey(self.names[userID], userID, query))
+
+        page = matches[offset:offset + limit + 1]
+        return page[:limit], len(page) > limit
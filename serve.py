@@ -0,0 +1,121 @@
+import argparse
+import sys
+from config import Config
+
+"""
+Production entry point: python serve.py
+
+Runs the app under gunicorn with pre-forked workers using the threaded (gthread) worker class.
+The app is imported once in the master and shared with the workers through fork, each worker then
+drops the database connections it inherited and opens its own before taking traffic.
+
+Graceful reloads:
+    kill -HUP <master pid>     restart workers one by one with the same code, in-flight requests finish
+    kill -USR2 <master pid>    start a new master with the new code, then kill -TERM the old master
+"""
+
+
+# Open this worker's own database connections and compile every template before the first request
+def warmUpWorker(app, threads):
+    from models import db
+
+    with app.app_context():
+        # Connections created in the master before fork must not be shared between processes
+        db.engine.dispose(close=False)
+
+        pool = db.engine.pool
+        connectionCount = min(threads, pool.size()) if hasattr(pool, "size") else 1
+        connections = [db.engine.connect() for _ in range(max(connectionCount, 1))]
+        for connection in connections:
+            connection.exec_driver_sql("SELECT 1")
+        for connection in connections:
+            connection.close()
+
+    templateNames = app.jinja_env.list_templates()
+    for templateName in templateNames:
+        app.jinja_env.get_template(templateName)
+    return len(connections), len(templateNames)
+
+
+# gunicorn post_fork hook
+def postFork(server, worker):
+    connectionCount, templateCount = warmUpWorker(worker.app.wsgi(), worker.cfg.threads)
+    worker.log.info(f"Warmed up {connectionCount} database connection(s) and {templateCount} template(s)")
+
+
+# App config for the given worker count, with the caches that only work inside one process switched off
+def buildAppConfig(config, workers):
+    """
+    Returns config itself, or a subclass with the overrides, and a list of warnings to log.
+    A memory cache is only invalidated in the worker that made the write, every other worker would
+    keep serving the old payload until it expires.
+    """
+    overrides = {}
+    warnings = []
+    if workers > 1 and config.CACHE_BACKEND == "memory":
+        overrides["CACHE_BACKEND"] = "none"
+        warnings.append(f"The memory payload cache is per process, it is off with {workers} workers. "
+                        "Set ANALYSER_CACHE_BACKEND=redis to share one cache between them.")
+    if workers > 1 and config.USER_CACHE_TTL_SECONDS > 0:
+        overrides["USER_CACHE_TTL_SECONDS"] = 0
+        warnings.append(f"The user row cache is per process, it is off with {workers} workers.")
+    if not overrides:
+        return config, warnings
+    return type("servedConfig", (config,), overrides), warnings
+
+
+# gunicorn options from the SERVER_* settings, command line overrides win
+def buildServerOptions(config, overrides=None):
+    options = {
+        "bind": config.SERVER_BIND,
+        "workers": config.SERVER_WORKERS,
+        "worker_class": "gthread",
+        "threads": config.SERVER_THREADS,
+        "timeout": config.SERVER_TIMEOUT,
+        "graceful_timeout": config.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": config.SERVER_KEEPALIVE,
+        "max_requests": config.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": config.SERVER_MAX_REQUESTS_JITTER,
+        "preload_app": True,
+        "post_fork": postFork,
+    }
+    options.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run WalletWhiz under gunicorn.")
+    parser.add_argument("--bind", help=f"Address to listen on (default {Config.SERVER_BIND}).")
+    parser.add_argument("--workers", type=int, help=f"Worker processes (default {Config.SERVER_WORKERS}).")
+    parser.add_argument("--threads", type=int, help=f"Threads per worker (default {Config.SERVER_THREADS}).")
+    args = parser.parse_args()
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("serve.py needs gunicorn (pip install gunicorn), it runs on Linux and macOS only.")
+
+    class walletWhizServer(BaseApplication):
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        # Called once in the master because preload_app is set
+        def load(self):
+            from app import createApp
+            return createApp(appConfig)
+
+    options = buildServerOptions(Config, {"bind": args.bind, "workers": args.workers, "threads": args.threads})
+    appConfig, warnings = buildAppConfig(Config, options["workers"])
+    for warning in warnings:
+        print(f"serve.py: {warning}", file=sys.stderr)
+    walletWhizServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 from dbClient import dbClient
+from cacheClient import nullCache
 import calculations
-from datetime import datetime
-from models import User
+from datetime import datetime, date
+import heapq
+import csv
+import math
+from rowTypes import decodeTransactionCursor
+from passwordHasher import passwordHasherBusy
 
 class serviceHandler():
     """
@@ -9,9 +14,31 @@ class serviceHandler():
     Handles business logic, data validation, and orchestrates database operations with calculations.
     """
 
-    def __init__(self):
-        """Initialize the service handler with a database client instance"""
-        self.DBClient = dbClient()
+    def __init__(self, cache=None, readFromRollups=False, userCacheTtlSeconds=0):
+        """Initialize the service handler with a database client and a per-user payload cache, caching is off without one"""
+        self.DBClient = dbClient(readFromRollups=readFromRollups, userCacheTtlSeconds=userCacheTtlSeconds)
+        self.cache = cache if cache is not None else nullCache()
+
+    # Sections the dashboard bootstrap route can return, named after the routes they replace
+    bootstrapSections = ("unreadReportCount", "unreadReportIds", "senderDetails",
+                         "accountData", "latestTransactions")
+
+    # Cache key of the dashboard payload for a user
+    def dashboardCacheKey(self, userID):
+        return f"dashboard:{userID}"
+
+    # Cache key of the expense page payload for a user
+    def expensePageCacheKey(self, userID):
+        return f"expensePage:{userID}"
+
+    # Drop every cached payload of a user after a write that changes them
+    def invalidateUserCache(self, userID):
+        self.cache.delete(self.dashboardCacheKey(userID))
+        self.cache.delete(self.expensePageCacheKey(userID))
+
+    # Load the logged in user for Flask-Login, at most one users query per request
+    def loadUser(self, userID):
+        return self.DBClient.getUser(userID)
 
     # def checkCredentials(self,username, password):
     #     status = self.DBClient.checkCredentials(username, password)
@@ -107,6 +134,7 @@ class serviceHandler():
                 
                 #Getting Account Balance
                 if status["status"] == "Success":
+                    self.invalidateUserCache(userID)
                     accBalanceStatus = self.DBClient.getAccountBalance(userID)
 
                     #Get all goal details from db
@@ -146,39 +174,21 @@ class serviceHandler():
                 }
             
         salaryDate = datetime.strptime(data["salaryDate"], "%Y-%m-%d").date()
-            
-        status = self.DBClient.getAccountBalance(userID)
-
-        if status["status"] == "Success":
-            #Update the previous Account Balance
-            previousAccBalance = status["data"]["accountBalance"]
-            status = self.DBClient.updatePreviousBalance(userID,float(previousAccBalance) )
-
-            if status["status"] == "Success":
-                newBalance = float(previousAccBalance) + float(data["amount"])
-                status = self.DBClient.updateAccountBalance(userID, newBalance)
-
-                if status["status"] == "Success":
-                    status = self.DBClient.addSalary(userID,float(data["amount"]),salaryDate)
 
-                    if status["status"] == "Success":
-                        salaryDataListStatus = self.DBClient.getUserSalaries(userID)
+        #Update the balance and store the salary in one transaction
+        status = self.DBClient.recordSalary(userID, float(data["amount"]), salaryDate)
 
-                        if salaryDataListStatus["status"] == "Success" and salaryDataListStatus["data"] != []:
-                            monthlySalaryList = calculations.getMonthlySalaryList(salaryDataListStatus["data"])
-
-                            status["data"]["newSalaryData"] = monthlySalaryList
-                            return status
-                        else:
-                            return salaryDataListStatus
-                    else:
-                        return status
+        if status["status"] == "Success":
+            self.invalidateUserCache(userID)
+            salaryTotalsStatus = self.DBClient.getMonthlySalaryTotals(userID)
 
+            if salaryTotalsStatus["status"] == "Success" and salaryTotalsStatus["data"] != []:
+                status["data"]["newSalaryData"] = salaryTotalsStatus["data"]
                 return status
             else:
-                return status
-        else:
-            return status
+                return salaryTotalsStatus
+
+        return status
     
     """
     Record a new expense and update account balance
@@ -187,11 +197,15 @@ class serviceHandler():
         username (str): Username (unused in current implementation)
         userID (int): ID of the user
         data (dict): Expense data including amount, category and date
+        incremental (bool): Return only the chart delta of the new expense
+            instead of rebuilding the whole expense page data
         
     Returns:
-        dict: Status with updated expense page data if successful
+        dict: Status with updated expense page data (or its delta) if successful. In incremental
+            mode an expense in an earlier week or month than the current one would add its chart
+            label out of date order, so the rebuilt page data is returned as data.expensePageData
     """
-    def addNewExpense(self,username,userID,data):
+    def addNewExpense(self,username,userID,data,incremental=False):
 
         try:
 
@@ -207,38 +221,147 @@ class serviceHandler():
             startOfWeek = calculations.getStartOfWeek(data["date"])
             date = datetime.strptime(data["date"], "%Y-%m-%d").date()
             
-            status = self.DBClient.getAccountBalance(userID)
+            #Update the balance and store the expense in one transaction
+            status = self.DBClient.recordExpense(userID, data["amount"], data["category"], date, startOfWeek)
 
             if status["status"] == "Success":
-                #Update the previous Account Balance
-                previousAccBalance = status["data"]["accountBalance"]
-                status = self.DBClient.updatePreviousBalance(userID,float(previousAccBalance) )
-
-                if status["status"] == "Success":
-                    newBalance = float(previousAccBalance) - float(data["amount"])
-                    status = self.DBClient.updateAccountBalance(userID, newBalance)
+                delta = calculations.getExpenseDelta(data["amount"], data["category"], date, startOfWeek) if incremental else None
+                if delta is not None and calculations.isLatestChartBucket(delta, date, startOfWeek):
+                    #Patch the cached expense page with this expense only, the client merges the same delta.
+                    self.cache.delete(self.dashboardCacheKey(userID))
+                    self.cache.update(self.expensePageCacheKey(userID), lambda expenseData: calculations.applyExpenseDelta(expenseData, delta))
+                    return {
+                        "status": "Success",
+                        "statusCode": 200,
+                        "message": "Expense added successfully",
+                        "data": {
+                            "delta": delta
+                        }
+                    }
 
-                    if status["status"] == "Success":
-                        status = self.DBClient.addNewExpense(userID, data["amount"], data["category"], date,startOfWeek)
-                        # return status #for testing
+                self.invalidateUserCache(userID)
 
-                        if status["status"] == "Success":
-                            #Call functions to update the graph data for expense page.
-                            expensePageData = self.getExpensePageData(userID)
-                            return expensePageData
-                        else:
-                            return status
+                #Call functions to update the graph data for expense page.
+                expensePageData = self.getExpensePageData(userID)
+                if delta is not None and "status" not in expensePageData:
+                    return {
+                        "status": "Success",
+                        "statusCode": 200,
+                        "message": "Expense added successfully",
+                        "data": {
+                            "expensePageData": expensePageData
+                        }
+                    }
+                return expensePageData
 
-                    else:
-                        return status
-                else:
-                    return status
-            else:
-                return status
+            return status
             
         except Exception as e:
             return self.handleError(e, "adding new expense")
         
+    # Column names an import CSV must have, matched case-insensitively; other columns are ignored
+    importColumns = ("date", "category", "amount")
+    # Row errors listed in an import summary, further bad rows are only counted
+    maxImportErrors = 20
+
+    # Validate one CSV row into expense values, returns (expense, None) or (None, reason)
+    def parseImportRow(self, row, columns):
+        try:
+            amount = float(row[columns["amount"]])
+        except (TypeError, ValueError):
+            return None, "amount is not a number"
+        if not (amount > 0 and math.isfinite(amount)):
+            return None, "amount must be positive"
+
+        category = (row[columns["category"]] or "").strip()
+        if not category or len(category) > 100:
+            return None, "category must be 1 to 100 characters"
+
+        try:
+            expenseDate = date.fromisoformat((row[columns["date"]] or "").strip())
+        except ValueError:
+            return None, "date must be YYYY-MM-DD"
+
+        return {"amount": amount, "category": category, "date": expenseDate}, None
+
+    """
+    Import expenses from a CSV statement, read as a stream and written in batches
+
+    Args:
+        userID (int): ID of the user
+        lines (iterable): Text lines of a CSV with date, category and amount columns
+        batchSize (int): Valid rows written per transaction
+
+    Returns:
+        dict: Status with the number of imported and skipped rows and the first row errors.
+            Batches committed before a failure stay imported, the summary says how many.
+    """
+    def importExpenses(self,userID,lines,batchSize=1000):
+        summary = {"imported": 0, "amount": 0.0, "batches": 0, "skipped": 0, "errors": []}
+        try:
+            reader = csv.DictReader(lines)
+            columns = {name.strip().lower(): name for name in (reader.fieldnames or []) if name}
+            if any(name not in columns for name in self.importColumns):
+                return {
+                    "status": "Failed",
+                    "statusCode": 400,
+                    "message": "CSV header must contain date, category and amount columns"
+                }
+
+            batch = []
+
+            for row in reader:
+                expense, error = self.parseImportRow(row, columns)
+                if error is not None:
+                    summary["skipped"] += 1
+                    if len(summary["errors"]) < self.maxImportErrors:
+                        summary["errors"].append({"line": reader.line_num, "message": error})
+                    continue
+
+                batch.append(expense)
+                if len(batch) == batchSize:
+                    status = self.saveImportBatch(userID, batch, summary)
+                    if status["status"] != "Success":
+                        return status
+                    batch = []
+
+            if batch:
+                status = self.saveImportBatch(userID, batch, summary)
+                if status["status"] != "Success":
+                    return status
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "message": f"Imported {summary['imported']} expenses",
+                "data": summary
+            }
+
+        except (csv.Error, UnicodeDecodeError) as e:
+            # Batches committed before the error stay imported, the summary tells the caller how many
+            return {"status": "Failed", "statusCode": 400, "message": f"Could not read the CSV file: {e}", "data": summary}
+        except Exception as e:
+            status = self.handleError(e, "importing expenses")
+            status["data"] = summary
+            return status
+
+    # Write one import batch and drop the user's cached payloads once for the whole batch
+    def saveImportBatch(self, userID, batch, summary):
+        weekStartDates = calculations.getStartOfWeeks([expense["date"] for expense in batch])
+        for expense, weekStartDate in zip(batch, weekStartDates):
+            expense["weekStartDate"] = weekStartDate
+
+        status = self.DBClient.recordExpenseBatch(userID, batch)
+        if status["status"] != "Success":
+            status["data"] = summary
+            return status
+
+        self.invalidateUserCache(userID)
+        summary["imported"] += status["data"]["count"]
+        summary["amount"] += status["data"]["amount"]
+        summary["batches"] += 1
+        return status
+
     """
     Retrieve a user's first name
     
@@ -269,16 +392,8 @@ class serviceHandler():
     def getMonthlyExpenses(self,userID):
 
         try:
-            #Get the expense data for the user
-            status = self.DBClient.getMonthlyExpenses(userID)
-
-            if status["status"] == "Success" and status["data"] != []:
-
-                #Get the monthly expenses in a list.
-                monthlyExpenseList = calculations.getMonthlyExpenseList(status["data"])
-                status["data"] = monthlyExpenseList
-                return status
-            
+            #Get the monthly expense totals for the user, already summed by the database.
+            status = self.DBClient.getMonthlyExpenseTotals(userID)
             return status
             
         except Exception as e:
@@ -300,10 +415,17 @@ class serviceHandler():
     def getDashboardData(self,userID):
 
         try:
+            #Serve repeat loads from the cache, writes invalidate it.
+            cachedData = self.cache.get(self.dashboardCacheKey(userID))
+            if cachedData is not None:
+                return cachedData
 
             dashboardData = {}
+            # Every lookup the payload is built from, it is only cached when all of them succeeded
+            dbStatuses = []
 
             accBalanceStatus = self.DBClient.getAccountBalance(userID)
+            dbStatuses.append(accBalanceStatus)
 
             accountBalance = 0.0
             previousBalance = 0.0
@@ -315,6 +437,7 @@ class serviceHandler():
                     dashboardData["hasAccountBalance"] = True
 
                     previousAccBalanceStatus = self.DBClient.getPreviousAccountBalance(userID)
+                    dbStatuses.append(previousAccBalanceStatus)
                     if previousAccBalanceStatus["status"] == "Success":
                         previousBalance = previousAccBalanceStatus["data"]["previousBalance"]
                     accountData = calculations.getAccountData(float(accountBalance),float(previousBalance))
@@ -329,6 +452,7 @@ class serviceHandler():
 
             #Fetch GoalData:
             getGoalsStatus = self.DBClient.getGoalsByUserId(userID)
+            dbStatuses.append(getGoalsStatus)
             #Get the goal progress
             if getGoalsStatus["status"] == "Success" and getGoalsStatus["data"] != []:
                 goalProgressList = calculations.getGoalProgress(getGoalsStatus["data"],float(accountBalance))
@@ -344,14 +468,14 @@ class serviceHandler():
             #     dashboardData["reportCount"] = sharedReportNumberStatus["data"]["reportCount"]
 
             #Fetch Montly expenses:
-            status = self.DBClient.getMonthlyExpenses(userID)
+            status = self.DBClient.getMonthlyExpenseTotals(userID)
+            dbStatuses.append(status)
             if status["status"] == "Success" and status["data"] != []:
-                #Get the monthly expenses in a list.
-                monthlyExpenseList = calculations.getMonthlyExpenseList(status["data"])
                 dashboardData["hasExpense"] = True
-                dashboardData["monthlySpendData"] = monthlyExpenseList
+                dashboardData["monthlySpendData"] = status["data"]
                 
                 lastestExpensestatus = self.DBClient.getLastFiveExpenses(userID)
+                dbStatuses.append(lastestExpensestatus)
 
                 if lastestExpensestatus["status"] == "Success":
                     dashboardData["transaction"] = lastestExpensestatus["data"]["transaction"]
@@ -362,6 +486,7 @@ class serviceHandler():
 
             #Fetch BudgetSuggestionData:
             salaryStatus  = self.DBClient.getLastSalary(userID)
+            dbStatuses.append(salaryStatus)
             if  salaryStatus["status"] == "Success" and salaryStatus["data"] != None:
                 salarySuggestions = calculations.calculate_50_30_20_Percentages(float(salaryStatus["data"]["amount"]))
                 salarySuggestions["salaryDate"] = salaryStatus["data"]["salaryDate"]
@@ -371,6 +496,8 @@ class serviceHandler():
                 dashboardData["hasSalary"] = False
                 dashboardData["budgetSuggestionData"] = {}
 
+            if all(dbStatus["status"] == "Success" for dbStatus in dbStatuses):
+                self.cache.set(self.dashboardCacheKey(userID), dashboardData)
             return dashboardData
         
         except Exception as e:
@@ -391,35 +518,47 @@ class serviceHandler():
     def getExpensePageData(self,userID):
 
         try:
+            cachedData = self.cache.get(self.expensePageCacheKey(userID))
+            if cachedData is not None:
+                return cachedData
+
             expenseData = {}
             expenseAndSalary = {}
 
-            salaryDataListStatus = self.DBClient.getUserSalaries(userID)
+            salaryTotalsStatus = self.DBClient.getMonthlySalaryTotals(userID)
 
-            if salaryDataListStatus["status"] == "Success" and salaryDataListStatus["data"] != []:
-                monthlySalaryList = calculations.getMonthlySalaryList(salaryDataListStatus["data"])
+            if salaryTotalsStatus["status"] == "Success" and salaryTotalsStatus["data"] != []:
                 expenseData["hasSalary"] = True
-                expenseAndSalary["salaryData"] = monthlySalaryList
+                expenseAndSalary["salaryData"] = salaryTotalsStatus["data"]
                 expenseData["expenseAndSalary"] = expenseAndSalary
             else:
                 expenseData["hasSalary"] = False
                 expenseAndSalary["salaryData"] = [0,0,0,0,0,0,0,0,0,0,0,0]
                 expenseData["expenseAndSalary"] = expenseAndSalary
 
-            expenseDataListStatus = self.DBClient.getMonthlyExpenses(userID)
-            if expenseDataListStatus["status"] == "Success" and expenseDataListStatus["data"] != []:
-                monthlyExpenseList,weeklyExpense,categoryexpensePercentage = calculations.getExpensePageData(expenseDataListStatus["data"])
+            expenseTotalsStatus = self.DBClient.getMonthlyExpenseTotals(userID)
+            if expenseTotalsStatus["status"] == "Success" and expenseTotalsStatus["data"] != []:
+                weeklyTotalsStatus = self.DBClient.getWeeklyExpenseTotals(userID, calculations.getWeeklyCutoffDate())
+                categoryTotalsStatus = self.DBClient.getCategoryExpenseTotals(userID, calculations.getCategoryCutoffDate())
+                if weeklyTotalsStatus["status"] != "Success":
+                    return weeklyTotalsStatus
+                if categoryTotalsStatus["status"] != "Success":
+                    return categoryTotalsStatus
+
                 expenseData["hasExpense"] = True
-                expenseAndSalary["expenseData"] = monthlyExpenseList
+                expenseAndSalary["expenseData"] = expenseTotalsStatus["data"]
                 expenseData["expenseAndSalary"] = expenseAndSalary
-                expenseData["weeklyExpense"] = weeklyExpense
-                expenseData["monthlyCategoryExpenses"] = categoryexpensePercentage
+                expenseData["weeklyExpense"] = calculations.getWeeklyExpenseDict(weeklyTotalsStatus["data"])
+                expenseData["monthlyCategoryExpenses"] = calculations.getCategoryExpenseDict(categoryTotalsStatus["data"])
 
             else:
                 expenseData["hasExpense"] = False
                 expenseAndSalary["expenseData"] = [0,0,0,0,0,0,0,0,0,0,0,0]
                 expenseData["expenseAndSalary"] = expenseAndSalary
 
+            # A failed totals lookup left zeros in the payload, those are not cached
+            if salaryTotalsStatus["status"] == "Success" and expenseTotalsStatus["status"] == "Success":
+                self.cache.set(self.expensePageCacheKey(userID), expenseData)
             return expenseData
         
         except Exception as e:
@@ -430,14 +569,17 @@ class serviceHandler():
     
     Args:
         userID (int): ID of the current user
+        query (str): Part of the first name + last name to search for
+        limit (int): Maximum number of users per page
+        page (int): 1-based page number
         
     Returns:
-        dict: Status with list of other users if successful
+        dict: Status with a ranked page of matching users if successful
     """
-    def getUsernamesAndIDs(self,userID,query):
+    def getUsernamesAndIDs(self,userID,query,limit=10,page=1):
 
         try:
-            status = self.DBClient.getUsernamesAndIDs(userID,query)
+            status = self.DBClient.getUsernamesAndIDs(userID,query,limit,page)
             return status
         
         except Exception as e:
@@ -537,6 +679,208 @@ class serviceHandler():
         except Exception as e:
             return self.handleError(e, "retrieving report")
         
+    """
+    Retrieve the cached rendered HTML of a shared report
+
+    Args:
+        userID (int): ID of the recipient
+        sendersID (int): ID of the sender
+        reportID (int): ID of the report
+        templateVersion (str): Version of report.html the cache must match
+        includeHtml (bool): Read the HTML too, False only checks that the report exists
+
+    Returns:
+        dict: Status with the compressed HTML, or None if it needs rendering or was not read
+    """
+    def getCachedReportHtml(self,userID,sendersID,reportID,templateVersion,includeHtml=True):
+        try:
+            return self.DBClient.getCachedReportHtml(userID,sendersID,reportID,templateVersion,includeHtml)
+        except Exception as e:
+            return self.handleError(e, "retrieving cached report")
+
+    """
+    Store the rendered HTML of a shared report
+
+    Args:
+        reportID (int): ID of the report
+        compressedHtml (bytes): zlib-compressed HTML
+        templateVersion (str): Version of report.html it was rendered with
+
+    Returns:
+        dict: Status indicating success/failure
+    """
+    def saveReportHtml(self,reportID,compressedHtml,templateVersion):
+        try:
+            return self.DBClient.saveReportHtml(reportID,compressedHtml,templateVersion)
+        except Exception as e:
+            return self.handleError(e, "caching report html")
+
+    """
+    Page through a user's expenses, newest first
+
+    Args:
+        userID (int): ID of the user
+        limit (int): Rows on the page
+        cursor (str): nextCursor of the previous page, None for the first page
+        category (str): Only expenses of this category when given
+        startDate (str): Only expenses on or after this YYYY-MM-DD date when given
+        endDate (str): Only expenses on or before this YYYY-MM-DD date when given
+
+    Returns:
+        dict: Status with a lazy iterator of up to limit + 1 expenseRow tuples, the extra row
+            only tells the caller that another page exists
+    """
+    def getExpenseTransactions(self,userID,limit,cursor=None,category=None,startDate=None,endDate=None):
+        try:
+            try:
+                after = decodeTransactionCursor(cursor) if cursor else None
+                startDate, endDate = self.parseDateRange(startDate, endDate)
+            except ValueError:
+                return {
+                    "status": "Failed",
+                    "statusCode": 400,
+                    "message": "cursor, startDate and endDate must be valid (dates as YYYY-MM-DD)"
+                }
+
+            return self.DBClient.getExpenseTransactions(userID, limit + 1, after, category, startDate, endDate)
+
+        except Exception as e:
+            return self.handleError(e, "fetching expense transactions")
+
+    # Optional YYYY-MM-DD filter strings as dates, raises ValueError when one is malformed
+    def parseDateRange(self,startDate,endDate):
+        return (
+            date.fromisoformat(startDate) if startDate else None,
+            date.fromisoformat(endDate) if endDate else None
+        )
+
+    """
+    Stream a user's expenses for export, oldest first
+
+    Args:
+        userID (int): ID of the user
+        startDate (str): Only expenses on or after this YYYY-MM-DD date when given
+        endDate (str): Only expenses on or before this YYYY-MM-DD date when given
+
+    Returns:
+        dict: Status with a lazy iterator of expenseRow tuples
+    """
+    def getExpenseExport(self,userID,startDate=None,endDate=None):
+        try:
+            try:
+                startDate, endDate = self.parseDateRange(startDate, endDate)
+            except ValueError:
+                return {"status": "Failed", "statusCode": 400, "message": "startDate and endDate must be YYYY-MM-DD dates"}
+
+            return self.DBClient.getExpenseExportRows(userID, startDate, endDate)
+
+        except Exception as e:
+            return self.handleError(e, "exporting expenses")
+
+    """
+    Stream a user's expenses and salaries merged into one ledger, oldest first
+
+    Args:
+        userID (int): ID of the user
+        startDate (str): Only entries on or after this YYYY-MM-DD date when given
+        endDate (str): Only entries on or before this YYYY-MM-DD date when given
+
+    Returns:
+        dict: Status with a lazy iterator of expenseRow and salaryRow tuples in date order
+    """
+    def getLedgerExport(self,userID,startDate=None,endDate=None):
+        try:
+            try:
+                startDate, endDate = self.parseDateRange(startDate, endDate)
+            except ValueError:
+                return {"status": "Failed", "statusCode": 400, "message": "startDate and endDate must be YYYY-MM-DD dates"}
+
+            expenseStatus = self.DBClient.getExpenseExportRows(userID, startDate, endDate)
+            if expenseStatus["status"] != "Success":
+                return expenseStatus
+            salaryStatus = self.DBClient.getSalaryExportRows(userID, startDate, endDate)
+            if salaryStatus["status"] != "Success":
+                return salaryStatus
+
+            # Both streams are already in date order, merging them keeps one row of each in memory
+            entries = heapq.merge(
+                ((expense.date, 0, expense) for expense in expenseStatus["data"]),
+                ((salary.salaryDate, 1, salary) for salary in salaryStatus["data"]),
+                key=lambda entry: entry[:2]
+            )
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": (row for _, _, row in entries)
+            }
+
+        except Exception as e:
+            return self.handleError(e, "exporting ledger")
+
+    """
+    Collect the data the dashboard sidebar used to load with separate requests
+
+    Args:
+        userID (int): ID of the user
+        sections (list): Names from bootstrapSections to include, all of them when None
+
+    Returns:
+        dict: Status with one entry per section, each shaped like the response of its own route
+    """
+    def getDashboardBootstrap(self,userID,sections=None):
+        try:
+            sections = list(self.bootstrapSections) if not sections else sections
+            unknownSections = [name for name in sections if name not in self.bootstrapSections]
+            if unknownSections:
+                return {
+                    "status": "Failed",
+                    "statusCode": 400,
+                    "message": f"Unknown section(s): {', '.join(unknownSections)}"
+                }
+
+            data = {}
+
+            # Sender list, unread ids and unread count all come from one query on shared reports
+            if {"unreadReportCount", "unreadReportIds", "senderDetails"} & set(sections):
+                summaryStatus = self.DBClient.getSharedReportSummary(userID)
+                if summaryStatus["status"] != "Success":
+                    return summaryStatus
+                summary = summaryStatus["data"]
+
+                if "unreadReportCount" in sections:
+                    data["unreadReportCount"] = {
+                        "status": "Success",
+                        "statusCode": 200,
+                        "reportCount": len(summary["unreadReportIds"])
+                    }
+                if "unreadReportIds" in sections:
+                    data["unreadReportIds"] = {
+                        "status": "Success",
+                        "statusCode": 200,
+                        "unreadReportIds": summary["unreadReportIds"]
+                    }
+                if "senderDetails" in sections:
+                    data["senderDetails"] = {
+                        "status": "Success",
+                        "statusCode": 200,
+                        "data": summary["senders"]
+                    }
+
+            # The user row is loaded once, later lookups in this request hit the session identity map
+            if "accountData" in sections:
+                data["accountData"] = self.getAccountData(userID)
+            if "latestTransactions" in sections:
+                data["latestTransactions"] = self.getLatestTransactions(userID)
+
+            return {
+                "status": "Success",
+                "statusCode": 200,
+                "data": data
+            }
+
+        except Exception as e:
+            return self.handleError(e, "loading dashboard data")
+
     """
     Get IDs of unread reports for a user
     
@@ -614,7 +958,10 @@ class serviceHandler():
         dict: Status of update operation
     """
     def updateUserName(self, userId, firstName, lastName):
-        return self.DBClient.updateUserName(userId, firstName, lastName)
+        status = self.DBClient.updateUserName(userId, firstName, lastName)
+        if status["status"] == "Success":
+            self.invalidateUserCache(userId)
+        return status
 
     """
     Update a user's password
@@ -630,7 +977,7 @@ class serviceHandler():
     """
     def updateUserPassword(self, userId, currentPassword, newPassword, confirmPassword):
         try:
-            user = User.query.get(userId)
+            user = self.DBClient.getUser(userId)
             if not user:
                 return {
                     "status": "Failed",
@@ -654,9 +1001,28 @@ class serviceHandler():
 
             return self.DBClient.updateUserPassword(userId, newPassword)
 
+        except passwordHasherBusy:
+            return self.DBClient.passwordHasherBusyStatus()
         except Exception as e:
             return self.handleError(e, "update user password")
         
+    """
+    Re-hash a verified password when its stored hash uses outdated cost settings
+
+    Args:
+        userID (int): ID of the user
+        password (str): Plain password that was just verified
+
+    Returns:
+        bool: True if the stored hash was replaced
+    """
+    def upgradePasswordHash(self, userID, password):
+        try:
+            return self.DBClient.upgradePasswordHash(userID, password)
+        except Exception as e:
+            self.handleError(e, "upgrading password hash")
+            return False
+
     """
     Get the account balance and related data for a user
 
@@ -726,12 +1092,10 @@ class serviceHandler():
             lastestExpensestatus = self.DBClient.getLastFiveExpenses(userID)
             data['data'] = lastestExpensestatus["data"]["transaction"]
 
-            status = self.DBClient.getMonthlyExpenses(userID)
+            status = self.DBClient.getMonthlyExpenseTotals(userID)
 
             if status["status"] == "Success" and status["data"] != []:
-                #Get the monthly expenses in a list.
-                monthlyExpenseList = calculations.getMonthlyExpenseList(status["data"])
-                data["monthlyExpenses"] = monthlyExpenseList
+                data["monthlyExpenses"] = status["data"]
                 data["hasExpense"] = True
                 data["status"] = "Success"
                 data["statusCode"] = 200
@@ -755,6 +1119,8 @@ class serviceHandler():
 
         try:
             status = self.DBClient.updateAllocation(userID,data["goalName"])
+            if status["status"] == "Success":
+                self.invalidateUserCache(userID)
             return status
 
         except Exception as e:
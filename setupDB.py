@@ -1,7 +1,9 @@
 from models import db
-from app import app  # Import the app to initialize the app context
+from app import createApp
 
-# Create tables with app context
+app = createApp()
+
+# Create tables with app context (same as "flask init-db")
 with app.app_context():
 
     # This will create the  tables defined tables in the database.
@@ -122,7 +122,21 @@ $(document).ready(function() {
     // Store unread report IDs
     let unreadReportIds = [];
 
-    // Function to fetch unread report count
+    // Open event stream, when set the server pushes unread updates and the ID list is not fetched
+    let reportEventSource = null;
+
+    // Function to show the unread count on the badge
+    function renderUnreadBadge(count) {
+        const unreadBadge = $('#unreadReportCount');
+        if (count > 0) {
+            unreadBadge.text(count > 99 ? '99+' : count);
+            unreadBadge.show();
+        } else {
+            unreadBadge.hide();
+        }
+    }
+
+    // Function to fetch unread report count, also while a stream is open in case it missed an update
     function fetchUnreadBadgeCount() {
         fetch('/dashboard/getUnreadReportCount')
             .then(response => {
@@ -133,14 +147,7 @@ $(document).ready(function() {
             })
             .then(data => {
                 if (data.status === 'Success') {
-                    const count = data.reportCount || 0;
-                    const unreadBadge = $('#unreadReportCount');
-                    if (count > 0) {
-                        unreadBadge.text(count > 99 ? '99+' : count);
-                        unreadBadge.show();
-                    } else {
-                        unreadBadge.hide();
-                    }
+                    renderUnreadBadge(data.reportCount || 0);
                 } else {
                     console.warn('Failed to get unread report count:', data.message);
                 }
@@ -153,6 +160,9 @@ $(document).ready(function() {
 
     // Function to fetch unread report ID list
     function fetchUnreadReportIds() {
+        if (reportEventSource) {
+            return;
+        }
         // Use the new API endpoint to get the list of unread report IDs
         fetch('/dashboard/getUnreadReportIds')
             .then(response => {
@@ -181,12 +191,15 @@ $(document).ready(function() {
         $('#sharedReportsLoading').show();
         $('#sharedReportsContent').hide();
 
-        // Fetch unread report IDs first
-        fetchUnreadReportIds();
-
-        fetch('/dashboard/getSenderDetails')
+        // Sender list and unread IDs come back together, so the unread dots match the list
+        fetch('/dashboard/bootstrap?sections=senderDetails,unreadReportIds')
             .then(response => response.json())
-            .then(data => {
+            .then(result => {
+                const sections = result.data || {};
+                const data = sections.senderDetails || result;
+                if (sections.unreadReportIds && sections.unreadReportIds.status === 'Success') {
+                    unreadReportIds = sections.unreadReportIds.unreadReportIds || [];
+                }
                 $('#sharedReportsLoading').hide();
                 $('#sharedReportsContent').show();
                 if (data.status === 'Success' && data.data && data.data.length > 0) {
@@ -287,14 +300,12 @@ $(document).ready(function() {
         // Fetch the full shared report data
         // console.log(`Fetching report with senderID: ${senderID}, reportId: ${reportId}`);
 
-        fetch('/dashboard/getSharedReport', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                senderID: senderID|| 1,  // Changed to userID to match backend
-                reportId: reportId || new Date().toISOString().split('T')[0]  // Changed to date to match backend
-            })
-        })
+        // GET so the browser revalidates its cached copy with the report's ETag
+        const reportParams = new URLSearchParams({
+            senderID: senderID || 1,
+            reportId: reportId
+        });
+        fetch(`/dashboard/getSharedReport?${reportParams}`)
         .then(response => {
             if (!response.ok) {
                 console.warn(`Error fetching report: ${response.status}`);
@@ -377,8 +388,38 @@ $(document).ready(function() {
         }
     }
 
-    // Initial load and periodic refresh
-    fetchUnreadBadgeCount();
-    fetchUnreadReportIds();
+    // Wait before asking for a stream again after the server turned one away
+    const reportStreamRetryMs = 60 * 1000;
+
+    // Subscribe to unread report updates, the first event carries the current state
+    function openReportEventStream() {
+        const eventSource = new EventSource('/dashboard/events');
+        reportEventSource = eventSource;
+        eventSource.addEventListener('unreadReports', event => {
+            const data = JSON.parse(event.data);
+            unreadReportIds = data.unreadReportIds || [];
+            renderUnreadBadge(data.reportCount || 0);
+        });
+        eventSource.onerror = error => {
+            // EventSource reconnects by itself after network errors, but not after a refused stream (503)
+            if (eventSource.readyState !== EventSource.CLOSED) {
+                console.warn('Report event stream interrupted:', error);
+                return;
+            }
+            reportEventSource = null;
+            fetchUnreadBadgeCount();
+            fetchUnreadReportIds();
+            setTimeout(openReportEventStream, reportStreamRetryMs);
+        };
+    }
+
+    if (window.EventSource) {
+        openReportEventStream();
+    } else {
+        // Fallback for browsers without Server-Sent Events: initial load
+        fetchUnreadBadgeCount();
+        fetchUnreadReportIds();
+    }
+    // Periodic refresh in every browser, covers a stream that is down or missed an update
     setInterval(fetchUnreadBadgeCount, 5 * 60 * 1000); // every 5 minutes
 });
\ No newline at end of file
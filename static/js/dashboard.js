@@ -170,7 +170,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // This ensures better user experience even if these calls fail
     setTimeout(function() {
         // Initial load of unread count - moved to the end so it doesn't block other functionality
-        fetchUnreadReportCount();
+        // Browsers with EventSource already get the count from the stream opened in base.js
+        if (!window.EventSource) {
+            fetchUnreadReportCount();
+        }
     }, 500);
 });
 
@@ -190,20 +193,7 @@ function fetchUnreadReportCount() {
             })
             .then(data => {
                 if (data.status === "Success") {
-                    const unreadCount = data.reportCount || 0;
-                    const unreadCountElement = document.getElementById('unreadReportCount');
-
-                    if (unreadCountElement) {
-                        unreadCountElement.textContent = unreadCount > 99 ? '99+' : unreadCount;
-                        // Only display count if there are unread messages
-                        if (unreadCount > 0) {
-                            unreadCountElement.style.display = 'flex';
-                            unreadCountElement.style.alignItems = 'center';
-                            unreadCountElement.style.justifyContent = 'center';
-                        } else {
-                            unreadCountElement.style.display = 'none';
-                        }
-                    }
+                    renderUnreadReportCount(data.reportCount || 0);
                 }
             })
             .catch(error => {
@@ -216,6 +206,26 @@ function fetchUnreadReportCount() {
     }
 }
 
+/**
+ * Show the unread report count on the badge, hidden when there is nothing unread
+ * @param {number} unreadCount - Number of unread reports
+ */
+function renderUnreadReportCount(unreadCount) {
+    const unreadCountElement = document.getElementById('unreadReportCount');
+
+    if (unreadCountElement) {
+        unreadCountElement.textContent = unreadCount > 99 ? '99+' : unreadCount;
+        // Only display count if there are unread messages
+        if (unreadCount > 0) {
+            unreadCountElement.style.display = 'flex';
+            unreadCountElement.style.alignItems = 'center';
+            unreadCountElement.style.justifyContent = 'center';
+        } else {
+            unreadCountElement.style.display = 'none';
+        }
+    }
+}
+
 /**
  * Set up "Shared with me" button click event
  */
@@ -255,21 +265,20 @@ function fetchSharedReports() {
 
     // Wrap in try-catch to prevent any uncaught errors from breaking functionality
     try {
-        // Send request to fetch report list
-        fetch('/dashboard/getSenderDetails')
+        // Send one request for the report list and the unread count
+        fetch('/dashboard/bootstrap?sections=senderDetails,unreadReportCount')
             .then(response => {
                 if (!response.ok) {
                     throw new Error('Network response was not ok');
                 }
                 return response.json();
             })
-            .then(data => {
+            .then(result => {
+                const sections = result.data || {};
+                const data = sections.senderDetails || result;
                 // Update unread count (possibly read)
-                try {
-                    fetchUnreadReportCount();
-                } catch (e) {
-                    console.error('Error updating unread count:', e);
-                    // Continue execution despite error
+                if (sections.unreadReportCount && sections.unreadReportCount.status === "Success") {
+                    renderUnreadReportCount(sections.unreadReportCount.reportCount || 0);
                 }
                 // Process response data
                 if (data.status === "Success") {
@@ -3983,22 +3992,21 @@ async function redeemGoal(goalName, amount) {
                     }
                 }
 
-                // Fetch updated account data
-                const accountResponse = await fetch('/dashboard/getAccountData');
-                const accountResult = await accountResponse.json();
+                // Fetch updated account data and latest transactions in one request
+                const sections = await fetchDashboardSections(['accountData', 'latestTransactions']);
+                const accountResult = sections.accountData;
 
-                if (accountResponse.ok && accountResult.status === "Success") {
+                if (accountResult.status === "Success") {
                     // Update account data
                     window.accountData = accountResult.data;
 
                     // Update account balance display
                     updateAccountBalance(window.accountData);
 
-                    // Fetch latest transactions
-                    const transactionsResponse = await fetch('/dashboard/getLatestTransactions');
-                    const transactionsResult = await transactionsResponse.json();
+                    // Latest transactions came back with the account data
+                    const transactionsResult = sections.latestTransactions;
 
-                    if (transactionsResponse.ok && transactionsResult.status === "Success") {
+                    if (transactionsResult.status === "Success") {
                         // console.log('Updating latest transactions after goal redemption:', transactionsResult.data);
                         // Update latest transactions
                         updateLatestTransactions(transactionsResult.data);
@@ -4089,9 +4097,8 @@ async function redeemGoal(goalName, amount) {
                                         emptyState.remove();
                                     }
 
-                                    // Force a refresh of the entire card
-                                    fetch('/dashboard/getLatestTransactions')
-                                        .then(response => response.json())
+                                    // Force a refresh of the entire card with the transactions fetched above
+                                    Promise.resolve(transactionsResult)
                                         .then(data => {
                                             if (data.status === "Success") {
                                                 // console.log('Got fresh transaction data, updating UI');
@@ -4411,6 +4418,21 @@ async function redeemGoal(goalName, amount) {
     }
 }
 
+/**
+ * Fetch several dashboard sections with one /dashboard/bootstrap request
+ * @param {string[]} sections - Section names, e.g. ['accountData', 'latestTransactions']
+ * @returns {Promise<Object>} Each section's payload, shaped like the response of its own route
+ */
+async function fetchDashboardSections(sections) {
+    const response = await fetch(`/dashboard/bootstrap?sections=${sections.join(',')}`);
+    const result = await response.json();
+    if (response.ok && result.status === "Success") {
+        return result.data;
+    }
+    // Hand the failure to every section, so callers check each status as they did with separate routes
+    return Object.fromEntries(sections.map(section => [section, result]));
+}
+
 /**
  * Update the transactions list with the latest data
  * @returns {Promise<void>}
@@ -4418,10 +4440,9 @@ async function redeemGoal(goalName, amount) {
 async function updateTransactionsList() {
     try {
         // Fetch latest transactions
-        const response = await fetch('/dashboard/getLatestTransactions');
-        const result = await response.json();
+        const result = (await fetchDashboardSections(['latestTransactions'])).latestTransactions;
 
-        if (response.ok && result.status === "Success") {
+        if (result.status === "Success") {
             // console.log('Updating latest transactions:', result.data);
 
             // Try different selectors to find the transactions list
@@ -4665,10 +4686,9 @@ async function updateTransactionsList() {
 async function updateAccountData() {
     try {
         // Fetch updated account data
-        const response = await fetch('/dashboard/getAccountData');
-        const result = await response.json();
+        const result = (await fetchDashboardSections(['accountData'])).accountData;
 
-        if (response.ok && result.status === "Success") {
+        if (result.status === "Success") {
             // Update account data
             window.accountData = result.data;
 
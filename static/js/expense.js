@@ -201,12 +201,8 @@ function initExpenseCharts() {
 
     const weeklyExpense = window.expenseData.weeklyExpense;
 
-    // Sort weekly expense data by start date
-    const sortedEntries = Object.entries(weeklyExpense).sort(([a], [b]) => {
-      const dateA = new Date(a.split(' - ')[0] + ' 2025');
-      const dateB = new Date(b.split(' - ')[0] + ' 2025');
-      return dateA - dateB;
-    });
+    // Weeks arrive in date order and deltas only ever add the newest week, labels carry no year to sort on
+    const sortedEntries = Object.entries(weeklyExpense);
 
     const sortedLabels = sortedEntries.map(([label]) => label);
     const sortedData = sortedEntries.map(([, value]) => value);
@@ -280,6 +276,32 @@ else{
 drawCategoryPieChart(currentMonthIndex);
 }
 
+/**
+ * Merges the chart delta of a newly added expense into window.expenseData
+ * Mirrors calculations.applyExpenseDelta on the server
+ * @param {Object} delta - Month index, week label and category month touched by the expense
+ */
+function applyExpenseDelta(delta) {
+  if (delta.monthIndex === null) return;
+
+  const data = window.expenseData;
+  data.hasExpense = true;
+  data.expenseAndSalary.expenseData[delta.monthIndex] += delta.amount;
+
+  if (delta.weekLabel !== null) {
+    data.weeklyExpense = data.weeklyExpense || {};
+    data.weeklyExpense[delta.weekLabel] = (data.weeklyExpense[delta.weekLabel] || 0) + delta.amount;
+  }
+
+  if (delta.categoryMonth !== null) {
+    data.monthlyCategoryExpenses = data.monthlyCategoryExpenses || {};
+    const monthData = data.monthlyCategoryExpenses[delta.categoryMonth] || { total: 0 };
+    monthData[delta.category] = (monthData[delta.category] || 0) + delta.amount;
+    monthData.total += delta.amount;
+    data.monthlyCategoryExpenses[delta.categoryMonth] = monthData;
+  }
+}
+
 /**
  * Handles adding a new expense via AJAX
  * @param {Event} event - Form submission event
@@ -312,8 +334,15 @@ async function saveExpense(event) {
     const result = await resp.json();
     if (!resp.ok) throw new Error(result.message || 'Failed to save expense');
 
-    // unpack either { data: {...} } or raw {...}
-    window.expenseData = result.data ?? result;
+    if (result.status !== 'Success') throw new Error(result.message || 'Failed to save expense');
+
+    // The server sends the change made by this expense, or the rebuilt page data when the
+    // expense starts a week or month earlier than the newest one on the charts
+    if (result.data.delta) {
+      applyExpenseDelta(result.data.delta);
+    } else {
+      window.expenseData = result.data.expensePageData;
+    }
     initExpenseCharts();
     // Update share button state after adding expense
     // setupShareSummaryButton();
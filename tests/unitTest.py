@@ -1,18 +1,36 @@
 import unittest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import sys
 import os
-from models import db,User
-from app import app
+from models import db,User, Expense, ExpenseRollup, SalaryRollup, ShareReport
 from werkzeug.security import generate_password_hash
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from flask import json
+from flask import json, g
+from cacheClient import memoryCache, redisCache, nullCache, createCache
+from searchIndex import ngramIndex, buildSearchName, normaliseQuery, rankKey, minTrigramQueryLength, sqliteSupportsTrigram
+from reportSnapshot import encodeSnapshot, decodeSnapshot, decodeSection, SnapshotError
+from eventBus import eventBus
+from serviceHandler import serviceHandler
+from passwordHasher import passwordHasher, passwordHasherBusy, passwords
+import threading
+import sqlite3
+import time
+import unittest.mock
+import zlib
+import app as appModule
+import serve
+from config import Config
+from queryCounter import countQueries, maxQueries
+from benchmarks.syntheticData import generateDataset
+import calculations
+from rowTypes import expenseRow, salaryRow, encodeTransactionCursor, decodeTransactionCursor
 
 
 from calculations import (
-    getAccountData, getGoalProgress, getMonthlyExpenseList,
+    getAccountData, getGoalProgress,
     calculate_50_30_20_Percentages, getStartOfWeek,
-    getMonthlySalaryList, getExpensePageData
+    getWeeklyExpenseDict, getCategoryExpenseDict,
+    getExpenseDelta, applyExpenseDelta, getStartOfWeeks
 )
 
 class TestBudgetFunctions(unittest.TestCase):
@@ -91,48 +109,987 @@ class TestBudgetFunctions(unittest.TestCase):
         self.assertLess(result[0]["progressPercentage"], 100)
         self.assertIn("Save at least", result[0]["message"])
 
-    # Test grouping of expenses into monthly totals
-    def testGetMonthlyExpenseList(self):
-        expenses = [
-            {"date": "2025-01-10", "amount": 200},
-            {"date": "2025-01-15", "amount": 300},
-            {"date": "2025-02-05", "amount": 150}
+    # Test weekly chart labels built from totals already grouped by week
+    def testGetWeeklyExpenseDict(self):
+        weeklyTotals = [
+            {"weekStartDate": datetime(2025, 4, 28).date(), "amount": 120.5},
+            {"weekStartDate": datetime(2025, 5, 5).date(), "amount": 80}
         ]
-        result = getMonthlyExpenseList(expenses)
-        self.assertEqual(result[0], 500)
-        self.assertEqual(result[1], 150)
-        self.assertEqual(result[len(result)-1], 0)
-
-    # Test grouping of salary data into monthly totals
-    def testGetMonthlySalaryList(self):
-        salaryData = [
-            {"salaryDate": "2025-01-05", "amount": 2000},
-            {"salaryDate": "2025-01-20", "amount": 1500},
-            {"salaryDate": "2025-02-10", "amount": 1800}
+        result = getWeeklyExpenseDict(weeklyTotals)
+        self.assertEqual(result["28 Apr - 4 May"], 120.5)
+        self.assertEqual(result["5 May - 11 May"], 80)
+
+    # Test month-wise category totals built from totals already grouped by month and category
+    def testGetCategoryExpenseDict(self):
+        categoryTotals = [
+            {"month": datetime(2025, 4, 1).date(), "category": "Food", "amount": 100},
+            {"month": datetime(2025, 4, 1).date(), "category": "Travel", "amount": 50},
+            {"month": datetime(2025, 5, 1).date(), "category": "Food", "amount": 30}
         ]
-        result = getMonthlySalaryList(salaryData)
-        self.assertEqual(result[0], 3500)
-        self.assertEqual(result[1], 1800)
+        result = getCategoryExpenseDict(categoryTotals)
+        self.assertEqual(result["April"]["total"], 150)
+        self.assertEqual(result["April"]["Travel"], 50)
+        self.assertEqual(result["May"], {"Food": 30, "total": 30})
+
+    # Test that cached entries expire after their TTL
+    def testMemoryCacheExpiry(self):
+        now = [0]
+        cache = memoryCache(ttlSeconds=10, clock=lambda: now[0])
+        cache.set("dashboard:1", {"hasExpense": True})
+        self.assertEqual(cache.get("dashboard:1"), {"hasExpense": True})
+        now[0] = 10
+        self.assertIsNone(cache.get("dashboard:1"))
+
+    # Test that the least recently used entry is evicted when the cache is full
+    def testMemoryCacheEviction(self):
+        cache = memoryCache(maxEntries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+    # Test the redis backend against a local stand-in client
+    def testRedisCacheRoundTrip(self):
+        class FakeRedis:
+            def __init__(self):
+                self.store = {}
+            def get(self, key):
+                return self.store.get(key)
+            def set(self, key, value, ex=None):
+                self.store[key] = value
+            def delete(self, key):
+                self.store.pop(key, None)
+
+        client = FakeRedis()
+        cache = redisCache(client, prefix="test:")
+        cache.set("dashboard:1", {"monthlySpendData": [1.5, 0]})
+        self.assertIn("test:dashboard:1", client.store)
+        self.assertEqual(cache.get("dashboard:1"), {"monthlySpendData": [1.5, 0]})
+        cache.delete("dashboard:1")
+        self.assertIsNone(cache.get("dashboard:1"))
+
+    # Test that serve.py turns the per-process caches off once there is more than one worker
+    def testServeConfigDisablesMemoryCache(self):
+        memoryConfig = type("memoryConfig", (Config,), {"CACHE_BACKEND": "memory"})
+        self.assertEqual(serve.buildAppConfig(memoryConfig, 1), (memoryConfig, []))
 
-    # Test comprehensive expense analysis including monthly, weekly, and category-wise grouping
-    def testGetExpensePageData(self):
+        appConfig, warnings = serve.buildAppConfig(memoryConfig, 3)
+        self.assertEqual(appConfig.CACHE_BACKEND, "none")
+        self.assertEqual(len(warnings), 1)
+        self.assertIsInstance(createCache(appConfig), nullCache)
+
+        redisConfig = type("redisConfig", (Config,), {"CACHE_BACKEND": "redis"})
+        self.assertIs(serve.buildAppConfig(redisConfig, 3)[0], redisConfig)
+
+        userCacheConfig = type("userCacheConfig", (redisConfig,), {"USER_CACHE_TTL_SECONDS": 30})
+        appConfig, warnings = serve.buildAppConfig(userCacheConfig, 3)
+        self.assertEqual((appConfig.USER_CACHE_TTL_SECONDS, appConfig.CACHE_BACKEND), (0, "redis"))
+        self.assertIs(serve.buildAppConfig(userCacheConfig, 1)[0], userCacheConfig)
+
+    # Test that applying an expense delta gives the same page data as building it from the new totals
+    def testApplyExpenseDeltaMatchesRebuild(self):
         today = datetime.today().date()
-        expenseData = [
-            {
-                "date": today.strftime("%Y-%m-%d"),
-                "amount": 100,
-                "category": "Food",
-                "weekStartDate": (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
-            },
-            {
-                "date": (today - timedelta(days=30)).strftime("%Y-%m-%d"),
-                "amount": 150,
-                "category": "Travel",
-                "weekStartDate": (today - timedelta(days=30 + (today - timedelta(days=30)).weekday())).strftime("%Y-%m-%d")
-            }
+        weekStart = today - timedelta(days=today.weekday())
+        monthStart = today.replace(day=1)
+
+        monthlyExpenseList = [0] * 12
+        monthlyExpenseList[today.month - 1] = 100.0
+        pageData = {
+            "hasExpense": True,
+            "expenseAndSalary": {"expenseData": monthlyExpenseList},
+            "weeklyExpense": getWeeklyExpenseDict([{"weekStartDate": weekStart, "amount": 100}]),
+            "monthlyCategoryExpenses": getCategoryExpenseDict([{"month": monthStart, "category": "Food", "amount": 100}])
+        }
+        applyExpenseDelta(pageData, getExpenseDelta(25, "Travel", today, weekStart))
+
+        self.assertEqual(pageData["expenseAndSalary"]["expenseData"][today.month - 1], 125)
+        self.assertEqual(pageData["weeklyExpense"], getWeeklyExpenseDict([{"weekStartDate": weekStart, "amount": 125}]))
+        self.assertEqual(pageData["monthlyCategoryExpenses"], getCategoryExpenseDict([
+            {"month": monthStart, "category": "Food", "amount": 100},
+            {"month": monthStart, "category": "Travel", "amount": 25}
+        ]))
+
+    # Test that an expense outside the current year leaves the charts untouched
+    def testGetExpenseDeltaOtherYear(self):
+        lastYear = datetime.today().date().replace(year=datetime.today().year - 1, month=1, day=1)
+        delta = getExpenseDelta(10, "Food", lastYear, getStartOfWeek(lastYear))
+        self.assertIsNone(delta["monthIndex"])
+        self.assertIsNone(delta["weekLabel"])
+
+    # Test the pure Python name search: substring matches ranked with prefix matches first, paginated
+    def testNgramIndexSearch(self):
+        entries = [
+            (1, buildSearchName("Ann", "Johnson")),
+            (2, buildSearchName("John", "Doe")),
+            (3, buildSearchName("Johnny", "Cash")),
+            (4, buildSearchName("Bob", "Smith"))
         ]
-        monthlyExpenseList, weeklyExpenseDict, categoryExpenseDict = getExpensePageData(expenseData)
-        
-        self.assertTrue(sum(monthlyExpenseList) >= 250)
-        self.assertGreaterEqual(len(weeklyExpenseDict), 1)
-        self.assertIn("Food", list(categoryExpenseDict.values())[0] or [])
+        index = ngramIndex(lambda afterUserID: entries)
+
+        userIDs, hasMore = index.search("john", excludeUserID=3, limit=1, offset=0)
+        self.assertEqual(userIDs, [2])
+        self.assertTrue(hasMore)
+
+        userIDs, hasMore = index.search("john", excludeUserID=3, limit=1, offset=1)
+        self.assertEqual(userIDs, [1])
+        self.assertFalse(hasMore)
+
+        index.put(4, buildSearchName("Johan", "Smith"))
+        self.assertEqual(index.search("jo", excludeUserID=None, limit=10, offset=0)[0], [2, 4, 3])
+
+    # Test that the index only reads new users between full reloads
+    def testNgramIndexRefresh(self):
+        table = {1: buildSearchName("Ann", "Johnson"), 2: buildSearchName("John", "Doe")}
+        calls = []
+        def loadEntries(afterUserID):
+            calls.append(afterUserID)
+            return [(userID, name) for userID, name in table.items() if afterUserID is None or userID > afterUserID]
+
+        now = [0]
+        index = ngramIndex(loadEntries, refreshSeconds=60, fullRefreshSeconds=3600, clock=lambda: now[0])
+        self.assertEqual(index.search("john", None, 10, 0)[0], [2, 1])
+
+        table[3] = buildSearchName("Johnny", "Cash")
+        table[1] = buildSearchName("Ann", "Smith")
+        now[0] = 60
+        self.assertEqual(index.search("john", None, 10, 0)[0], [2, 3, 1])
+
+        now[0] = 3600
+        self.assertEqual(index.search("john", None, 10, 0)[0], [2, 3])
+        self.assertEqual(calls, [None, 2, None])
+
+    # Test that a report snapshot round-trips and single sections can be read on their own
+    def testReportSnapshotRoundTrip(self):
+        report = {
+            "senderFirstName": "John",
+            "senderLastName": "Doe",
+            "dashboardData": {"hasExpense": True, "monthlySpendData": [0, 12.5, 0]},
+            "expenseData": {"weeklyExpense": {"5 May - 11 May": 80.0}}
+        }
+        blob = encodeSnapshot(report)
+        self.assertEqual(decodeSnapshot(blob), report)
+        self.assertEqual(decodeSection(blob, "senderFirstName"), "John")
+        self.assertEqual(decodeSection(blob, "dashboardData")["monthlySpendData"], [0, 12.5, 0])
+
+    # Test that blobs in another format are rejected
+    def testReportSnapshotRejectsUnknownFormat(self):
+        with self.assertRaises(SnapshotError):
+            decodeSnapshot(b"\x80\x04not a snapshot")
+
+    # Test that events reach only the user's subscribers and a full queue keeps the newest events
+    def testEventBusPublish(self):
+        bus = eventBus(maxQueuedEvents=2)
+        subscription = bus.subscribe(1)
+        otherSubscription = bus.subscribe(2)
+
+        for count in range(3):
+            bus.publish(1, "unreadReports", {"reportCount": count})
+
+        self.assertEqual(subscription.get_nowait(), ("unreadReports", {"reportCount": 1}))
+        self.assertEqual(subscription.get_nowait(), ("unreadReports", {"reportCount": 2}))
+        self.assertTrue(otherSubscription.empty())
+
+        bus.unsubscribe(1, subscription)
+        self.assertFalse(bus.hasSubscribers(1))
+        self.assertTrue(bus.hasSubscribers(2))
+
+    # Test that the dashboard bootstrap rejects sections it does not know
+    def testDashboardBootstrapUnknownSection(self):
+        status = serviceHandler().getDashboardBootstrap(1, ["accountData", "everything"])
+        self.assertEqual(status["status"], "Failed")
+        self.assertEqual(status["statusCode"], 400)
+        self.assertIn("everything", status["message"])
+
+    # Test hashing on the pool and detecting hashes made with other cost settings
+    def testPasswordHasherRehash(self):
+        hasher = passwordHasher(method="pbkdf2:sha256:1000", workers=1, maxQueued=1)
+        passwordHash = hasher.hash("mySecret123")
+
+        self.assertTrue(hasher.verify(passwordHash, "mySecret123"))
+        self.assertFalse(hasher.verify(passwordHash, "wrong"))
+        self.assertFalse(hasher.needsRehash(passwordHash))
+        self.assertTrue(hasher.needsRehash(generate_password_hash("mySecret123", "pbkdf2:sha256:2000")))
+        self.assertEqual(hasher.stats()["completed"], 4)
+
+    # Test that callers are turned away once the worker and the queue are full
+    def testPasswordHasherRejectsWhenFull(self):
+        hasher = passwordHasher(workers=1, maxQueued=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def blockWorker():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=hasher.submit, args=(blockWorker,))
+        worker.start()
+        started.wait(5)
+
+        with self.assertRaises(passwordHasherBusy):
+            hasher.hash("mySecret123")
+        self.assertEqual(hasher.stats()["rejected"], 1)
+
+        release.set()
+        worker.join(5)
+        self.assertEqual(hasher.stats()["inFlight"], 0)
+
+    # Test that typed rows only become ISO date strings at the JSON boundary
+    def testRowToJson(self):
+        row = expenseRow(7, "Food", 12.5, date(2025, 5, 7), date(2025, 5, 5))
+        self.assertEqual(row.toJson(), {
+            "expenseID": 7, "category": "Food", "amount": 12.5, "date": "2025-05-07", "weekStartDate": "2025-05-05"
+        })
+        self.assertEqual(salaryRow(3, 2000, date(2025, 1, 5)).toJson()["salaryDate"], "2025-01-05")
+
+    # Test that a transaction cursor round trips and malformed cursors are rejected
+    def testTransactionCursor(self):
+        row = expenseRow(42, "Food", 12.5, date(2025, 5, 7), date(2025, 5, 5))
+        self.assertEqual(decodeTransactionCursor(encodeTransactionCursor(row)), (date(2025, 5, 7), 42))
+        for cursor in ("2025-05-07", "2025-05-07.x", "notadate.42"):
+            with self.assertRaises(ValueError):
+                decodeTransactionCursor(cursor)
+
+    # Test that exports come out in batches and the rows read back unchanged
+    def testExportChunks(self):
+        rows = [expenseRow(index, "Food", 1.5, date(2025, 1, 1), date(2024, 12, 30)) for index in range(5)]
+        salary = salaryRow(1, 2000.0, date(2025, 1, 2))
+        batchSize = appModule.exportBatchSize
+        appModule.exportBatchSize = 2
+        try:
+            csvParts = list(appModule.csvChunks(expenseRow._fields, rows))
+            ndjsonParts = list(appModule.ndjsonChunks(rows + [salary]))
+        finally:
+            appModule.exportBatchSize = batchSize
+
+        self.assertEqual(len(csvParts), 3)
+        csvLines = "".join(csvParts).splitlines()
+        self.assertEqual(csvLines[0], "expenseID,category,amount,date,weekStartDate")
+        self.assertEqual(csvLines[1], "0,Food,1.5,2025-01-01,2024-12-30")
+        self.assertEqual(len(ndjsonParts), 3)
+        entries = [json.loads(line) for line in "".join(ndjsonParts).splitlines()]
+        self.assertEqual(entries[-1], {"type": "salary", "salaryID": 1, "amount": 2000.0, "salaryDate": "2025-01-02"})
+
+    # Test that the batch week start matches getStartOfWeek for every date, with and without NumPy
+    def testGetStartOfWeeks(self):
+        dates = [date(2024, 12, 25) + timedelta(days=offset) for offset in range(100)]
+        dates += [date(1969, 12, 28), date(1970, 1, 1), date(2000, 2, 29), date(2100, 1, 3)]
+        expected = [getStartOfWeek(day) for day in dates]
+        self.assertEqual(getStartOfWeeks(dates), expected)
+        self.assertEqual(getStartOfWeeks(dates[:3]), [date(2024, 12, 23)] * 3)
+        self.assertTrue(all(type(day) is date for day in getStartOfWeeks(dates)))
+
+        with unittest.mock.patch.object(calculations, "np", None):
+            self.assertEqual(getStartOfWeeks(dates), expected)
+
+    # Test import row validation and the header check, neither touches the database
+    def testImportRowValidation(self):
+        handler = serviceHandler()
+        columns = {"date": "Date", "category": "Category", "amount": "Amount"}
+        expense, error = handler.parseImportRow({"Date": "2025-05-07", "Category": " Food ", "Amount": "12.50"}, columns)
+        self.assertIsNone(error)
+        self.assertEqual(expense, {"amount": 12.5, "category": "Food", "date": date(2025, 5, 7)})
+        for row in ({"Date": "07/05/2025", "Category": "Food", "Amount": "1"},
+                    {"Date": "2025-05-07", "Category": "", "Amount": "1"},
+                    {"Date": "2025-05-07", "Category": "Food", "Amount": "-1"}):
+            self.assertIsNone(handler.parseImportRow(row, columns)[0])
+
+        status = handler.importExpenses(1, ["when,what\n", "2025-05-07,Food\n"])
+        self.assertEqual(status["statusCode"], 400)
+
+
+# App on an in-memory SQLite database filled with a small synthetic dataset, one per test class
+class DatabaseTestCase(unittest.TestCase):
+
+    class databaseTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite://"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SECRET_KEY = "database-tests"
+        USER_CACHE_TTL_SECONDS = 0
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = appModule.createApp(cls.databaseTestConfig)
+        cls.context = cls.app.app_context()
+        cls.context.push()
+        cls.handler = cls.app.extensions["serviceHandler"]
+        dataset = generateDataset(cls.handler, users=6, expensesPerUser=50, seed=3)
+        cls.userIDs = dataset["userIDs"]
+        cls.userID, cls.otherUserID = cls.userIDs[:2]
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.context.pop()
+
+    # Current and previous balance of a user, read from the table rather than the session
+    def readBalances(self, userID):
+        db.session.expire_all()
+        user = db.session.get(User, userID)
+        return user.accountBalance, user.previousBalance
+
+
+# Test that balance changes are one UPDATE that also moves the old balance into previousBalance
+class TestBalanceWrites(DatabaseTestCase):
+
+    def testRecordExpenseAndSalary(self):
+        client = self.handler.DBClient
+        balance, _ = self.readBalances(self.userID)
+        today = date.today()
+
+        with countQueries() as stats:
+            status = client.recordExpense(self.userID, 12.5, "Food", today, getStartOfWeek(today))
+        self.assertEqual(status["status"], "Success")
+        self.assertEqual(sum(statement.startswith("UPDATE users") for statement in stats.statements), 1)
+        self.assertEqual(self.readBalances(self.userID), (balance - 12.5, balance))
+
+        status = client.recordSalary(self.userID, 100, today)
+        self.assertEqual(status["status"], "Success")
+        self.assertEqual(self.readBalances(self.userID), (balance - 12.5 + 100, balance - 12.5))
+
+    # Test that nothing is written for a user that does not exist
+    def testRecordExpenseUnknownUser(self):
+        expenseCount = db.session.query(db.func.count(Expense.id)).scalar()
+        today = date.today()
+        status = self.handler.DBClient.recordExpense(-1, 5, "Food", today, getStartOfWeek(today))
+        self.assertEqual(status["statusCode"], 404)
+        self.assertEqual(db.session.query(db.func.count(Expense.id)).scalar(), expenseCount)
+
+
+# Test that the rollups kept up on write match a rebuild, and rollup reads match the raw tables
+class TestRollups(DatabaseTestCase):
+
+    # Rollup buckets of a user as sorted tuples, totals rounded so summation order does not matter
+    def readRollups(self, userID):
+        expenseBuckets = sorted(
+            (rollup.year, rollup.month, rollup.weekStartDate, rollup.category, round(rollup.total, 6), rollup.count)
+            for rollup in ExpenseRollup.query.filter_by(userId=userID)
+        )
+        salaryBuckets = sorted(
+            (rollup.year, rollup.month, round(rollup.total, 6), rollup.count)
+            for rollup in SalaryRollup.query.filter_by(userId=userID)
+        )
+        return expenseBuckets, salaryBuckets
+
+    # Every totals read with the rollups switched on and off
+    def readTotals(self, userID, readFromRollups):
+        client = self.handler.DBClient
+        client.readFromRollups = readFromRollups
+        try:
+            yearStart = date(date.today().year, 1, 1)
+            statuses = (
+                client.getMonthlyExpenseTotals(userID),
+                client.getWeeklyExpenseTotals(userID, calculations.getWeeklyCutoffDate()),
+                client.getWeeklyExpenseTotals(userID, yearStart),
+                client.getCategoryExpenseTotals(userID, calculations.getCategoryCutoffDate()),
+                client.getCategoryExpenseTotals(userID, yearStart),
+                client.getMonthlySalaryTotals(userID)
+            )
+        finally:
+            client.readFromRollups = False
+        for status in statuses:
+            self.assertEqual(status["status"], "Success", status.get("message"))
+        return json.loads(json.dumps([status["data"] for status in statuses], default=str),
+                          parse_float=lambda value: round(float(value), 6))
+
+    def testRollupsMatchRebuildAndRawReads(self):
+        userID = self.userIDs[2]
+        client = self.handler.DBClient
+        today = date.today()
+        lastYear = today.replace(year=today.year - 1, day=1)
+
+        self.handler.addNewExpense(None, userID, {"amount": 12.5, "category": "Food", "date": today.isoformat()})
+        self.handler.addNewExpense(None, userID, {"amount": 40, "category": "Gifts", "date": today.isoformat()}, incremental=True)
+        client.recordExpense(userID, 7.25, "Food", lastYear, getStartOfWeek(lastYear))
+        client.recordSalary(userID, 2500, today)
+        lines = ["date,category,amount\n"] + [
+            f"{(today - timedelta(days=offset * 3)).isoformat()},{['Food', 'Travel', 'Gifts'][offset % 3]},{offset + 0.35}\n"
+            for offset in range(1, 40)
+        ]
+        status = self.handler.importExpenses(userID, lines, batchSize=16)
+        self.assertEqual(status["data"]["imported"], 39)
+
+        keptOnWrite = self.readRollups(userID)
+        self.assertEqual(client.rebuildRollups(userID)["status"], "Success")
+        self.assertEqual(keptOnWrite, self.readRollups(userID))
+
+        self.assertEqual(self.readTotals(userID, True), self.readTotals(userID, False))
+
+    # Test that one batch write leaves the same expenses, balance and rollups as writing the rows one by one
+    def testBatchMatchesPerRowWrites(self):
+        client = self.handler.DBClient
+        users = [User(username=f"batch{index}@example.com", password="unused", firstName="Batch", lastName="Writer")
+                 for index in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        perRowUserID, batchUserID = (user.id for user in users)
+
+        today = date.today()
+        expenses = []
+        for offset in range(30):
+            expenseDate = today - timedelta(days=offset * 11)
+            expenses.append({"amount": offset + 0.45, "category": ["Food", "Travel", "Rent"][offset % 3],
+                             "date": expenseDate, "weekStartDate": getStartOfWeek(expenseDate)})
+
+        for expense in expenses:
+            status = client.recordExpense(perRowUserID, expense["amount"], expense["category"], expense["date"], expense["weekStartDate"])
+            self.assertEqual(status["status"], "Success")
+        status = client.recordExpenseBatch(batchUserID, [dict(expense) for expense in expenses])
+        self.assertEqual(status["data"]["count"], len(expenses))
+
+        def readExpenses(userID):
+            return sorted((expense.category, expense.amount, expense.date, expense.weekStartDate)
+                          for expense in Expense.query.filter_by(userId=userID))
+
+        self.assertEqual(readExpenses(batchUserID), readExpenses(perRowUserID))
+        perRowBalance, _ = self.readBalances(perRowUserID)
+        batchBalance, _ = self.readBalances(batchUserID)
+        self.assertAlmostEqual(batchBalance, perRowBalance)
+        self.assertEqual(self.readRollups(batchUserID), self.readRollups(perRowUserID))
+
+    # Test that a file that stops decoding half way reports the batches it already committed
+    def testImportReadErrorKeepsSummary(self):
+        userID = self.userIDs[3]
+        today = date.today().isoformat()
+
+        def lines():
+            yield "date,category,amount\n"
+            for amount in range(1, 6):
+                yield f"{today},Food,{amount}\n"
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+        status = self.handler.importExpenses(userID, lines(), batchSize=2)
+        self.assertEqual(status["statusCode"], 400)
+        self.assertEqual(status["data"]["imported"], 4)
+        self.assertEqual(status["data"]["batches"], 2)
+
+    # Test that rebuilding one user leaves the other users' buckets alone
+    def testRebuildOneUser(self):
+        before = self.readRollups(self.otherUserID)
+        status = self.handler.DBClient.rebuildRollups(self.userID)
+        self.assertEqual(status["status"], "Success")
+        self.assertGreater(status["data"]["expenseBuckets"], 0)
+        self.assertEqual(self.readRollups(self.otherUserID), before)
+
+
+# Test that keyset pages of /expense/transactions add up to the full ordered list, also across rows sharing a date
+class TestExpenseTransactions(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Many expenses on one day so page boundaries fall between rows with the same date
+        cls.sharedDate = date.today() - timedelta(days=3)
+        db.session.add_all([
+            Expense(userId=cls.userID, category=["Food", "Travel"][index % 2], amount=index + 1,
+                    date=cls.sharedDate, weekStartDate=getStartOfWeek(cls.sharedDate))
+            for index in range(23)
+        ])
+        db.session.commit()
+
+    # Expense IDs newest first straight from the table, with the same filters as the route
+    def expectedIds(self, category=None, startDate=None, endDate=None):
+        query = db.session.query(Expense.id, Expense.date).filter(Expense.userId == self.userID)
+        if category:
+            query = query.filter(Expense.category == category)
+        if startDate:
+            query = query.filter(Expense.date >= startDate)
+        if endDate:
+            query = query.filter(Expense.date <= endDate)
+        return [expenseID for expenseID, _ in sorted(query, key=lambda row: (row.date, row.id), reverse=True)]
+
+    # Expense IDs of every page the route hands out, following nextCursor until it is null
+    def readAllPages(self, limit, **filters):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(self.userID)
+        expenseIds, cursor, pages = [], None, 0
+        while True:
+            query = dict(filters, limit=limit, **({"cursor": cursor} if cursor else {}))
+            page = json.loads(client.get("/expense/transactions", query_string=query).get_data(as_text=True))
+            self.assertEqual(page["status"], "Success")
+            self.assertLessEqual(len(page["data"]), limit)
+            expenseIds.extend(row["expenseID"] for row in page["data"])
+            pages += 1
+            cursor = page["nextCursor"]
+            if cursor is None:
+                return expenseIds, pages
+
+    def testPagesCoverEveryRowOnce(self):
+        expected = self.expectedIds()
+        expenseIds, pages = self.readAllPages(7)
+        self.assertEqual(expenseIds, expected)
+        self.assertEqual(pages, -(-len(expected) // 7))
+
+    def testCategoryAndDateFilters(self):
+        sharedDay = self.sharedDate.isoformat()
+        weekBefore = (self.sharedDate - timedelta(days=7)).isoformat()
+        for filters in (
+            {"category": "Food"},
+            {"startDate": sharedDay, "endDate": sharedDay},
+            {"category": "Travel", "startDate": weekBefore, "endDate": sharedDay},
+        ):
+            expected = self.expectedIds(**filters)
+            self.assertTrue(expected, filters)
+            self.assertEqual(self.readAllPages(5, **filters)[0], expected, filters)
+
+        sharedDayIds = self.readAllPages(5, startDate=sharedDay, endDate=sharedDay)[0]
+        self.assertGreaterEqual(len(sharedDayIds), 23)
+
+    def testMalformedCursor(self):
+        status = self.handler.getExpenseTransactions(self.userID, 5, cursor="notadate.1")
+        self.assertEqual(status["statusCode"], 400)
+
+
+# Test the SQLite FTS5 name search against the ranking rules applied to the users table directly
+@unittest.skipUnless(sqliteSupportsTrigram(sqlite3.connect(":memory:")), "SQLite has no FTS5 trigram tokenizer")
+class TestUserSearch(DatabaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = [("Ann", "Johnson"), ("John", "Doe"), ("Johnny", "Cash"), ("Bob", "Johns"), ("Leo", "Robinson"), ("Jo", "Son")]
+        db.session.add_all([
+            User(username=f"search{index}@example.com", password="unused", firstName=firstName, lastName=lastName)
+            for index, (firstName, lastName) in enumerate(names)
+        ])
+        db.session.commit()
+
+    # Expected IDs for a query: substring (or prefix for short queries) matches, ranked like rankKey
+    def expectedMatches(self, query, excludeUserID):
+        query = normaliseQuery(query)
+        names = {user.id: user.searchName for user in User.query.filter(User.id != excludeUserID)}
+        if len(query) >= minTrigramQueryLength:
+            matches = [userID for userID, name in names.items() if query in name]
+        else:
+            matches = [userID for userID, name in names.items() if name.startswith(query)]
+        return sorted(matches, key=lambda userID: rankKey(names[userID], userID, query))
+
+    # Every page of a search, as user IDs
+    def searchAll(self, query, limit=2):
+        userIDs = []
+        for page in range(1, 20):
+            status = self.handler.getUsernamesAndIDs(self.userID, query, limit, page)
+            self.assertEqual(status["status"], "Success", status.get("message"))
+            userIDs += [user["userID"] for user in status["data"]]
+            if not status["hasMore"]:
+                return userIDs
+        self.fail("search did not end")
+
+    def testFtsSearch(self):
+        self.assertEqual(self.handler.DBClient.getSearchBackend(), "sqliteFts")
+        for query in ("john", "son", " SMI", "jo", "leo", "o", "", "100%", "zzz"):
+            self.assertEqual(self.searchAll(query), self.expectedMatches(query, self.userID), query)
+
+    # Test that the FTS triggers follow a rename
+    def testFtsSearchAfterRename(self):
+        renamedID = self.userIDs[3]
+        self.assertEqual(self.handler.updateUserName(renamedID, "Quentin", "Zebedee")["status"], "Success")
+        self.assertEqual(self.searchAll("ntinzeb"), [renamedID])
+        self.assertEqual(self.searchAll("qu"), self.expectedMatches("qu", self.userID))
+
+
+# Test the unread report stream: reports written by another process arrive, and open streams are capped
+class TestReportEventStream(DatabaseTestCase):
+
+    class databaseTestConfig(DatabaseTestCase.databaseTestConfig):
+        EVENT_STREAM_MAX_CONNECTIONS = 1
+        EVENT_STREAM_POLL_SECONDS = 0.02
+
+    def openStream(self):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(self.otherUserID)
+        return client.get("/dashboard/events", buffered=False)
+
+    # Data of the next unreadReports event, skipping keepalives
+    def nextUnreadEvent(self, chunks):
+        for _, chunk in zip(range(200), chunks):
+            if chunk.startswith(b"event: unreadReports"):
+                return json.loads(chunk.decode().split("data: ", 1)[1])
+        self.fail("no unreadReports event")
+
+    def testReportFromAnotherProcessArrives(self):
+        response = self.openStream()
+        try:
+            chunks = iter(response.response)
+            unreadReportIds = self.nextUnreadEvent(chunks)["unreadReportIds"]
+
+            # Written without publishing to this process' bus, the way a write in another worker looks
+            report = ShareReport(senderID=self.userID, senderFirstName="Jack", senderLastName="Kelly",
+                                 receiverID=self.otherUserID, data=encodeSnapshot({}), readFlag=0)
+            db.session.add(report)
+            db.session.commit()
+
+            data = self.nextUnreadEvent(chunks)
+            self.assertEqual(data["unreadReportIds"], unreadReportIds + [report.id])
+            self.assertEqual(data["reportCount"], len(unreadReportIds) + 1)
+        finally:
+            response.close()
+
+    def testStreamsPastTheCapAreRefused(self):
+        response = self.openStream()
+        try:
+            self.assertEqual(response.status_code, 200)
+            refused = self.openStream()
+            self.assertEqual(refused.status_code, 503)
+            self.assertEqual(refused.headers["Retry-After"], "60")
+        finally:
+            response.close()
+
+        # Closing a stream frees its slot, even when no event was read from it
+        response = self.openStream()
+        response.close()
+        self.assertEqual(response.status_code, 200)
+
+
+# Test that every bootstrap section matches the response of the route it replaces
+class TestDashboardBootstrap(DatabaseTestCase):
+
+    def testSectionsMatchTheirRoutes(self):
+        self.handler.sendReport(self.otherUserID, self.userID)
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(self.userID)
+
+        routes = {
+            "unreadReportCount": "/dashboard/getUnreadReportCount",
+            "unreadReportIds": "/dashboard/getUnreadReportIds",
+            "senderDetails": "/dashboard/getSenderDetails",
+            "accountData": "/dashboard/getAccountData",
+            "latestTransactions": "/dashboard/getLatestTransactions",
+        }
+        response = client.get("/dashboard/bootstrap?sections=accountData,latestTransactions")
+        self.assertEqual(response.json["status"], "Success")
+        self.assertEqual(set(response.json["data"]), {"accountData", "latestTransactions"})
+
+        sections = client.get("/dashboard/bootstrap").json["data"]
+        self.assertEqual(set(sections), set(routes))
+        self.assertEqual(sections["accountData"], response.json["data"]["accountData"])
+        for section, route in routes.items():
+            routeData = client.get(route).json
+            # The report sections are built from one shared query and carry no message of their own
+            routeData.pop("message", None)
+            self.assertEqual({key: sections[section].get(key) for key in routeData}, routeData, section)
+        self.assertGreater(sections["unreadReportCount"]["reportCount"], 0)
+
+
+# Test the rendered report cache: ETag revalidation skips the HTML blob, a template change re-renders
+class TestSharedReportHtml(DatabaseTestCase):
+
+    def setUp(self):
+        self.assertEqual(self.handler.sendReport(self.otherUserID, self.userID)["status"], "Success")
+        self.reportID = db.session.query(db.func.max(ShareReport.id)).filter_by(receiverID=self.userID).scalar()
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.userID)
+        self.addCleanup(setattr, appModule, "reportTemplateVersion", None)
+
+    def getReport(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get("/dashboard/getSharedReport", headers=headers,
+                               query_string={"senderID": self.otherUserID, "reportId": self.reportID})
+
+    def storedHtml(self):
+        db.session.expire_all()
+        return db.session.query(ShareReport.reportHtml, ShareReport.reportHtmlVersion).filter_by(id=self.reportID).one()
+
+    def testEtagRevalidation(self):
+        first = self.getReport()
+        self.assertEqual(first.status_code, 200)
+        etag = first.get_etag()[0]
+        self.assertIn(str(self.reportID), etag)
+        self.assertEqual(self.storedHtml().reportHtmlVersion, appModule.getReportTemplateVersion())
+
+        with countQueries() as stats:
+            notModified = self.getReport(f'"{etag}"')
+        self.assertEqual(notModified.status_code, 304)
+        self.assertEqual(notModified.get_data(), b"")
+        self.assertFalse([statement for statement in stats.statements if '"reportHtml"' in statement])
+
+        cached = self.getReport('"some-other-etag"')
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.json["reportHtml"], first.json["reportHtml"])
+
+        self.assertEqual(self.getReport().status_code, 200)
+        self.assertEqual(self.client.get("/dashboard/getSharedReport", query_string={"senderID": self.otherUserID, "reportId": 0}).status_code, 404)
+
+    # Test that HTML rendered with an older template is neither served nor revalidated
+    def testTemplateVersionChange(self):
+        etag = self.getReport().get_etag()[0]
+        stale = zlib.compress(b"<p>rendered with the old template</p>")
+        ShareReport.query.filter_by(id=self.reportID).update({ShareReport.reportHtml: stale})
+        db.session.commit()
+
+        appModule.reportTemplateVersion = "nextTemplate"
+        response = self.getReport(f'"{etag}"')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.get_etag()[0], etag)
+        self.assertNotIn("old template", response.json["reportHtml"])
+        stored = self.storedHtml()
+        self.assertEqual(stored.reportHtmlVersion, "nextTemplate")
+        self.assertEqual(zlib.decompress(stored.reportHtml).decode("utf-8"), response.json["reportHtml"])
+
+
+# Test that the CSRF cookie is only set when missing, expiring or rotated, and never on cacheable responses
+class TestCsrfCookie(DatabaseTestCase):
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.userID)
+
+    # Requests share the app context pushed by setUpClass, drop the token Flask-WTF memoised in g
+    # by an earlier request, as a fresh per-request app context would
+    def get(self, path, **kwargs):
+        g.pop("csrf_token", None)
+        return self.client.get(path, **kwargs)
+
+    # True when the response carries a Set-Cookie for the CSRF token
+    def setsCsrfCookie(self, response):
+        return any(header.startswith(appModule.csrfCookieName + "=") for header in response.headers.getlist("Set-Cookie"))
+
+    def testSetOnlyWhenMissingExpiringOrRotated(self):
+        self.assertTrue(self.setsCsrfCookie(self.get("/login")))
+        self.assertFalse(self.setsCsrfCookie(self.get("/dashboard/getUnreadReportCount")))
+        self.assertFalse(self.setsCsrfCookie(self.get("/login")))
+
+        # Past three quarters of WTF_CSRF_TIME_LIMIT the cookie is reissued before it can expire
+        timeLimit = self.app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+        with unittest.mock.patch.object(appModule.time, "time", return_value=time.time() + timeLimit):
+            self.assertTrue(self.setsCsrfCookie(self.get("/dashboard/getUnreadReportCount")))
+
+        with self.client.session_transaction() as session:
+            session["csrf_token"] = "rotated-session-token"
+        self.assertTrue(self.setsCsrfCookie(self.get("/dashboard/getUnreadReportCount")))
+        self.assertFalse(self.setsCsrfCookie(self.get("/dashboard/getUnreadReportCount")))
+
+        self.client.delete_cookie(appModule.csrfCookieName)
+        self.assertTrue(self.setsCsrfCookie(self.get("/dashboard/getUnreadReportCount")))
+
+    def testSkippedForStaticAndCacheableResponses(self):
+        static = self.get("/static/js/base.js")
+        self.assertEqual(static.status_code, 200)
+        self.assertFalse(self.setsCsrfCookie(static))
+
+        notModified = self.get("/static/js/base.js", headers={"If-None-Match": static.get_etag()[0]})
+        static.close()
+        self.assertEqual(notModified.status_code, 304)
+        self.assertFalse(self.setsCsrfCookie(notModified))
+
+        # A shared report is served with an ETag, so it is cacheable even though it is not static
+        self.handler.sendReport(self.otherUserID, self.userID)
+        reportID = db.session.query(db.func.max(ShareReport.id)).filter_by(receiverID=self.userID).scalar()
+        report = self.get("/dashboard/getSharedReport", query_string={"senderID": self.otherUserID, "reportId": reportID})
+        self.assertIsNotNone(report.get_etag()[0])
+        self.assertFalse(self.setsCsrfCookie(report))
+        self.assertIsNone(self.client.get_cookie(appModule.csrfCookieName))
+
+
+# Test that only payloads built from successful lookups are cached
+class TestPayloadCache(DatabaseTestCase):
+
+    def testFailedLookupIsNotCached(self):
+        cacheKey = self.handler.dashboardCacheKey(self.userID)
+        self.handler.invalidateUserCache(self.userID)
+        failed = {"status": "Failed", "statusCode": 400, "message": "A system error occurred. Please try again later."}
+
+        getAccountBalance = self.handler.DBClient.getAccountBalance
+        self.handler.DBClient.getAccountBalance = lambda userID: failed
+        try:
+            dashboardData = self.handler.getDashboardData(self.userID)
+        finally:
+            self.handler.DBClient.getAccountBalance = getAccountBalance
+        self.assertFalse(dashboardData["hasAccountBalance"])
+        self.assertIsNone(self.handler.cache.get(cacheKey))
+
+        dashboardData = self.handler.getDashboardData(self.userID)
+        self.assertTrue(dashboardData["hasAccountBalance"])
+        self.assertEqual(self.handler.cache.get(cacheKey), dashboardData)
+
+    def testFailedExpenseTotalsAreNotCached(self):
+        cacheKey = self.handler.expensePageCacheKey(self.userID)
+        self.handler.invalidateUserCache(self.userID)
+
+        getMonthlySalaryTotals = self.handler.DBClient.getMonthlySalaryTotals
+        self.handler.DBClient.getMonthlySalaryTotals = lambda userID: {"status": "Failed", "statusCode": 400}
+        try:
+            expenseData = self.handler.getExpensePageData(self.userID)
+        finally:
+            self.handler.DBClient.getMonthlySalaryTotals = getMonthlySalaryTotals
+        self.assertFalse(expenseData["hasSalary"])
+        self.assertIsNone(self.handler.cache.get(cacheKey))
+
+
+# Test that a full password hashing queue comes back as 503 on every path that hashes, not as a 400
+class TestPasswordHasherBusy(DatabaseTestCase):
+
+    # Make one method of the shared hasher raise passwordHasherBusy until the test ends
+    def makeBusy(self, method):
+        def raiseBusy(*args):
+            raise passwordHasherBusy("Password hashing queue is full")
+        setattr(passwords, method, raiseBusy)
+        self.addCleanup(delattr, passwords, method)
+
+    def testAddUser(self):
+        self.makeBusy("hash")
+        status = self.handler.addNewUser({
+            "username": "busySignup", "password": "mySecret123", "firstName": "Busy", "lastName": "Signup"
+        })
+        self.assertEqual(status["statusCode"], 503)
+        self.assertIsNone(db.session.query(User).filter_by(username="busySignup").first())
+
+    def testCheckCurrentPassword(self):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(self.userID)
+        payload = {"currentPassword": "password123", "newPassword": "newSecret123", "confirmPassword": "newSecret123"}
+
+        self.makeBusy("verify")
+        response = client.post("/settings", json=payload)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json["statusCode"], 503)
+
+    def testHashNewPassword(self):
+        self.makeBusy("hash")
+        self.assertEqual(self.handler.DBClient.updateUserPassword(self.userID, "newSecret123")["statusCode"], 503)
+
+    # Test that each app gets a pool sized by its own PASSWORD_* settings
+    def testHasherBuiltFromAppConfig(self):
+        hasherConfig = type("hasherConfig", (self.databaseTestConfig,), {"PASSWORD_HASH_WORKERS": 1, "PASSWORD_HASH_MAX_QUEUED": 3})
+        app = appModule.createApp(hasherConfig)
+        with app.app_context():
+            self.assertIs(passwords._get_current_object(), app.extensions["passwordHasher"])
+            stats = passwords.stats()
+        self.assertEqual((stats["workers"], stats["maxQueued"]), (1, 3))
+        self.assertIs(passwords._get_current_object(), self.app.extensions["passwordHasher"])
+
+    def testHealthReportsHasherStats(self):
+        response = self.app.test_client().get("/health")
+        self.assertEqual(response.json["status"], "Success")
+        self.assertEqual(set(response.json["passwordHasher"]), set(passwords.stats()))
+
+
+# Test that incremental expense adds keep the cached expense page equal to a rebuild, labels in date order
+class TestIncrementalExpense(DatabaseTestCase):
+
+    # Expense page data with floats rounded, so summation order does not matter
+    def rounded(self, pageData):
+        return json.loads(json.dumps(pageData), parse_float=lambda value: round(float(value), 6))
+
+    def rebuild(self, userID):
+        self.handler.invalidateUserCache(userID)
+        return self.rounded(self.handler.getExpensePageData(userID))
+
+    def testDeltaOnlyForTheNewestWeekAndMonth(self):
+        userID = self.userIDs[4]
+        cacheKey = self.handler.expensePageCacheKey(userID)
+        today = date.today()
+
+        self.handler.getExpensePageData(userID)
+        status = self.handler.addNewExpense(None, userID, {"amount": 9.5, "category": "Food", "date": today.isoformat()}, incremental=True)
+        self.assertEqual(status["data"]["delta"]["amount"], 9.5)
+        patched = self.rounded(self.handler.cache.get(cacheKey))
+        self.assertEqual(patched, self.rebuild(userID))
+
+        # A back-dated expense may start a week that belongs before the newest one
+        backDated = today - timedelta(weeks=3)
+        status = self.handler.addNewExpense(None, userID, {"amount": 4.25, "category": "Gifts", "date": backDated.isoformat()}, incremental=True)
+        self.assertNotIn("delta", status["data"])
+        returned = self.rounded(status["data"]["expensePageData"])
+        self.assertEqual(returned, self.rounded(self.handler.cache.get(cacheKey)))
+        rebuilt = self.rebuild(userID)
+        self.assertEqual(returned, rebuilt)
+        self.assertEqual(list(returned["weeklyExpense"]), list(rebuilt["weeklyExpense"]))
+
+    # Test that the dashboard redeem route stops at a failed expense write instead of updating the allocation
+    def testDashboardAddExpenseReportsFailedWrite(self):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(self.userID)
+        response = client.post("/dashboard/addExpense", json={"amount": 5, "category": "", "date": date.today().isoformat(), "goalName": "Car"})
+        self.assertEqual(response.json["status"], "Failed")
+        self.assertIn("category", response.json["message"])
+
+
+# Upper bounds on the SQL statements each serviceHandler entry point runs with cold caches.
+# Lower a bound when a change saves queries, raising one needs a reason in the commit.
+class TestQueryBudgets(DatabaseTestCase):
+
+    # Run call with cold caches and a fresh session, failing if it runs more than limit statements
+    def assertQueryBudget(self, limit, call):
+        self.handler.invalidateUserCache(self.userID)
+        db.session.remove()
+        with maxQueries(limit):
+            status = call()
+        if isinstance(status, dict):
+            self.assertNotEqual(status.get("status"), "Failed", status.get("message"))
+
+    def testDashboardQueries(self):
+        self.assertQueryBudget(8, lambda: self.handler.getDashboardData(self.userID))
+        self.assertQueryBudget(6, lambda: self.handler.getDashboardBootstrap(self.userID))
+        self.assertQueryBudget(3, lambda: self.handler.getLatestTransactions(self.userID))
+        self.assertQueryBudget(2, lambda: self.handler.getAccountData(self.userID))
+        self.assertQueryBudget(1, lambda: self.handler.getGoals(self.userID))
+
+    def testExpensePageQueries(self):
+        self.assertQueryBudget(4, lambda: self.handler.getExpensePageData(self.userID))
+
+    def testAddExpenseQueries(self):
+        data = {"amount": 5, "category": "Food", "date": date.today().isoformat()}
+        self.assertQueryBudget(7, lambda: self.handler.addNewExpense(None, self.userID, data))
+        self.assertQueryBudget(3, lambda: self.handler.addNewExpense(None, self.userID, data, incremental=True))
+
+    def testAddSalaryQueries(self):
+        data = {"amount": 100, "salaryDate": date.today().isoformat()}
+        self.assertQueryBudget(4, lambda: self.handler.addNewSalary(None, self.userID, data))
+
+    def testGoalQueries(self):
+        username = db.session.get(User, self.userID).username
+        data = {"goalName": "Budget goal", "targetAmount": 500, "timeDuration": 6, "percentageAllocation": 1}
+        self.assertQueryBudget(8, lambda: self.handler.addNewGoal(username, self.userID, data))
+        self.assertQueryBudget(4, lambda: self.handler.updateAllocation(self.userID, {"goalName": "Budget goal"}))
+
+    # Test that an import costs a fixed number of statements per batch, however many rows the batch holds
+    def testImportQueries(self):
+        today = date.today().isoformat()
+        lines = lambda count: ["date,category,amount\n"] + [f"{today},Food,{offset}.5\n" for offset in range(count)]
+        self.assertQueryBudget(3, lambda: self.handler.importExpenses(self.userID, lines(10)))
+        self.assertQueryBudget(3, lambda: self.handler.importExpenses(self.userID, lines(40)))
+        self.assertQueryBudget(6, lambda: self.handler.importExpenses(self.userID, lines(40), batchSize=20))
+
+    def testReportQueries(self):
+        self.assertQueryBudget(13, lambda: self.handler.sendReport(self.userID, self.otherUserID))
+        self.assertQueryBudget(1, lambda: self.handler.getSenderDetails(self.otherUserID))
+        self.assertQueryBudget(1, lambda: self.handler.getUnreadReportIds(self.otherUserID))
+
+    def testUserQueries(self):
+        self.assertQueryBudget(1, lambda: self.handler.loadUser(self.userID))
+        self.assertQueryBudget(2, lambda: self.handler.getUsernamesAndIDs(self.userID, "ol"))
+
+    # Test that going over a budget fails and names the statements that ran
+    def testMaxQueriesReportsStatements(self):
+        with self.assertRaises(AssertionError) as raised:
+            with maxQueries(0):
+                db.session.execute(db.text("SELECT 1"))
+        self.assertIn("SELECT 1", str(raised.exception))
+
+        with countQueries() as stats:
+            pass
+        self.assertEqual(stats.count, 0)
+
+    # Test that debug headers report the statements of a request
+    def testQueryCountHeaders(self):
+        self.app.config["QUERY_COUNT_HEADERS"] = True
+        try:
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(self.userID)
+            response = client.get("/dashboard/getAccountData")
+        finally:
+            self.app.config["QUERY_COUNT_HEADERS"] = False
+        self.assertGreaterEqual(int(response.headers["X-Query-Count"]), 1)
+        self.assertIn("X-Query-Time-Ms", response.headers)